@@ -0,0 +1,229 @@
+"""Benchmarks for syncing, merging and status queries.
+
+Generates a synthetic shared pool in a temporary config directory, times the
+core operations and writes the results as JSON. Pass a previous result file
+with ``--baseline`` to flag regressions.
+
+Usage:
+    python benchmarks/bench.py --output results.json
+    python benchmarks/bench.py --baseline results.json
+
+The exit status is 1 when any operation regressed beyond ``--tolerance``.
+"""
+
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import statistics
+import tempfile
+from pathlib import Path
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from claude_multi.config import Config  # noqa: E402
+from claude_multi.memory import MemoryManager  # noqa: E402
+
+WORDS = ("cache", "index", "merge", "session", "memory", "sync", "shared", "topic",
+         "snapshot", "config", "lock", "manifest", "watcher", "search", "build",
+         "test", "deploy", "review", "branch", "schema", "migration", "endpoint")
+
+# Regressions smaller than this are treated as noise regardless of tolerance
+MIN_REGRESSION_SECONDS = 0.002
+
+
+def make_line(rng: random.Random) -> str:
+    return "- " + " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 12)))
+
+
+def make_file(rng: random.Random, lines: int, sections: int = 4) -> str:
+    parts = ["# Memory", ""]
+    per_section = max(1, lines // sections)
+    for section in range(sections):
+        parts.append(f"## Section {section}")
+        parts.append("")
+        parts.extend(make_line(rng) for _ in range(per_section))
+        parts.append("")
+    return "\n".join(parts)
+
+
+def build_pool(config: Config, rng: random.Random, files: int, lines: int, topics: int):
+    """Write ``files`` shared memory files, spread over ``topics`` topic directories."""
+    shared = config.shared_memory_dir
+    shared.mkdir(parents=True, exist_ok=True)
+    for i in range(files):
+        topic = i % (topics + 1)
+        directory = shared if topic == 0 else shared / f"topic{topic}"
+        directory.mkdir(exist_ok=True)
+        (directory / f"file{i}.md").write_text(make_file(rng, lines), encoding='utf-8')
+
+
+def build_history(manager: MemoryManager, rng: random.Random, sessions: int, snapshots: int,
+                  files: int, lines: int):
+    """Record ``snapshots`` snapshots for each of ``sessions`` sessions."""
+    store = manager.snapshots
+    start = datetime(2026, 1, 1)
+    for session in range(sessions):
+        name = f"session{session}"
+        for snapshot in range(snapshots):
+            entries = {}
+            for i in range(files):
+                data = make_file(rng, lines).encode('utf-8')
+                entries[f"file{i}.md"] = {"hash": store.objects.put_bytes(data), "size": len(data)}
+            snapshot_id = (start + timedelta(minutes=snapshot)).strftime("%Y%m%d_%H%M%S")
+            store._write_manifest(name, snapshot_id, entries)
+
+
+def touch_session_files(memory_dir: Path, rng: random.Random, fraction: float) -> int:
+    """Append a new bullet to a fraction of a session's memory files."""
+    paths = sorted(memory_dir.rglob("*.md"))
+    changed = rng.sample(paths, max(1, int(len(paths) * fraction)))
+    for path in changed:
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(make_line(rng) + "\n")
+    return len(changed)
+
+
+def measure(repeat: int, run: Callable[[], None], setup: Optional[Callable[[], None]] = None) -> Dict:
+    """Time ``run`` ``repeat`` times, calling ``setup`` (untimed) before each run."""
+    runs = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        run()
+        runs.append(time.perf_counter() - start)
+    return {"min": min(runs), "median": statistics.median(runs), "runs": runs}
+
+
+def run_benchmarks(args) -> Dict[str, Dict]:
+    rng = random.Random(args.seed)
+    workdir = Path(tempfile.mkdtemp(prefix="claude-multi-bench-"))
+    try:
+        config = Config(config_dir=workdir / "config")
+        build_pool(config, rng, args.files, args.lines, args.topics)
+        manager = MemoryManager(config)
+        build_history(manager, rng, args.sessions, args.snapshots, min(args.files, 20), args.lines // 4)
+        manager.rebuild_index()
+
+        results = {}
+        projects = workdir / "projects"
+        counter = iter(range(10 ** 6))
+        state = {}
+
+        def fresh_project():
+            path = projects / f"cold{next(counter)}"
+            path.mkdir(parents=True)
+            state["project"] = path
+
+        results["sync_to_session.cold"] = measure(
+            args.repeat, lambda: manager.sync_to_session(state["project"]), fresh_project)
+
+        warm = projects / "warm"
+        warm.mkdir(parents=True)
+        manager.sync_to_session(warm)
+        results["sync_to_session.unchanged"] = measure(
+            args.repeat, lambda: manager.sync_to_session(warm))
+
+        results["sync_from_session.changed"] = measure(
+            args.repeat, lambda: manager.sync_from_session(warm, "bench"),
+            lambda: touch_session_files(warm / "memory", rng, args.change_fraction))
+        results["sync_from_session.unchanged"] = measure(
+            args.repeat, lambda: manager.sync_from_session(warm, "bench", snapshot=False))
+
+        merge_dir = workdir / "merge"
+        merge_dir.mkdir()
+        source = merge_dir / "source.md"
+        target = merge_dir / "target.md"
+        base = make_file(rng, args.merge_lines).split("\n")
+        source.write_text("\n".join(base[:len(base) * 3 // 4]
+                                    + [make_line(rng) for _ in range(args.merge_lines // 4)]),
+                          encoding='utf-8')
+        target_content = "\n".join(base[len(base) // 4:])
+
+        results["merge_memory_file"] = measure(
+            args.repeat, lambda: manager._merge_memory_file(source, target),
+            lambda: target.write_text(target_content, encoding='utf-8'))
+
+        results["get_shared_memory_summary"] = measure(
+            args.repeat, manager.get_shared_memory_summary)
+        results["get_shared_memory_summary.rebuild"] = measure(
+            args.repeat, manager.get_shared_memory_summary, manager.index.invalidate)
+        results["get_session_summaries"] = measure(
+            args.repeat, manager.get_session_summaries)
+        return results
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float) -> List[str]:
+    """List operations whose median is slower than the baseline by more than ``tolerance``."""
+    regressions = []
+    for name, result in sorted(results.items()):
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        slowdown = result["median"] - previous["median"]
+        if slowdown > previous["median"] * tolerance and slowdown > MIN_REGRESSION_SECONDS:
+            regressions.append(f"{name}: {previous['median'] * 1000:.1f} ms -> "
+                               f"{result['median'] * 1000:.1f} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--files", type=int, default=200, help="Shared memory files")
+    parser.add_argument("--lines", type=int, default=200, help="Lines per shared memory file")
+    parser.add_argument("--topics", type=int, default=5, help="Topic directories")
+    parser.add_argument("--sessions", type=int, default=5, help="Sessions with snapshot history")
+    parser.add_argument("--snapshots", type=int, default=20, help="Snapshots per session")
+    parser.add_argument("--merge-lines", type=int, default=5000, help="Lines in the merge benchmark files")
+    parser.add_argument("--change-fraction", type=float, default=0.1,
+                        help="Fraction of session files edited before each sync back")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per operation")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the generated data")
+    parser.add_argument("--output", type=Path, help="Write results to this JSON file")
+    parser.add_argument("--baseline", type=Path, help="Compare against a previous results file")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown relative to the baseline (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    parameters = {key: value for key, value in vars(args).items()
+                  if key not in ("output", "baseline", "tolerance")}
+    results = run_benchmarks(args)
+
+    print(f"{'operation':<36} {'median':>10} {'min':>10}")
+    for name, result in results.items():
+        print(f"{name:<36} {result['median'] * 1000:>8.1f}ms {result['min'] * 1000:>8.1f}ms")
+
+    if args.output:
+        report = {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "parameters": parameters,
+            "results": results,
+        }
+        args.output.write_text(json.dumps(report, indent=2), encoding='utf-8')
+        print(f"\n[OK] Results written to {args.output}")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding='utf-8'))
+        if baseline.get("parameters") != parameters:
+            print("\n[!] Baseline was recorded with different parameters")
+        regressions = compare(results, baseline["results"], args.tolerance)
+        if regressions:
+            print("\n[!] Regressions:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("\n[OK] No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
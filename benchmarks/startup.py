@@ -0,0 +1,102 @@
+"""Startup budget check for trivial CLI commands.
+
+Wrapper scripts and shell hooks run the CLI often, so ``--version`` and
+``config --key`` must not import the sync, index or session subsystems and
+must start within a fixed budget on top of importing click itself.
+
+Usage:
+    python benchmarks/startup.py [--budget-ms 40]
+
+The exit status is 1 when a check fails.
+"""
+
+import sys
+import json
+import argparse
+import subprocess
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Modules that trivial commands must not import
+HEAVY_MODULES = ("claude_multi.memory", "claude_multi.session", "claude_multi.watcher",
+                 "claude_multi.index", "claude_multi.search", "claude_multi.snapshots",
+                 "subprocess", "sqlite3", "concurrent.futures")
+
+COMMANDS = (["--version"], ["config", "--key", "auto_sync"])
+
+PROBE = """
+import sys, json
+from claude_multi.cli import cli
+try:
+    cli(json.loads(sys.argv[1]), standalone_mode=False)
+finally:
+    sys.stdout.flush()
+    sys.stderr.write(json.dumps(sorted(sys.modules)))
+"""
+
+
+def run_python(code: str, *args: str, home: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, "-X", "importtime", "-c", code, *args],
+                          cwd=str(ROOT), env={"HOME": home, "PYTHONPATH": str(ROOT)},
+                          capture_output=True, text=True)
+
+
+def cumulative_import_us(stderr: str, module: str) -> int:
+    """Get the cumulative import time of a top-level module from ``-X importtime`` output."""
+    for line in stderr.splitlines():
+        if line.startswith("import time:") and line.split("|")[-1].strip() == module:
+            return int(line.split("|")[1])
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--budget-ms", type=float, default=40.0,
+                        help="Allowed import time of claude_multi.cli beyond click itself")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per measurement (the minimum is used)")
+    args = parser.parse_args()
+
+    failures = []
+    with tempfile.TemporaryDirectory() as home:
+        for command in COMMANDS:
+            result = run_python(PROBE, json.dumps(command), home=home)
+            modules = json.loads(result.stderr.splitlines()[-1])
+            imported = [name for name in HEAVY_MODULES if name in modules]
+            label = " ".join(command)
+            if result.returncode != 0:
+                failures.append(f"'{label}' failed: {result.stderr.splitlines()[-2:]}")
+            elif imported:
+                failures.append(f"'{label}' imported {', '.join(imported)}")
+            else:
+                print(f"[OK] '{label}' imports no subsystems")
+
+        if list(Path(home).iterdir()):
+            failures.append(f"Trivial commands created files: {sorted(p.name for p in Path(home).iterdir())}")
+        else:
+            print("[OK] Trivial commands create no files or directories")
+
+        cli_times = []
+        click_times = []
+        for _ in range(args.runs):
+            cli_times.append(cumulative_import_us(
+                run_python("import claude_multi.cli", home=home).stderr, "claude_multi.cli"))
+            click_times.append(cumulative_import_us(
+                run_python("import click", home=home).stderr, "click"))
+
+    overhead_ms = (min(cli_times) - min(click_times)) / 1000
+    line = (f"claude_multi.cli imports in {min(cli_times) / 1000:.1f} ms "
+            f"({overhead_ms:.1f} ms beyond click, budget {args.budget_ms:.0f} ms)")
+    if overhead_ms > args.budget_ms:
+        failures.append(line)
+    else:
+        print(f"[OK] {line}")
+
+    for failure in failures:
+        print(f"[!] {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
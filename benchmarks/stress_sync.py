@@ -0,0 +1,116 @@
+"""Stress test for concurrent syncs into the shared pool.
+
+Starts ``--processes`` worker processes at once. Each one owns a project
+whose memory holds the same files (``MEMORY.md`` and a topic file), and in
+every round appends bullets no other worker writes and calls
+``sync_from_session``. All workers therefore merge into the same shared
+files at the same time. Afterwards, every bullet must be in the pool and no
+temporary files may be left behind.
+
+Usage:
+    python benchmarks/stress_sync.py [--processes 16] [--rounds 5]
+
+The exit status is 1 when any bullet was lost.
+"""
+
+import sys
+import time
+import argparse
+import tempfile
+import multiprocessing
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from claude_multi.config import Config  # noqa: E402
+from claude_multi.memory import MemoryManager  # noqa: E402
+
+FILES = ("MEMORY.md", "topic/shared.md")
+
+
+def bullet(worker: int, round_number: int, file_number: int, line: int) -> str:
+    return f"- worker {worker} round {round_number} file {file_number} line {line}"
+
+
+def worker_main(workdir: str, worker: int, rounds: int, lines: int, barrier):
+    config = Config(config_dir=Path(workdir) / "config")
+    manager = MemoryManager(config, use_daemon=False)
+    memory_dir = Path(workdir) / "projects" / f"project{worker}" / "memory"
+    for rel_path in FILES:
+        (memory_dir / rel_path).parent.mkdir(parents=True, exist_ok=True)
+        (memory_dir / rel_path).write_text("# Memory\n\n## Notes\n\n", encoding='utf-8')
+
+    barrier.wait()
+    for round_number in range(rounds):
+        for file_number, rel_path in enumerate(FILES):
+            with open(memory_dir / rel_path, 'a', encoding='utf-8') as f:
+                for line in range(lines):
+                    f.write(bullet(worker, round_number, file_number, line) + "\n")
+        if not manager.sync_from_session(memory_dir.parent, f"stress{worker}", snapshot=False):
+            raise SystemExit(f"worker {worker}: sync_from_session failed")
+
+
+def missing_bullets(config: Config, processes: int, rounds: int, lines: int) -> List[str]:
+    missing = []
+    for file_number, rel_path in enumerate(FILES):
+        path = config.shared_memory_dir / rel_path
+        content = set(path.read_text(encoding='utf-8').splitlines()) if path.exists() else set()
+        for worker in range(processes):
+            for round_number in range(rounds):
+                for line in range(lines):
+                    expected = bullet(worker, round_number, file_number, line)
+                    if expected not in content:
+                        missing.append(f"{rel_path}: {expected}")
+    return missing
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--processes", type=int, default=16, help="Parallel sync processes")
+    parser.add_argument("--rounds", type=int, default=5, help="Syncs per process")
+    parser.add_argument("--lines", type=int, default=20, help="Bullets added per file and round")
+    args = parser.parse_args()
+
+    failures = []
+    with tempfile.TemporaryDirectory(prefix="claude-multi-stress-") as workdir:
+        config = Config(config_dir=Path(workdir) / "config")
+        config.shared_memory_dir.mkdir(parents=True, exist_ok=True)
+
+        barrier = multiprocessing.Barrier(args.processes)
+        workers = [multiprocessing.Process(target=worker_main,
+                                           args=(workdir, worker, args.rounds, args.lines, barrier))
+                   for worker in range(args.processes)]
+        start = time.perf_counter()
+        for process in workers:
+            process.start()
+        for process in workers:
+            process.join()
+        elapsed = time.perf_counter() - start
+
+        crashed = [str(number) for number, process in enumerate(workers) if process.exitcode != 0]
+        if crashed:
+            failures.append(f"Workers failed: {', '.join(crashed)}")
+
+        missing = missing_bullets(config, args.processes, args.rounds, args.lines)
+        total = len(FILES) * args.processes * args.rounds * args.lines
+        if missing:
+            failures.append(f"{len(missing)} of {total} bullets lost, e.g. {missing[0]}")
+        else:
+            print(f"[OK] All {total} bullets from {args.processes} processes x {args.rounds} "
+                  f"syncs are in the pool ({elapsed:.1f}s)")
+
+        leftovers = sorted(str(path.relative_to(config.shared_memory_dir))
+                           for path in config.shared_memory_dir.rglob("*.tmp"))
+        if leftovers:
+            failures.append(f"Temporary files left behind: {', '.join(leftovers)}")
+        else:
+            print("[OK] No temporary files left behind")
+
+    for failure in failures:
+        print(f"[!] {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,18 +3,43 @@
 import click
 from pathlib import Path
 from .config import Config
-from .memory import MemoryManager
-from .session import SessionManager
+
+# Subsystems are imported inside the commands that use them so that trivial
+# commands (--version, config) start quickly.
 
 
 @click.group()
 @click.version_option(version="0.1.0")
-def cli():
+@click.option('--profile', is_flag=True, envvar='CLAUDE_MULTI_PROFILE',
+              help='Print per-phase timings and file/byte counters when the command finishes')
+@click.option('--profile-output', type=click.Path(dir_okay=False), envvar='CLAUDE_MULTI_PROFILE_OUTPUT',
+              help='Append profiling data as a JSON line to this file instead of printing it')
+@click.pass_context
+def cli(ctx, profile, profile_output):
     """Claude Multi - Multi-session memory sharing for Claude Code.
 
     Manage multiple Claude Code sessions with shared learning across all sessions.
     """
-    pass
+    if profile or profile_output:
+        from .profiling import Profiler
+        profiler = Profiler(ctx.invoked_subcommand or "")
+        ctx.obj = profiler
+        if profile_output:
+            ctx.call_on_close(lambda: profiler.append_to(Path(profile_output)))
+        else:
+            ctx.call_on_close(profiler.print_summary)
+
+
+def _memory_manager(config: Config):
+    """Create the MemoryManager for a command, with the --profile profiler if enabled."""
+    from .memory import MemoryManager
+    return MemoryManager(config, click.get_current_context().obj)
+
+
+def _session_manager(config: Config, memory):
+    """Create the SessionManager for a command."""
+    from .session import SessionManager
+    return SessionManager(config, memory)
 
 
 @cli.command()
@@ -33,21 +58,80 @@ def start(project_path, name, instructions):
         claude-multi start . -i ~/common.md -i ~/gitea.md
     """
     config = Config()
-    memory = MemoryManager(config)
-    session = SessionManager(config, memory)
+    memory = _memory_manager(config)
+    session = _session_manager(config, memory)
 
     project_path = Path(project_path).resolve()
     instruction_list = list(instructions) if instructions else None
     session.start_session(project_path, name, instruction_list)
 
 
+@cli.command('start-many')
+@click.argument('project_paths', nargs=-1, required=True, type=click.Path(exists=True, file_okay=False))
+@click.option('--instructions', '-i', multiple=True, help='Additional CLAUDE.md files to inject into every project')
+@click.option('--claude-args', default='', help='Arguments passed to every claude, e.g. "-p \'run the tests\'"')
+@click.option('--workers', '-w', type=int, help='Number of concurrent pre-start syncs')
+@click.option('--follow', '-f', is_flag=True, help="Echo every session's output, prefixed with its name")
+def start_many(project_paths, instructions, claude_args, workers, follow):
+    """Run Claude Code sessions for several projects at once.
+
+    Every project is prepared concurrently, then each session runs in its
+    own pseudo-terminal with its output logged to
+    ~/.claude-multi/logs/<session>.log. Sessions are synced back to the
+    shared pool one at a time as they exit. Sessions get no keyboard
+    input, so pass a task with --claude-args for unattended runs.
+
+    Example:
+        claude-multi start-many ~/api ~/web --claude-args "-p 'fix the failing tests'"
+        claude-multi start-many ~/api ~/web --follow
+    """
+    import shlex
+    import shutil
+    from .supervisor import SessionSupervisor
+
+    executable = shutil.which("claude")
+    if executable is None:
+        raise click.UsageError("claude was not found on PATH")
+
+    config = Config()
+    memory = _memory_manager(config)
+    session = _session_manager(config, memory)
+
+    supervisor = SessionSupervisor(session, [executable] + shlex.split(claude_args), workers, follow)
+    try:
+        results = supervisor.run([(Path(path), None) for path in project_paths],
+                                 list(instructions) or None)
+    except ValueError as e:
+        raise click.UsageError(str(e))
+
+    width = max([len(result.name) for result in results] + [len("Session")])
+    click.echo(f"\n  {'Session':<{width}}  {'Exit':>4}  {'Time':>8}  {'Copied':>6}  {'Merged':>6}")
+    for result in results:
+        exit_code = "-" if result.returncode is None else str(result.returncode)
+        line = (f"  {result.name:<{width}}  {exit_code:>4}  {result.seconds:>7.1f}s  "
+                f"{result.stats.files_copied:>6}  {result.stats.files_merged:>6}")
+        if result.error is not None:
+            line += f"  [ERROR] {result.error}"
+        elif not result.synced_back and config.get("sync_on_end", True):
+            line += "  [!] not synced back"
+        click.echo(line)
+
+    failed = sum(1 for result in results if result.error is not None or result.returncode != 0)
+    if failed:
+        click.echo(f"\n[!] {failed} of {len(results)} session(s) failed")
+    else:
+        click.echo(f"\n[OK] {len(results)} session(s) finished")
+
+
 @cli.command()
 @click.argument('project_path', type=click.Path(exists=True), default='.')
 @click.option('--direction', '-d',
               type=click.Choice(['to', 'from', 'both']),
               default='both',
               help='Sync direction: to (shared->session), from (session->shared), both')
-def sync(project_path, direction):
+@click.option('--all', 'sync_all', is_flag=True, help='Sync every known project in parallel')
+@click.option('--workers', '-w', type=int, help='Number of parallel syncs with --all')
+def sync(project_path, direction, sync_all, workers):
     """Manually sync memory for a project.
 
     PROJECT_PATH: Path to the project directory (defaults to current directory)
@@ -55,24 +139,34 @@ def sync(project_path, direction):
     Example:
         claude-multi sync /path/to/project
         claude-multi sync . --direction from
+        claude-multi sync --all --workers 4
     """
     config = Config()
-    memory = MemoryManager(config)
-    session = SessionManager(config, memory)
+    memory = _memory_manager(config)
+    session = _session_manager(config, memory)
 
-    project_path = Path(project_path).resolve()
-    session.manual_sync(project_path, direction)
+    if sync_all:
+        reports = session.sync_all(direction, workers)
+        if any(report["error"] is not None for report in reports):
+            raise SystemExit(1)
+    else:
+        project_path = Path(project_path).resolve()
+        session.manual_sync(project_path, direction)
 
     click.echo("\n[OK] Sync complete!")
 
 
 @cli.command()
-def sessions():
+@click.option('--rebuild-index', is_flag=True, help='Rebuild the session index from disk first')
+def sessions(rebuild_index):
     """List all tracked sessions and their history."""
     config = Config()
-    memory = MemoryManager(config)
+    memory = _memory_manager(config)
+
+    if rebuild_index:
+        memory.rebuild_index()
 
-    session_list = memory.list_sessions()
+    session_list = memory.get_session_summaries()
 
     if not session_list:
         click.echo("No sessions tracked yet.")
@@ -80,23 +174,651 @@ def sessions():
 
     click.echo("\n=== Tracked Sessions ===\n")
 
-    for session_name in session_list:
-        snapshots = memory.get_session_history(session_name)
-        click.echo(f"  • {session_name}")
-        click.echo(f"    Snapshots: {len(snapshots)}")
+    for session_info in session_list:
+        click.echo(f"  • {session_info['name']}")
+        click.echo(f"    Snapshots: {session_info['snapshot_count']}")
 
-        if snapshots:
-            latest = snapshots[0]
-            click.echo(f"    Latest: {latest.name}")
+        if session_info['latest']:
+            click.echo(f"    Latest: {session_info['latest']} ({session_info['latest_files']} files)")
 
         click.echo()
 
 
 @cli.command()
-def status():
+@click.argument('query', nargs=-1, required=True)
+@click.option('--limit', '-l', default=20, show_default=True, help='Maximum number of results')
+@click.option('--history', is_flag=True, help='Also search snapshot history')
+@click.option('--rebuild-index', is_flag=True, help='Rebuild the search index from scratch first')
+def search(query, limit, history, rebuild_index):
+    """Search the shared memory pool.
+
+    Results are ranked by relevance; bullets and lines under a section whose
+    title matches the query rank higher.
+
+    Example:
+        claude-multi search pytest fixtures
+        claude-multi search "database migrations" --history
+    """
+    config = Config()
+    memory = _memory_manager(config)
+
+    if rebuild_index:
+        memory.search_index.rebuild()
+
+    results = memory.search(' '.join(query), limit, history)
+
+    if not results:
+        click.echo("No matches.")
+        return
+
+    click.echo()
+    for result in results:
+        location = f"{result['path']}:{result['line']}"
+        if 'snapshot' in result:
+            location = f"{result['session']}@{result['snapshot']} {location}"
+        click.echo(f"  {location}  [{result['section'] or '-'}]")
+        click.echo(f"    {result['text']}")
+    click.echo()
+
+
+@cli.command()
+@click.option('--threshold', '-t', type=click.FloatRange(0, 1, min_open=True),
+              help='Similarity threshold for near-duplicates (default: near_duplicate_threshold setting)')
+@click.option('--dry-run', is_flag=True, help='Show what would be removed without changing files')
+def dedupe(threshold, dry_run):
+    """Remove duplicate and near-duplicate bullets from the shared pool.
+
+    Exact duplicates are always removed. Bullets whose similarity to an
+    earlier bullet in the same file reaches the threshold are removed too;
+    the first occurrence is kept.
+
+    Example:
+        claude-multi dedupe --dry-run
+        claude-multi dedupe --threshold 0.85
+    """
+    config = Config()
+    memory = _memory_manager(config)
+
+    removed_by_file = memory.dedupe_shared_memory(threshold, dry_run)
+
+    if not removed_by_file:
+        click.echo("[OK] No duplicates found")
+        return
+
+    verb = "Would remove" if dry_run else "Removed"
+    for rel_path, removed in removed_by_file.items():
+        click.echo(f"\n  {rel_path}: {verb.lower()} {len(removed)} bullet(s)")
+        for line in removed:
+            click.echo(f"    {line.strip()}")
+
+    total = sum(len(removed) for removed in removed_by_file.values())
+    click.echo(f"\n[OK] {verb} {total} bullet(s) from {len(removed_by_file)} file(s)")
+
+
+@cli.command()
+@click.option('--file-budget', type=click.IntRange(min=1),
+              help='Maximum estimated tokens per file (default: compact_file_budget setting)')
+@click.option('--total-budget', type=click.IntRange(min=1),
+              help='Maximum estimated tokens over the pool (default: compact_total_budget setting)')
+@click.option('--threshold', '-t', type=click.FloatRange(0, 1, min_open=True),
+              help='Similarity at which a newer bullet supersedes an older one')
+@click.option('--dry-run', is_flag=True, help='Show what would change without changing files')
+def compact(file_budget, total_budget, threshold, dry_run):
+    """Shrink the shared memory pool.
+
+    Folds "Updates from ..." sections back into the sections they belong to,
+    replaces bullets superseded by a newer near-duplicate, and, with a token
+    budget, evicts the least shared and oldest bullets until the pool fits.
+    Evicted bullets remain in snapshot history.
+
+    Example:
+        claude-multi compact --dry-run
+        claude-multi compact --file-budget 2000 --total-budget 20000
+    """
+    config = Config()
+    memory = _memory_manager(config)
+
+    changed = memory.compact_shared_memory(file_budget, total_budget, threshold, dry_run)
+
+    if not changed:
+        click.echo("[OK] Shared memory is already compact")
+        return
+
+    verb = "Would compact" if dry_run else "Compacted"
+    for rel_path, file in changed.items():
+        click.echo(f"\n  {rel_path}: ~{file.tokens} tokens")
+        if file.folded:
+            click.echo(f"    Folded {file.folded} update section(s)")
+        for removed, kept in file.superseded:
+            if removed.strip() == kept.strip():
+                click.echo(f"    Duplicate: {removed.strip()}")
+            else:
+                click.echo(f"    Superseded: {removed.strip()}")
+                click.echo(f"            by: {kept.strip()}")
+        for line in file.evicted:
+            click.echo(f"    Evicted: {line.strip()}")
+
+    click.echo(f"\n[OK] {verb} {len(changed)} file(s)")
+
+
+@cli.command()
+@click.argument('project_path', type=click.Path(exists=True, file_okay=False), default='.')
+def relevance(project_path):
+    """Show how relevant each topic file is to a project.
+
+    With the relevance_filter setting enabled, only the selected topic files
+    (marked with *) are synced into the project's sessions.
+
+    PROJECT_PATH: Path to the project directory (defaults to current directory)
+
+    Example:
+        claude-multi relevance
+        claude-multi relevance /path/to/project
+    """
+    from .shards import subscribed_shards
+
+    config = Config()
+    memory = _memory_manager(config)
+
+    project_path = Path(project_path).resolve()
+    # Sessions are named after their directory unless started with --name
+    shards = subscribed_shards(config, project_path, project_path.name)
+    ranking = memory.relevance.rank(project_path, shards)
+    if not ranking:
+        click.echo("No topic files in the shared pool.")
+        return
+
+    selected = memory.relevance.select(project_path, config.get("relevance_top_k"),
+                                       config.get("relevance_budget"), shards) or set()
+    click.echo()
+    for rel_path, score in ranking:
+        marker = "*" if rel_path in selected else " "
+        click.echo(f"  {marker} {score:8.3f}  {rel_path}")
+    click.echo()
+    if not config.get("relevance_filter", False):
+        click.echo("relevance_filter is off: every topic file is synced")
+
+
+@cli.command()
+@click.option('--stop', is_flag=True, help='Stop the running daemon')
+@click.option('--status', 'show_status', is_flag=True, help='Show whether the daemon is running')
+def daemon(stop, show_status):
+    """Run the sync daemon in the foreground.
+
+    While the daemon runs, sessions and commands send syncs, status and
+    search requests to it over ~/.claude-multi/daemon.sock instead of each
+    rescanning the shared pool; without it they work directly on the files.
+
+    Example:
+        claude-multi daemon &
+        claude-multi daemon --status
+        claude-multi daemon --stop
+    """
+    from .daemon import PROTOCOL_VERSION, DaemonClient, DaemonUnavailable, MemoryDaemon, daemon_supported
+
+    config = Config()
+    if not daemon_supported():
+        click.echo("[!] The daemon needs Unix domain sockets, which this platform does not support")
+        raise SystemExit(1)
+
+    client = DaemonClient(config.daemon_socket)
+    if stop or show_status:
+        try:
+            info = client.request("shutdown" if stop else "ping")
+        except DaemonUnavailable:
+            click.echo("Daemon is not running.")
+            return
+        if stop:
+            click.echo("[OK] Daemon stopping")
+        else:
+            click.echo(f"Daemon running (pid {info['pid']}, since {info['started']}, "
+                       f"{info['requests']} requests)")
+            if info.get("version") != PROTOCOL_VERSION:
+                click.echo("[!] It is from another version of claude-multi and is not used; "
+                           "restart it (claude-multi daemon --stop)")
+        return
+
+    from .memory import MemoryManager
+    server = MemoryDaemon(MemoryManager(config, use_daemon=False), config.daemon_socket)
+    click.echo(f"[>>] Daemon listening on {config.daemon_socket} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except RuntimeError as e:
+        click.echo(f"[!] {e}")
+        raise SystemExit(1)
+    except KeyboardInterrupt:
+        pass
+    click.echo("[OK] Daemon stopped")
+
+
+def _remote_dir(config: Config, remote) -> Path:
+    """Resolve the REMOTE argument of push/pull, falling back to the remote setting."""
+    remote = remote or config.get("remote")
+    if not remote:
+        raise click.UsageError("No remote given and no 'remote' setting configured")
+    return Path(remote).expanduser().resolve()
+
+
+def _print_transfer(verb: str, stats):
+    click.echo(f"[OK] {verb} {stats.files_copied + stats.files_merged} of {stats.files_checked} file(s), "
+               f"{stats.bytes_transferred} bytes transferred")
+
+
+@cli.command()
+@click.argument('remote', required=False)
+def push(remote):
+    """Send shared memory changes to a remote directory.
+
+    REMOTE is a directory on a mounted share or any other path reachable
+    from every machine (defaults to the 'remote' setting). Files that were
+    also changed on the remote are merged first, and only changed blocks
+    are written.
+
+    Example:
+        claude-multi push /mnt/team/claude-multi
+        claude-multi config --key remote --value /mnt/team/claude-multi
+        claude-multi push
+    """
+    config = Config()
+    memory = _memory_manager(config)
+    stats = memory.push_to_remote(_remote_dir(config, remote))
+    _print_transfer("Pushed", stats)
+
+
+@cli.command()
+@click.argument('remote', required=False)
+def pull(remote):
+    """Merge shared memory changes from a remote directory.
+
+    Incoming files are merged into the shared pool the same way session
+    memory is, so nothing learned locally is lost. Only blocks not already
+    known from the last exchange are read.
+
+    Example:
+        claude-multi pull /mnt/team/claude-multi
+    """
+    config = Config()
+    memory = _memory_manager(config)
+    remote_dir = _remote_dir(config, remote)
+    if not remote_dir.is_dir():
+        raise click.BadParameter(f"Remote directory does not exist: {remote_dir}", param_hint="REMOTE")
+    stats = memory.pull_from_remote(remote_dir)
+    _print_transfer("Pulled", stats)
+
+
+@cli.command()
+@click.argument('path', required=False)
+@click.option('--session', '-s', 'session_name', help='Only show changes from this session')
+@click.option('--limit', '-l', default=20, show_default=True, help='Maximum number of commits to show')
+@click.option('--check', is_flag=True, help='Rebuild every file from the journal and compare')
+@click.option('--rebuild', is_flag=True, help='Rebuild every file from the journal, replacing files that differ')
+def journal(path, session_name, limit, check, rebuild):
+    """Show the journal of changes to the shared pool.
+
+    Every sync from a session is journaled as the bullets it added,
+    modified or removed per section; PATH (relative to the shared pool,
+    e.g. "python/testing.md") limits the log to one file. With --check or
+    --rebuild, every file is rebuilt from its latest checkpoint and the
+    commits after it.
+
+    Example:
+        claude-multi journal CLAUDE.md --session api
+        claude-multi journal --check
+    """
+    config = Config()
+    memory = _memory_manager(config)
+
+    if memory.journal is None:
+        click.echo("[!] The journal is disabled (journal setting)")
+        return
+
+    if check or rebuild:
+        results = memory.rebuild_from_journal(write=rebuild)
+        if not results:
+            click.echo("[!] Nothing journaled yet")
+            return
+        for rel_path, matches in results.items():
+            if matches is None:
+                click.echo(f"  [!] {rel_path}: no checkpoint")
+            elif not matches:
+                click.echo(f"  [>>] {rel_path}: {'rebuilt' if rebuild else 'differs from the journal'}")
+        differing = sum(1 for matches in results.values() if matches is False)
+        verb = "Rebuilt" if rebuild else "Found"
+        click.echo(f"\n[OK] {verb} {differing} differing file(s) of {len(results)}")
+        return
+
+    commits = memory.journal_history(path, session_name)
+    if not commits:
+        click.echo("[!] No journaled changes found")
+        return
+
+    for commit in commits[:limit]:
+        origin = commit["session"] or "unknown"
+        click.echo(f"\n[>>] {commit['time']}  {commit['path']}  ({origin})")
+        for op in commit["ops"]:
+            section = " > ".join(header.strip() for header in op["section"]) or "(top)"
+            if op["op"] == "modify":
+                click.echo(f"    ~ {section}: {op['old'].strip()} -> {op['lines'][0].strip()}")
+            else:
+                marker = "+" if op["op"] == "add" else "-"
+                click.echo(f"    {marker} {section}: {op['lines'][0].strip()}")
+    if len(commits) > limit:
+        click.echo(f"\n... and {len(commits) - limit} older commit(s)")
+
+
+@cli.command()
+@click.argument('project_path', type=click.Path(exists=True, file_okay=False), required=False)
+@click.option('--dry-run', is_flag=True, help='Show what would be staged without changing anything')
+def mine(project_path, dry_run):
+    """Stage learnings from Claude Code session transcripts into shared memory.
+
+    Only the lines added to each transcript since the last run are read.
+    Things you asked Claude to remember are staged right away; corrections
+    (replies to Claude such as "no, use ..." or "don't ...") once the same
+    one has come up transcript_correction_threshold times.
+
+    PROJECT_PATH: Only mine this project's transcripts (defaults to every project)
+
+    Example:
+        claude-multi mine
+        claude-multi mine /path/to/project --dry-run
+    """
+    config = Config()
+    memory = _memory_manager(config)
+
+    project_dirs = None
+    if project_path:
+        session_manager = _session_manager(config, memory)
+        project_dirs = [session_manager._get_project_memory_path(Path(project_path).resolve())]
+
+    result = memory.mine_transcripts(project_dirs, dry_run)
+    click.echo(f"[OK] Read {result.bytes_read / 1024:.1f} KB of new transcript lines "
+               f"from {result.files_read} of {result.files_checked} transcript(s)")
+    if not result.learnings:
+        click.echo("No new learnings found.")
+        return
+
+    verb = "Would stage" if dry_run else "Staged"
+    click.echo(f"\n{verb} {len(result.learnings)} learning(s) into "
+               f"{config.get('transcript_memory_file', 'MEMORY.md')}:")
+    for kind, statement in result.learnings:
+        click.echo(f"  [{kind}] {statement}")
+
+
+def _snapshot(memory, session, snapshot_id):
+    """Look up a snapshot for the restore and diff commands, or fail with a usage error."""
+    snapshot = memory.find_snapshot(session, snapshot_id)
+    if snapshot is None:
+        history = memory.get_session_history(session)
+        if not history:
+            raise click.BadParameter(f"No snapshots of session '{session}'", param_hint="SESSION")
+        available = ", ".join(path.stem for path in history[:5])
+        raise click.BadParameter(f"No snapshot '{snapshot_id}' (latest: {available})", param_hint="SNAPSHOT")
+    return snapshot
+
+
+@cli.command()
+@click.argument('session')
+@click.argument('snapshot_id', metavar='[SNAPSHOT]', required=False)
+@click.option('--file', '-f', 'rel_path', help='Only restore this file (relative to the memory directory)')
+@click.option('--output', '-o', type=click.Path(file_okay=False),
+              help="Directory to restore into (default: the session's memory directory)")
+def restore(session, snapshot_id, rel_path, output):
+    """Restore a session's memory files from a snapshot.
+
+    SNAPSHOT is a snapshot ID, its timestamp (e.g. 20240214_143022;
+    default: the latest). Restored files replace the current ones; the next sync
+    merges them back into the shared pool.
+
+    Example:
+        claude-multi restore myapp 20240214_143022
+        claude-multi restore myapp --file MEMORY.md --output /tmp/old-memory
+    """
+    config = Config()
+    memory = _memory_manager(config)
+    snapshot = _snapshot(memory, session, snapshot_id)
+
+    if output:
+        target_dir = Path(output)
+    else:
+        target_dir = memory.session_memory_dir(session)
+        if target_dir is None:
+            raise click.UsageError(f"No project known for session '{session}'; use --output")
+
+    try:
+        restored = memory.restore_snapshot(snapshot, target_dir, rel_path)
+    except KeyError:
+        raise click.BadParameter(f"{rel_path} is not part of snapshot {snapshot.stem}", param_hint="--file")
+    for name in restored:
+        click.echo(f"  [>>] {name}")
+    click.echo(f"[OK] Restored {len(restored)} file(s) from {session}@{snapshot.stem} to {target_dir}")
+
+
+@cli.command()
+@click.argument('session')
+@click.argument('old', metavar='[OLD]', required=False)
+@click.argument('new', metavar='[NEW]', required=False)
+@click.option('--file', '-f', 'rel_path', help='Only compare this file')
+def diff(session, old, new, rel_path):
+    """Show what changed in a session's memory between two snapshots.
+
+    OLD and NEW are snapshot IDs (default: the two latest snapshots; with
+    only OLD, it is compared with the latest).
+
+    Example:
+        claude-multi diff myapp
+        claude-multi diff myapp 20240214_143022 --file MEMORY.md
+    """
+    import difflib
+
+    config = Config()
+    memory = _memory_manager(config)
+
+    history = memory.get_session_history(session)
+    if not history:
+        raise click.BadParameter(f"No snapshots of session '{session}'", param_hint="SESSION")
+    new_snapshot = _snapshot(memory, session, new)
+    if old is None:
+        older = [path for path in history if path.stem < new_snapshot.stem]
+        if not older:
+            click.echo(f"[!] {session}@{new_snapshot.stem} is the session's first snapshot")
+            return
+        old_snapshot = older[0]
+    else:
+        old_snapshot = _snapshot(memory, session, old)
+
+    old_files = memory.get_snapshot(old_snapshot)["files"]
+    new_files = memory.get_snapshot(new_snapshot)["files"]
+    names = sorted(set(old_files) | set(new_files))
+    if rel_path is not None:
+        names = [rel_path]
+
+    changed = 0
+    for name in names:
+        old_entry, new_entry = old_files.get(name), new_files.get(name)
+        if old_entry is not None and new_entry is not None and old_entry["hash"] == new_entry["hash"]:
+            continue
+        before = memory.read_snapshot_file(old_snapshot, name) if old_entry else b""
+        after = memory.read_snapshot_file(new_snapshot, name) if new_entry else b""
+        lines = difflib.unified_diff(
+            before.decode('utf-8', errors='replace').splitlines(keepends=True),
+            after.decode('utf-8', errors='replace').splitlines(keepends=True),
+            f"{old_snapshot.stem}/{name}", f"{new_snapshot.stem}/{name}")
+        click.echo(''.join(lines), nl=False)
+        changed += 1
+
+    click.echo(f"[OK] {changed} file(s) changed between {old_snapshot.stem} and {new_snapshot.stem}")
+
+
+@cli.command('migrate-snapshots')
+def migrate_snapshots():
+    """Convert old snapshot directories into deduplicated snapshots.
+
+    Older versions stored every sync as a full copy under
+    ~/.claude-multi/sessions/<name>/<timestamp>/. This moves their contents
+    into the shared object store and replaces each directory with a manifest.
+    File versions stored in full are then converted into deltas against
+    the previous snapshot.
+    """
+    config = Config()
+    memory = _memory_manager(config)
+
+    migrated = memory.migrate_snapshots()
+    click.echo(f"[OK] Migrated {migrated} snapshot(s)")
+    repacked = memory.repack_snapshots()
+    click.echo(f"[OK] Stored {repacked} file version(s) as deltas")
+
+
+@cli.command('migrate-shards')
+@click.option('--shard', '-s', 'specs', multiple=True,
+              help='Shard as NAME=PATTERN[,PATTERN...], in order (NAME alone holds every other file)')
+@click.option('--topics', is_flag=True, help='Make a shard of every top-level topic directory')
+@click.option('--dry-run', is_flag=True, help='Show where every file would go without moving anything')
+def migrate_shards(specs, topics, dry_run):
+    """Split the flat shared pool into namespaced shards.
+
+    Each file moves to the first shard with a matching pattern; a shard
+    named "global" is added for every other file unless a shard without
+    patterns is given. Projects then sync only the shards they subscribe
+    to (see 'claude-multi subscribe'). Stop the daemon and running
+    sessions first.
+
+    Example:
+        claude-multi migrate-shards --topics --dry-run
+        claude-multi migrate-shards -s python=python/*,*.py.md -s team-api=api/*
+    """
+    from .shards import DEFAULT_SHARD, parse_shard_spec, shard_for
+
+    config = Config()
+    memory = _memory_manager(config)
+    if not dry_run and memory.daemon is not None and memory.daemon.is_running():
+        raise click.UsageError("Stop the daemon first (claude-multi daemon --stop)")
+
+    shards = dict(config.get("shards") or {})
+    for spec in specs:
+        try:
+            name, patterns = parse_shard_spec(spec)
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint="--shard")
+        shards[name] = patterns
+    if topics and not config.get("shards"):
+        for path in sorted(config.shared_memory_dir.iterdir()):
+            if (path.is_dir() and not path.name.startswith('.') and path.name not in shards
+                    and shard_for(f"{path.name}/", {name: patterns for name, patterns in shards.items()
+                                                    if patterns}) is None):
+                shards[path.name] = [f"{path.name}/*"]
+    if all(shards.values()):
+        if DEFAULT_SHARD in shards:
+            raise click.BadParameter(f"No shard holds the remaining files; give {DEFAULT_SHARD} no patterns",
+                                     param_hint="--shard")
+        shards[DEFAULT_SHARD] = []
+    # Shards without patterns only hold what no other shard does
+    shards = {name: patterns for name, patterns in sorted(shards.items(), key=lambda item: not item[1])}
+
+    moves = memory.migrate_to_shards(shards, dry_run)
+
+    click.echo("\n=== Shards ===\n")
+    for name, patterns in shards.items():
+        count = sum(1 for pool_path in moves.values() if pool_path.startswith(f"{name}/"))
+        holds = ", ".join(patterns) if patterns else "every other file"
+        click.echo(f"  • {name} ({holds}): {count} file(s)")
+    click.echo()
+    for rel_path, pool_path in moves.items():
+        click.echo(f"    {rel_path} -> {pool_path}")
+
+    verb = "Would move" if dry_run else "Moved"
+    click.echo(f"\n[OK] {verb} {len(moves)} file(s) into {len(shards)} shard(s)")
+
+
+@cli.command()
+@click.option('--stats', 'show_files', is_flag=True, help='Also count the files and bytes in every shard')
+def shards(show_files):
+    """List the shards of the shared pool and who subscribes to them."""
+    from .walk import walk_tree
+
+    config = Config()
+    shard_defs = config.get("shards") or {}
+    if not shard_defs:
+        click.echo("The shared pool is not sharded (see 'claude-multi migrate-shards').")
+        return
+
+    subscriptions = config.get("subscriptions") or {}
+    click.echo("\n=== Shards ===\n")
+    for name, patterns in shard_defs.items():
+        click.echo(f"  • {name}")
+        click.echo(f"    Holds: {', '.join(patterns) if patterns else 'every other file'}")
+        if show_files:
+            files = walk_tree(config.shared_memory_dir / name, config.get("sync_include", ["*.md"]),
+                              config.get("sync_exclude", []))
+            click.echo(f"    Files: {len(files)} ({sum(stat.st_size for stat in files.values())} bytes)")
+        subscribers = [key for key, names in subscriptions.items() if name in names]
+        click.echo(f"    Subscribers: {', '.join(subscribers) or '-'}")
+    click.echo()
+
+    if "*" not in subscriptions:
+        click.echo("Projects without a subscription sync every shard.")
+    for key, names in subscriptions.items():
+        unknown = [name for name in names if name not in shard_defs]
+        if unknown:
+            click.echo(f"[!] {key} subscribes to unknown shard(s): {', '.join(unknown)}")
+
+
+@cli.command()
+@click.argument('shard_names', metavar='[SHARD]...', nargs=-1)
+@click.option('--project', '-p', type=click.Path(exists=True, file_okay=False),
+              help='Project directory (defaults to the current directory)')
+@click.option('--session', 'session_name', help='Subscribe by session name instead of project directory')
+@click.option('--default', 'default', is_flag=True, help='Set the shards of projects without a subscription')
+@click.option('--clear', is_flag=True, help='Remove the subscription')
+def subscribe(shard_names, project, session_name, default, clear):
+    """Choose the shards a project syncs with.
+
+    Example:
+        claude-multi subscribe global python
+        claude-multi subscribe global team-api --project ~/api
+        claude-multi subscribe global --default
+        claude-multi subscribe --clear
+    """
+    config = Config()
+    shard_defs = config.get("shards") or {}
+    if not shard_defs:
+        raise click.UsageError("The shared pool is not sharded (see 'claude-multi migrate-shards')")
+    unknown = [name for name in shard_names if name not in shard_defs]
+    if unknown:
+        raise click.BadParameter(f"Unknown shard(s): {', '.join(unknown)}", param_hint="SHARD")
+    if not shard_names and not clear:
+        raise click.UsageError("Give the shards to subscribe to, or --clear")
+
+    if default:
+        key = "*"
+    elif session_name:
+        key = session_name
+    else:
+        key = str(Path(project or '.').resolve())
+
+    subscriptions = dict(config.get("subscriptions") or {})
+    if clear:
+        subscriptions.pop(key, None)
+        click.echo(f"[OK] Removed the subscription of {key}")
+    else:
+        subscriptions[key] = list(shard_names)
+        click.echo(f"[OK] {key} syncs with: {', '.join(shard_names)}")
+    config.set("subscriptions", subscriptions)
+
+    from .daemon import DaemonClient
+    if DaemonClient(config.daemon_socket).is_running():
+        click.echo("[!] Restart the daemon for it to use the new subscription")
+
+
+@cli.command()
+@click.option('--rebuild-index', is_flag=True, help='Rebuild the shared file index from disk first')
+def status(rebuild_index):
     """Show status of shared memory pool."""
     config = Config()
-    memory = MemoryManager(config)
+    memory = _memory_manager(config)
+
+    if rebuild_index:
+        memory.rebuild_index()
 
     summary = memory.get_shared_memory_summary()
 
@@ -160,11 +882,17 @@ def config(key, value, add_instructions, remove_instructions):
 
     elif key and value:
         # Set configuration
-        # Convert string boolean values
+        # Convert booleans, numbers, null and lists (e.g. near_duplicate_threshold:
+        # 0.85, sync_exclude: '["drafts", "*.tmp.md"]'); anything else is a string
+        import json
         if value.lower() in ('true', 'false'):
             value = value.lower() == 'true'
-        elif value.isdigit():
-            value = int(value)
+        else:
+            try:
+                value = json.loads(value)
+            except ValueError as e:
+                if value.lstrip().startswith(('[', '{')):
+                    raise click.BadParameter(f"Not valid JSON: {e}", param_hint="--value")
 
         cfg.set(key, value)
         click.echo(f"[OK] Set {key} = {value}")
@@ -200,6 +928,9 @@ def config(key, value, add_instructions, remove_instructions):
 def init():
     """Initialize Claude Multi configuration and directories."""
     config = Config()
+    config.ensure_directories()
+    if not config.config_file.exists():
+        config.save()
 
     click.echo("\n>>> Initializing Claude Multi...\n")
     click.echo(f"  Config directory: {config.config_dir}")
@@ -237,6 +968,8 @@ def init():
 
         click.echo(f"[OK] Created default CLAUDE.md")
 
+    _memory_manager(config).rebuild_index()
+
     click.echo("\n[OK] Claude Multi initialized successfully!")
     click.echo("\nNext steps:")
     click.echo("  1. Run 'claude-multi start <project-path>' to start a session")
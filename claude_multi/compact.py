@@ -0,0 +1,232 @@
+"""Compaction of shared memory files.
+
+Older versions merged new learnings into a timestamped ``## Updates from
+...`` section at the end of the file, and merges only ever add lines, so
+memory files grow without bound. Compaction:
+
+1. folds every update section back into the section its lines belong to
+   (the section sharing the most words with a line, or the section the
+   update block was appended under),
+2. drops superseded bullets: of two near-duplicate bullets the newer one is
+   kept, in the older one's place,
+3. optionally enforces per-file and total token budgets by evicting bullets,
+   least shared across sessions first, then oldest first.
+
+Evicted bullets are still available in snapshot history.
+"""
+
+import re
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from .merge import (HEADER_RE, Section, block_key, insert_blocks, is_bullet, normalize_line,
+                    parse_sections, render_sections)
+from .neardup import NearDuplicateIndex
+from .search import tokenize
+
+UPDATE_TITLE_RE = re.compile(r'^updates from (\d{4}-\d{2}-\d{2}(?: \d{2}:\d{2})?)$', re.IGNORECASE)
+
+# Bullets at least this similar are treated as versions of the same fact
+# when near_duplicate_threshold is not set
+SUPERSEDE_THRESHOLD = 0.8
+
+# Share of a line's words that must appear in a section for the line to be folded into it
+FOLD_MIN_OVERLAP = 0.5
+
+# Age of content that did not come from an update section (older than any update)
+ORIGINAL = ""
+
+
+def estimate_tokens(chars: int) -> int:
+    """Estimate the number of tokens in text of a given length (about 4 characters per token)."""
+    return (chars + 3) // 4
+
+
+def update_timestamp(section: Section) -> Optional[str]:
+    """Get the timestamp of an ``Updates from ...`` section, or None for other sections."""
+    if section.header is None:
+        return None
+    match = UPDATE_TITLE_RE.match(' '.join(HEADER_RE.match(section.header).group(2).split()))
+    return match.group(1) if match else None
+
+
+class CompactedFile:
+    """One memory file being compacted.
+
+    Blocks are tracked by identity, so the age of a bullet (the timestamp of
+    the update section it came from) survives folding.
+    """
+
+    def __init__(self, rel_path: str, content: str):
+        self.rel_path = rel_path
+        self.original = content
+        self.sections = parse_sections(content)
+        self.ages: Dict[int, str] = {}
+        self.folded = 0
+        self.superseded: List[Tuple[str, str]] = []
+        self.evicted: List[str] = []
+        self._evicted_blocks: Set[int] = set()
+        self.chars = len(content)
+
+    def age(self, block: List[str]) -> str:
+        return self.ages.get(id(block), ORIGINAL)
+
+    def fold_updates(self):
+        """Move the content of update sections into the sections it belongs to."""
+        regular = []
+        vocabularies: List[Set[str]] = []
+        updates = []
+        for section in self.sections:
+            timestamp = update_timestamp(section)
+            if timestamp is not None:
+                updates.append((section, timestamp, regular[-1] if regular else self.sections[0]))
+                continue
+            regular.append(section)
+            words = set(tokenize(section.header or ""))
+            for block in section.blocks:
+                words.update(tokenize(' '.join(block)))
+            vocabularies.append(words)
+
+        for section, timestamp, fallback in updates:
+            for block in section.blocks:
+                if not block_key(block):
+                    continue
+                words = set(tokenize(' '.join(block)))
+                best, best_overlap = fallback, FOLD_MIN_OVERLAP
+                for candidate, vocabulary in zip(regular, vocabularies):
+                    if candidate.header is None or not words:
+                        continue
+                    overlap = len(words & vocabulary) / len(words)
+                    if overlap > best_overlap:
+                        best, best_overlap = candidate, overlap
+                insert_blocks(best, [block])
+                self.ages[id(block)] = timestamp
+            self.folded += 1
+
+        if updates:
+            self.sections = regular
+
+    def drop_superseded(self, threshold: float):
+        """Remove duplicate bullets and keep only the newest of near-duplicate bullets."""
+        near_duplicates = NearDuplicateIndex(threshold)
+        kept_blocks: Dict[str, List[str]] = {}
+
+        for section in self.sections:
+            kept = []
+            for block in section.blocks:
+                if not (len(block) == 1 and is_bullet(block[0])):
+                    kept.append(block)
+                    continue
+
+                key = normalize_line(block[0])
+                if key in kept_blocks:
+                    self.superseded.append((block[0], kept_blocks[key][0]))
+                    continue
+
+                match = near_duplicates.find(key)
+                if match is None:
+                    kept_blocks[key] = block
+                    near_duplicates.add(key)
+                    kept.append(block)
+                    continue
+
+                earlier = kept_blocks[match]
+                if self.age(block) >= self.age(earlier):
+                    # Newer wording replaces the older bullet where it stood
+                    self.superseded.append((earlier[0], block[0]))
+                    earlier[0] = block[0]
+                    self.ages[id(earlier)] = self.age(block)
+                    kept_blocks[key] = earlier
+                    near_duplicates.add(key)
+                else:
+                    self.superseded.append((block[0], earlier[0]))
+            section.blocks = kept
+
+        self.chars = len(self.render())
+
+    def bullets(self) -> Iterator[Tuple[int, List[str]]]:
+        """Yield (position in file, block) for every bullet."""
+        position = 0
+        for section in self.sections:
+            for block in section.blocks:
+                if len(block) == 1 and is_bullet(block[0]):
+                    yield position, block
+                position += 1
+
+    def evict(self, block: List[str]):
+        """Remove a bullet (from the rendered output)."""
+        self._evicted_blocks.add(id(block))
+        self.evicted.append(block[0])
+        self.chars -= len(block[0]) + 1
+
+    @property
+    def tokens(self) -> int:
+        return estimate_tokens(self.chars)
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.folded or self.superseded or self.evicted)
+
+    def render(self) -> str:
+        if self._evicted_blocks:
+            for section in self.sections:
+                section.blocks = [block for block in section.blocks if id(block) not in self._evicted_blocks]
+            self._evicted_blocks.clear()
+        return render_sections(self.sections)
+
+
+def _eviction_order(files: List[CompactedFile], share_counts: Dict[str, int]):
+    """List (file, block) in eviction order: least shared, then oldest, then by position."""
+    candidates = []
+    for file in files:
+        for position, block in file.bullets():
+            key = normalize_line(block[0])
+            candidates.append((share_counts.get(key, 0), file.age(block), file.rel_path, position,
+                               file, block))
+    candidates.sort(key=lambda candidate: candidate[:4])
+    return [candidate[4:] for candidate in candidates]
+
+
+def compact_files(contents: Dict[str, str], threshold: Optional[float] = None,
+                  file_budget: Optional[int] = None, total_budget: Optional[int] = None,
+                  share_counts: Optional[Dict[str, int]] = None) -> Dict[str, CompactedFile]:
+    """Compact a set of memory files.
+
+    Args:
+        contents: File contents keyed by relative path
+        threshold: Similarity at which bullets supersede each other
+        file_budget: Maximum estimated tokens per file
+        total_budget: Maximum estimated tokens over all files
+        share_counts: Number of sessions that have each (normalized) bullet;
+            less shared bullets are evicted first
+
+    Returns:
+        The compacted files, keyed like ``contents``
+    """
+    share_counts = share_counts or {}
+    files = {}
+    for rel_path, content in sorted(contents.items()):
+        file = CompactedFile(rel_path, content)
+        file.fold_updates()
+        file.drop_superseded(threshold or SUPERSEDE_THRESHOLD)
+        files[rel_path] = file
+
+    if file_budget is not None:
+        for file in files.values():
+            if file.tokens <= file_budget:
+                continue
+            for _file, block in _eviction_order([file], share_counts):
+                if file.tokens <= file_budget:
+                    break
+                file.evict(block)
+
+    if total_budget is not None:
+        total = sum(file.tokens for file in files.values())
+        if total > total_budget:
+            for file, block in _eviction_order(list(files.values()), share_counts):
+                if total <= total_budget:
+                    break
+                before = file.tokens
+                file.evict(block)
+                total -= before - file.tokens
+
+    return files
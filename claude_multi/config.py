@@ -1,10 +1,51 @@
 """Configuration management for Claude Multi."""
 
 import os
+import copy
 from pathlib import Path
 from typing import Optional
 import json
 
+from .locking import FileLock, atomic_write
+
+
+DEFAULT_SETTINGS = {
+    "auto_sync": True,
+    "sync_on_start": True,
+    "fast_start": True,  # launch Claude Code while the start sync finishes in the background
+    "sync_on_end": True,
+    "watch_interval": 30,  # seconds
+    "watch_debounce": 2,  # seconds of quiet before a live sync
+    "inject_instructions": True,  # Inject CLAUDE.md before sessions
+    "instruction_files": [],  # Additional CLAUDE.md files to include
+    "compress_snapshots": True,  # zlib-compress snapshot objects
+    "snapshot_keyframe_interval": 32,  # versions per delta chain in snapshot history (0: no deltas)
+    "lock_timeout": 30,  # seconds to wait for a shared file lock
+    "sync_workers": None,  # concurrent syncs for sync --all and start-many (None: twice the CPUs, up to 8)
+    "near_duplicate_threshold": None,  # e.g. 0.85 to skip near-duplicate bullets
+    "streaming_merge_threshold": 8 * 1024 * 1024,  # bytes; larger files are merged as streams
+    "compact_file_budget": None,  # estimated tokens per shared file kept by compaction
+    "compact_total_budget": None,  # estimated tokens over the whole pool kept by compaction
+    "compact_after_sync": False,  # compact the pool after syncing a session back
+    "relevance_filter": False,  # only sync topic files relevant to the project
+    "relevance_top_k": 20,  # topic files synced per project with relevance_filter
+    "relevance_budget": None,  # estimated tokens of topic files synced per project
+    "use_daemon": True,  # send syncs, status and search to the daemon when it is running
+    "remote": None,  # default directory for push/pull
+    "journal": True,  # record session changes as journal commits and apply them to the pool
+    "journal_checkpoint_interval": 200,  # commits applied to a file between checkpoints
+    "propagate_session_removals": False,  # apply bullets removed in a session to the pool
+    "sync_include": ["*.md"],  # glob patterns of memory files synced (at any depth)
+    "sync_exclude": [],  # glob patterns of memory files and directories not synced
+    # Stage learnings from a project's transcripts after syncing it back; heuristic,
+    # so corrections meant for one task can reach every project's memory
+    "mine_transcripts": False,
+    "transcript_correction_threshold": 2,  # times a correction is seen before it is staged
+    "transcript_memory_file": "MEMORY.md",  # shared file learnings from transcripts are merged into
+    "shards": {},  # shard name -> patterns of the memory files it holds (empty: flat pool)
+    "subscriptions": {}  # project directory, session name or "*" -> shards it syncs with
+}
+
 
 class Config:
     """Manages configuration for Claude Multi."""
@@ -13,47 +54,71 @@ class Config:
         self.config_dir = config_dir or Path.home() / ".claude-multi"
         self.shared_memory_dir = self.config_dir / "shared"
         self.sessions_dir = self.config_dir / "sessions"
+        self.manifests_dir = self.config_dir / "manifests"
+        self.objects_dir = self.config_dir / "objects"
+        self.locks_dir = self.config_dir / "locks"
+        self.index_db = self.config_dir / "index.db"
+        self.search_db = self.config_dir / "search.db"
+        self.instructions_cache_dir = self.config_dir / "instructions"
+        self.relevance_dir = self.config_dir / "relevance"
+        self.daemon_socket = self.config_dir / "daemon.sock"
+        self.remotes_dir = self.config_dir / "remotes"
+        self.journal_dir = self.config_dir / "journal"
+        self.transcripts_file = self.config_dir / "transcripts.json"
         self.config_file = self.config_dir / "config.json"
         self.shared_claude_md = self.shared_memory_dir / "CLAUDE.md"
 
         self.claude_dir = Path.home() / ".claude"
         self.claude_projects_dir = self.claude_dir / "projects"
 
-        self._ensure_directories()
         self._load_config()
 
-    def _ensure_directories(self):
-        """Create necessary directories if they don't exist."""
+    def ensure_directories(self):
+        """Create the config, shared memory and sessions directories if needed.
+
+        Loading the configuration has no side effects; this is called by the
+        code paths that write into these directories.
+        """
         self.config_dir.mkdir(exist_ok=True)
         self.shared_memory_dir.mkdir(exist_ok=True)
         self.sessions_dir.mkdir(exist_ok=True)
 
     def _load_config(self):
-        """Load configuration from file."""
+        """Load configuration from file, falling back to the defaults.
+
+        Settings missing from the file (e.g. ones added in a newer version)
+        take their default values. Nothing is written until a setting is
+        changed or :meth:`save` is called.
+        """
+        self.settings = copy.deepcopy(DEFAULT_SETTINGS)
         if self.config_file.exists():
-            with open(self.config_file, 'r') as f:
-                self.settings = json.load(f)
-        else:
-            self.settings = {
-                "auto_sync": True,
-                "sync_on_start": True,
-                "sync_on_end": True,
-                "watch_interval": 30,  # seconds
-                "inject_instructions": True,  # Inject CLAUDE.md before sessions
-                "instruction_files": []  # Additional CLAUDE.md files to include
-            }
-            self._save_config()
-
-    def _save_config(self):
+            self.settings.update(self._read_settings())
+
+    def _read_settings(self) -> dict:
+        """Read settings from the config file."""
+        with open(self.config_file, 'r') as f:
+            return json.load(f)
+
+    def _lock(self) -> FileLock:
+        """Get the lock guarding config.json."""
+        return FileLock(self.locks_dir / "config.lock")
+
+    def save(self):
         """Save configuration to file."""
-        with open(self.config_file, 'w') as f:
-            json.dump(self.settings, indent=2, fp=f)
+        with self._lock():
+            atomic_write(self.config_file, json.dumps(self.settings, indent=2))
 
     def get(self, key: str, default=None):
         """Get configuration value."""
         return self.settings.get(key, default)
 
     def set(self, key: str, value):
-        """Set configuration value."""
-        self.settings[key] = value
-        self._save_config()
+        """Set configuration value.
+
+        The file is re-read under the config lock so settings changed by
+        another process in the meantime are kept.
+        """
+        with self._lock():
+            self._load_config()
+            self.settings[key] = value
+            atomic_write(self.config_file, json.dumps(self.settings, indent=2))
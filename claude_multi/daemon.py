@@ -0,0 +1,309 @@
+"""Optional local daemon serving sync, status and search requests.
+
+Without the daemon every CLI invocation and every session's watcher opens
+the indexes, rescans the shared pool and syncs on its own, coordinating only
+through file locks. A running daemon (``claude-multi daemon``) keeps one
+:class:`~claude_multi.memory.MemoryManager` and the pool's status and search
+state in memory, and runs all syncs one at a time in its own process.
+:class:`~claude_multi.memory.MemoryManager` sends requests to it whenever
+its socket is present and falls back to direct filesystem access otherwise.
+
+The protocol is one JSON object per line over a Unix domain socket
+(``~/.claude-multi/daemon.sock``)::
+
+    {"op": "status"}
+    {"ok": true, "result": {...}}
+
+File locks are still taken by the daemon, so processes that do not use it
+(e.g. started while it was down) stay safe.
+
+The daemon does not hold the parsed pool in memory. Since such processes
+can write the shared files at any time, the files stay the only copy of
+the pool: each sync walks, reads and merges them (and loads the project's
+manifest) from disk just as a direct sync does. What the daemon saves is
+per-command startup and index setup, repeated status and search index
+refreshes, and contention between concurrent syncs.
+"""
+
+import os
+import json
+import signal
+import socket
+import threading
+import socketserver
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, Optional
+
+from .watcher import InotifyBackend, PollingBackend
+
+# Seconds to wait for the daemon to accept a connection before falling back
+CONNECT_TIMEOUT = 1.0
+
+# Bumped when requests or results change; clients only use daemons speaking
+# the same version
+PROTOCOL_VERSION = 1
+
+# Requests any daemon answers, whatever its version
+UNVERSIONED_OPS = ("ping", "shutdown")
+
+
+class DaemonUnavailable(Exception):
+    """The daemon is not running or did not answer; use the filesystem directly."""
+
+
+class DaemonIncompatible(DaemonUnavailable):
+    """The daemon runs another version of claude-multi; restart it to use it again."""
+
+
+class DaemonError(Exception):
+    """The daemon ran the request and it failed."""
+
+
+class _UnsupportedOperation(ValueError):
+    pass
+
+
+def daemon_supported() -> bool:
+    """Check whether Unix domain sockets are available on this platform."""
+    return hasattr(socket, "AF_UNIX")
+
+
+class DaemonClient:
+    """Sends requests to a running daemon."""
+
+    def __init__(self, socket_path: Path):
+        self.socket_path = socket_path
+        self._compatible = False
+
+    def is_running(self) -> bool:
+        """Check whether a daemon answers on the socket."""
+        try:
+            self.request("ping")
+        except DaemonUnavailable:
+            return False
+        return True
+
+    def request(self, op: str, **args):
+        """Run one request on the daemon.
+
+        Returns:
+            The request's result
+
+        Raises:
+            DaemonUnavailable: No daemon is listening (or it went away)
+            DaemonIncompatible: The daemon speaks another protocol version
+                or does not know the request
+            DaemonError: The daemon reported an error
+        """
+        if op not in UNVERSIONED_OPS and not self._compatible:
+            version = self._send("ping", {}).get("version")
+            if version != PROTOCOL_VERSION:
+                raise DaemonIncompatible(f"The daemon on {self.socket_path} speaks protocol version "
+                                         f"{version}, not {PROTOCOL_VERSION}; restart it")
+            self._compatible = True
+        return self._send(op, args)
+
+    def _send(self, op: str, args: Dict):
+        if not daemon_supported() or not self.socket_path.exists():
+            raise DaemonUnavailable(str(self.socket_path))
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(CONNECT_TIMEOUT)
+            sock.connect(str(self.socket_path))
+            # Syncs of large files can take a while once accepted
+            sock.settimeout(None)
+            sock.sendall(json.dumps({"op": op, "args": args}).encode('utf-8') + b"\n")
+            with sock.makefile('rb') as f:
+                line = f.readline()
+        except OSError as e:
+            raise DaemonUnavailable(str(e)) from e
+        finally:
+            sock.close()
+
+        if not line:
+            raise DaemonUnavailable("connection closed without a response")
+        response = json.loads(line)
+        if response.get("unsupported"):
+            raise DaemonIncompatible(response.get("error", f"unknown operation: {op}"))
+        if not response.get("ok"):
+            raise DaemonError(response.get("error", "unknown error"))
+        return response.get("result")
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                result = self.server.daemon.handle(request["op"], request.get("args") or {})
+                response = {"ok": True, "result": result}
+            except _UnsupportedOperation as e:
+                response = {"ok": False, "error": str(e), "unsupported": True}
+            except Exception as e:
+                response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            self.wfile.write(json.dumps(response).encode('utf-8') + b"\n")
+            self.wfile.flush()
+            if response["ok"] and request["op"] == "shutdown":
+                self.server.daemon.shutdown()
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    # server_close() waits for running requests, so a sync is never cut off
+    block_on_close = True
+
+
+class MemoryDaemon:
+    """Serves sync, status and search requests from one long-running process.
+
+    Syncs run one at a time and read the pool from disk. The status summary
+    is kept in memory until a sync changes the pool or a change to the
+    shared directory is seen; with inotify the search index is only
+    refreshed after such a change.
+    """
+
+    def __init__(self, memory_manager, socket_path: Path):
+        self.memory = memory_manager
+        self.socket_path = socket_path
+        self._sync_lock = threading.Lock()
+        self._cache_lock = threading.Lock()
+        self._summary: Optional[Dict] = None
+        # Bumped on every invalidation, so a summary computed while the pool
+        # changed is not cached
+        self._generation = 0
+        self._search_stale = True
+        self._watch_exact = False
+        self._stop = threading.Event()
+        self._server: Optional[_Server] = None
+        self.started = datetime.now()
+        self.requests = 0
+
+    def invalidate(self):
+        """Forget cached pool state after the pool changed."""
+        with self._cache_lock:
+            self._summary = None
+            self._generation += 1
+            self._search_stale = True
+
+    def _watch(self, backend, interval: float):
+        try:
+            while not self._stop.is_set():
+                if backend.wait(interval, self._stop):
+                    self.invalidate()
+        finally:
+            backend.close()
+
+    def _start_watcher(self):
+        roots = {"shared": self.memory.shared_memory_dir}
+        config = self.memory.config
+        patterns = (config.get("sync_include", ["*.md"]), config.get("sync_exclude", []))
+        backend = None
+        if InotifyBackend.available():
+            try:
+                backend = InotifyBackend(roots, *patterns)
+                self._watch_exact = True
+            except OSError:
+                pass
+        if backend is None:
+            backend = PollingBackend(roots, *patterns)
+        interval = self.memory.config.get("watch_interval", 30)
+        threading.Thread(target=self._watch, args=(backend, interval),
+                         name="claude-multi-daemon-watch", daemon=True).start()
+
+    def handle(self, op: str, args: Dict):
+        """Run one request and return its JSON-serializable result."""
+        self.requests += 1
+        if op == "ping":
+            return {"pid": os.getpid(), "started": self.started.isoformat(timespec="seconds"),
+                    "requests": self.requests, "version": PROTOCOL_VERSION}
+
+        if op == "status":
+            with self._cache_lock:
+                summary, generation = self._summary, self._generation
+            if summary is None:
+                summary = self.memory.get_shared_memory_summary()
+                for file in summary["files"]:
+                    file["modified"] = file["modified"].isoformat()
+                if summary["last_updated"] is not None:
+                    summary["last_updated"] = summary["last_updated"].isoformat()
+                with self._cache_lock:
+                    if self._generation == generation:
+                        self._summary = summary
+            return summary
+
+        if op == "sessions":
+            return self.memory.get_session_summaries()
+
+        if op == "search":
+            history = bool(args.get("history"))
+            with self._cache_lock:
+                stale = self._search_stale or not self._watch_exact
+                self._search_stale = False
+            if stale:
+                self.memory.search_index.refresh()
+            if history:
+                self.memory.search_index.refresh_history()
+            return self.memory.search_index.search(args["query"], args.get("limit", 20), history)
+
+        if op in ("sync_to_session", "sync_from_session"):
+            from .memory import SyncStats  # memory imports this module
+            stats = SyncStats()
+            project_path = Path(args["project_path"])
+            with self._sync_lock:
+                if op == "sync_to_session":
+                    working_dir = args.get("working_dir")
+                    self.memory.sync_to_session(project_path, stats,
+                                                Path(working_dir) if working_dir else None)
+                else:
+                    self.memory.sync_from_session(project_path, args["session_name"],
+                                                  args.get("snapshot", True), stats)
+            if stats.files_copied or stats.files_merged:
+                self.invalidate()
+            return vars(stats)
+
+        if op == "shutdown":
+            # The request handler shuts down once the response is sent
+            return {}
+
+        raise _UnsupportedOperation(f"unknown operation: {op}")
+
+    def serve_forever(self):
+        """Listen on the socket until :meth:`shutdown` is called or the process is signalled.
+
+        Raises:
+            RuntimeError: Another daemon is already listening on the socket
+        """
+        if DaemonClient(self.socket_path).is_running():
+            raise RuntimeError(f"A daemon is already running on {self.socket_path}")
+        if self.socket_path.exists():
+            # Left behind by a daemon that did not shut down cleanly
+            self.socket_path.unlink()
+
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        old_umask = os.umask(0o077)
+        try:
+            self._server = _Server(str(self.socket_path), _RequestHandler)
+        finally:
+            os.umask(old_umask)
+        self._server.daemon = self
+
+        previous = signal.signal(signal.SIGTERM, lambda signum, frame: self.shutdown())
+        self._start_watcher()
+        try:
+            self._server.serve_forever()
+        finally:
+            signal.signal(signal.SIGTERM, previous)
+            self._stop.set()
+            self._server.server_close()
+            try:
+                self.socket_path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def shutdown(self):
+        """Stop serving; requests already running are allowed to finish."""
+        if self._server is not None:
+            # shutdown() waits for serve_forever() to return, so it must not
+            # run on the thread serving (a request or the signal handler)
+            threading.Thread(target=self._server.shutdown, daemon=True).start()
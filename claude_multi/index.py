@@ -0,0 +1,204 @@
+"""SQLite index of sessions, snapshots and shared files.
+
+The index is updated as a side effect of syncing so that ``sessions`` and
+``status`` can answer from a single query instead of listing every snapshot
+and stat-ing every shared file. It can always be rebuilt from disk.
+"""
+
+import json
+import sqlite3
+from pathlib import Path
+from typing import Dict, List
+
+from .shards import pool_files
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS sessions (
+    name TEXT PRIMARY KEY,
+    snapshot_count INTEGER NOT NULL DEFAULT 0,
+    latest TEXT,
+    latest_files INTEGER
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    session TEXT NOT NULL,
+    snapshot TEXT NOT NULL,
+    file_count INTEGER NOT NULL,
+    total_size INTEGER NOT NULL,
+    PRIMARY KEY (session, snapshot)
+);
+CREATE TABLE IF NOT EXISTS shared_files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL
+);
+"""
+
+
+class MemoryIndex:
+    """Incrementally maintained index stored at ``~/.claude-multi/index.db``.
+
+    Each call opens its own short-lived connection, so the index can be
+    used from several threads and processes at once. Failed writes mark the
+    index as stale instead of failing the sync; a stale or missing index is
+    rebuilt on the next read.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.path = config.index_db
+        self._schema_ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), timeout=30)
+        if not self._schema_ready:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            self._schema_ready = True
+        return conn
+
+    def _write(self, statements):
+        """Run write statements in one transaction, marking the index stale on failure."""
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    statements(conn)
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            self.invalidate()
+
+    def invalidate(self):
+        """Mark the index as needing a rebuild."""
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute("DELETE FROM meta WHERE key = 'built'")
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            if self.path.exists():
+                self.path.unlink()
+
+    def is_built(self) -> bool:
+        """Check whether the index is complete and up to date."""
+        if not self.path.exists():
+            return False
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'built'").fetchone()
+        finally:
+            conn.close()
+        return row is not None
+
+    def record_shared_file(self, rel_path: str, path: Path):
+        """Record the current size and mtime of a shared memory file."""
+        stat = path.stat()
+
+        def statements(conn):
+            conn.execute("INSERT OR REPLACE INTO shared_files (path, size, mtime) VALUES (?, ?, ?)",
+                         (rel_path, stat.st_size, stat.st_mtime))
+
+        self._write(statements)
+
+    def record_snapshot(self, session_name: str, snapshot_id: str, entries: Dict[str, Dict]):
+        """Record a new snapshot and update its session's summary."""
+        file_count = len(entries)
+        total_size = sum(entry["size"] for entry in entries.values())
+
+        def statements(conn):
+            existing = conn.execute("SELECT 1 FROM snapshots WHERE session = ? AND snapshot = ?",
+                                    (session_name, snapshot_id)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO snapshots (session, snapshot, file_count, total_size) "
+                "VALUES (?, ?, ?, ?)",
+                (session_name, snapshot_id, file_count, total_size))
+            conn.execute("INSERT OR IGNORE INTO sessions (name) VALUES (?)", (session_name,))
+            if existing is None:
+                conn.execute("UPDATE sessions SET snapshot_count = snapshot_count + 1 WHERE name = ?",
+                             (session_name,))
+            conn.execute(
+                "UPDATE sessions SET latest = ?, latest_files = ? "
+                "WHERE name = ? AND (latest IS NULL OR latest <= ?)",
+                (snapshot_id, file_count, session_name, snapshot_id))
+
+        self._write(statements)
+
+    def rebuild(self):
+        """Rebuild the whole index from the shared pool and snapshot manifests."""
+        sessions_dir = self.config.sessions_dir
+
+        def statements(conn):
+            conn.execute("DELETE FROM meta")
+            conn.execute("DELETE FROM sessions")
+            conn.execute("DELETE FROM snapshots")
+            conn.execute("DELETE FROM shared_files")
+
+            for rel_path, stat in pool_files(self.config).items():
+                conn.execute("INSERT INTO shared_files (path, size, mtime) VALUES (?, ?, ?)",
+                             (rel_path, stat.st_size, stat.st_mtime))
+
+            if sessions_dir.exists():
+                for session_dir in sessions_dir.iterdir():
+                    if not session_dir.is_dir():
+                        continue
+                    snapshots = sorted(session_dir.glob("*.json"))
+                    latest_files = None
+                    for manifest_path in snapshots:
+                        with open(manifest_path, 'r', encoding='utf-8') as f:
+                            entries = json.load(f).get("files", {})
+                        latest_files = len(entries)
+                        conn.execute(
+                            "INSERT INTO snapshots (session, snapshot, file_count, total_size) "
+                            "VALUES (?, ?, ?, ?)",
+                            (session_dir.name, manifest_path.stem, len(entries),
+                             sum(entry["size"] for entry in entries.values())))
+                    conn.execute(
+                        "INSERT INTO sessions (name, snapshot_count, latest, latest_files) "
+                        "VALUES (?, ?, ?, ?)",
+                        (session_dir.name, len(snapshots),
+                         snapshots[-1].stem if snapshots else None, latest_files))
+
+            conn.execute("INSERT INTO meta (key, value) VALUES ('built', '1')")
+
+        conn = self._connect()
+        try:
+            with conn:
+                statements(conn)
+        finally:
+            conn.close()
+
+    def _ensure_built(self):
+        if not self.is_built():
+            self.rebuild()
+
+    def sessions(self) -> List[Dict]:
+        """List sessions with their snapshot count and latest snapshot."""
+        self._ensure_built()
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT name, snapshot_count, latest, latest_files FROM sessions ORDER BY name").fetchall()
+        finally:
+            conn.close()
+        return [{"name": name, "snapshot_count": count, "latest": latest, "latest_files": files}
+                for name, count, latest, files in rows]
+
+    def shared_files(self, top_level_only: bool = False) -> List[Dict]:
+        """List indexed shared memory files with their size and mtime."""
+        self._ensure_built()
+        query = "SELECT path, size, mtime FROM shared_files"
+        if top_level_only:
+            query += " WHERE path NOT LIKE '%/%'"
+        conn = self._connect()
+        try:
+            rows = conn.execute(query + " ORDER BY path").fetchall()
+        finally:
+            conn.close()
+        return [{"path": path, "size": size, "mtime": mtime} for path, size, mtime in rows]
@@ -0,0 +1,441 @@
+"""Journal of the changes made to shared memory files.
+
+Every sync from a session is recorded as a commit of operations on
+bullets and other blocks, each naming the section it belongs to by its
+header path::
+
+    {"time": "...", "session": "api", "kind": "ops", "ops": [
+        {"op": "add", "section": ["# Memory", "## Testing"], "lines": ["- Use pytest"]},
+        {"op": "modify", "section": [...], "old": "- Run tox", "lines": ["- Run nox"]},
+        {"op": "remove", "section": [...], "lines": ["- Obsolete"]}]}
+
+The ops are computed from the session's previous version of the file, so a
+commit is proportional to what the session changed. Shared files are the
+materialized view of the journal: a sync appends its commit and then
+applies every pending commit (its own and any appended by concurrent
+sessions meanwhile) in one rewrite. Writes that do not come from a session
+(compaction, dedupe, pulls, full merges) are journaled as ``"kind":
+"write"`` commits for the history and checkpoint the file's new content.
+
+Per shared file the journal keeps::
+
+    journal/<path>.jsonl         commits, one per line
+    journal/<path>.checkpoints   {"offset", "hash", "time"}: content (in the object
+                                 store) as of a byte offset in the commit log
+    journal/<path>.state         {"offset", "hash", "since_checkpoint"}: what the
+                                 shared file currently reflects
+
+A file can be rebuilt from its latest checkpoint by replaying the commits
+after it (:meth:`Journal.replay`). Commits before the latest checkpoint are
+not needed for that, so writing a checkpoint drops them from the log: a
+log holds at most the commits since its file was last checkpointed, and
+replaying it stays cheap however long the pool has been in use.
+"""
+
+import os
+import json
+import hashlib
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .locking import atomic_write, lock_for
+from .merge import (Section, SectionKey, block_key, is_bullet, merge_markdown,
+                    normalize_line, parse_sections, render_sections)
+from .neardup import jaccard, shingles
+
+# Similarity at which a removed bullet and an added bullet of the same
+# section are recorded as one modification
+MODIFY_SIMILARITY = 0.5
+
+Op = Dict
+
+
+def _header_paths(sections: List[Section]) -> Dict[SectionKey, List[str]]:
+    """Map each section key to its header lines, outermost first."""
+    headers: Dict[SectionKey, str] = {}
+    for section in sections:
+        if section.header is not None:
+            headers.setdefault(section.key, section.header)
+    return {key: [headers[key[:depth]] for depth in range(1, len(key) + 1)]
+            for key in headers}
+
+
+def _keyed_blocks(sections: List[Section]) -> Dict[SectionKey, Dict[str, List[str]]]:
+    """Map each section key to its non-blank blocks by dedup key, in document order."""
+    blocks: Dict[SectionKey, Dict[str, List[str]]] = {}
+    for section in sections:
+        section_blocks = blocks.setdefault(section.key, {})
+        for block in section.blocks:
+            key = block_key(block)
+            if key:
+                section_blocks.setdefault(key, block)
+    return blocks
+
+
+def diff_ops(base: str, current: str, removals: bool = True) -> List[Op]:
+    """Compute the operations that turn ``base`` into ``current``.
+
+    Blocks are compared per section by their dedup key. A removed bullet
+    that is similar enough to a bullet added to the same section is
+    recorded as a modification.
+
+    Args:
+        base: Previous content
+        current: New content
+        removals: Whether to record removals (modifications are always recorded)
+
+    Returns:
+        Operations in document order of ``current``, removals of sections
+        that no longer exist last
+    """
+    base_sections = parse_sections(base)
+    current_sections = parse_sections(current)
+    base_blocks = _keyed_blocks(base_sections)
+    current_blocks = _keyed_blocks(current_sections)
+    headers = _header_paths(base_sections)
+    headers.update(_header_paths(current_sections))
+
+    ops: List[Op] = []
+    for key in list(current_blocks) + [key for key in base_blocks if key not in current_blocks]:
+        section = headers.get(key, [])
+        old = base_blocks.get(key, {})
+        new = current_blocks.get(key, {})
+        added = [block for block_id, block in new.items() if block_id not in old]
+        removed = [block for block_id, block in old.items() if block_id not in new]
+
+        for block in removed:
+            if len(block) == 1 and is_bullet(block[0]):
+                similarity = shingles(normalize_line(block[0]))
+                best, best_score = None, MODIFY_SIMILARITY
+                for candidate in added:
+                    if len(candidate) == 1 and is_bullet(candidate[0]):
+                        score = jaccard(similarity, shingles(normalize_line(candidate[0])))
+                        if score >= best_score:
+                            best, best_score = candidate, score
+                if best is not None:
+                    added.remove(best)
+                    ops.append({"op": "modify", "section": section, "old": block[0], "lines": best})
+                    continue
+            if removals:
+                ops.append({"op": "remove", "section": section, "lines": block})
+
+        ops.extend({"op": "add", "section": section, "lines": block} for block in added)
+    return ops
+
+
+def _section_key(headers: List[str]) -> SectionKey:
+    if not headers:
+        return ()
+    return parse_sections('\n'.join(headers))[-1].key
+
+
+def _find_block(sections: List[Section], key: SectionKey, block_id: str,
+                bullet: bool) -> Optional[Tuple[Section, int]]:
+    """Find a block in its section, or (for bullets) anywhere in the file."""
+    candidates = [section for section in sections if section.key == key]
+    if bullet:
+        candidates += [section for section in sections if section.key != key]
+    for section in candidates:
+        if block_id in section.keys:
+            for position, block in enumerate(section.blocks):
+                if block_key(block) == block_id:
+                    return section, position
+    return None
+
+
+def _source_document(adds: List[Op]) -> str:
+    """Build a markdown document holding added blocks under their header paths."""
+    groups: Dict[Tuple[str, ...], List[List[str]]] = {}
+    for op in adds:
+        groups.setdefault(tuple(op["section"]), []).append(op["lines"])
+
+    lines: List[str] = []
+    # The preamble has no header, so it must come before any other group
+    for section in sorted(groups, key=bool):
+        lines.extend(section)
+        if section:
+            lines.append('')
+        for block in groups[section]:
+            lines.extend(block)
+        lines.append('')
+    return '\n'.join(lines)
+
+
+def apply_ops(content: str, ops: List[Op], near_duplicate_threshold: Optional[float] = None) -> str:
+    """Apply one commit of operations to a file.
+
+    Modifications and removals are applied in place first. A modification
+    whose old block is gone becomes an addition; a removal of a block that
+    is gone does nothing. Additions are then merged in with
+    :func:`~claude_multi.merge.merge_markdown`, so they follow the same
+    placement and deduplication rules as a full merge.
+
+    Returns:
+        The new content
+    """
+    adds = [op for op in ops if op["op"] == "add"]
+    edits = [op for op in ops if op["op"] != "add"]
+
+    if edits:
+        sections = parse_sections(content)
+        changed = False
+        for op in edits:
+            old = [op["old"]] if op["op"] == "modify" else op["lines"]
+            old_id = block_key(old)
+            found = _find_block(sections, _section_key(op["section"]), old_id,
+                                len(old) == 1 and is_bullet(old[0]))
+            if found is None:
+                if op["op"] == "modify":
+                    adds.append({"op": "add", "section": op["section"], "lines": op["lines"]})
+                continue
+
+            section, position = found
+            new_id = block_key(op["lines"])
+            if op["op"] == "remove" or new_id in section.keys:
+                del section.blocks[position]
+            else:
+                section.blocks[position] = list(op["lines"])
+                section.keys.add(new_id)
+            if all(block_key(block) != old_id for block in section.blocks):
+                section.keys.discard(old_id)
+            changed = True
+        if changed:
+            content = render_sections(sections)
+
+    if adds:
+        content = merge_markdown(content, _source_document(adds), near_duplicate_threshold)
+    return content
+
+
+def _digest(content: str) -> str:
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+class Journal:
+    """Commit logs and checkpoints of the shared memory files.
+
+    Appending a commit takes a short lock on the file's log only, so
+    sessions can record their changes while another sync holds the shared
+    file's lock. Applying commits, checkpointing and recording direct
+    writes must be done while holding the shared file's lock.
+    """
+
+    def __init__(self, journal_dir: Path, objects, locks_dir: Path,
+                 lock_timeout: float = 30.0, checkpoint_interval: int = 200):
+        self.journal_dir = journal_dir
+        self.objects = objects
+        self.locks_dir = locks_dir
+        self.lock_timeout = lock_timeout
+        self.checkpoint_interval = checkpoint_interval
+
+    def _path(self, rel_path: str, suffix: str) -> Path:
+        return self.journal_dir / f"{rel_path}{suffix}"
+
+    def list_files(self) -> List[str]:
+        """List the relative paths of all journaled files."""
+        if not self.journal_dir.exists():
+            return []
+        return sorted(path.relative_to(self.journal_dir).as_posix()[:-len(".jsonl")]
+                      for path in self.journal_dir.rglob("*.jsonl"))
+
+    def append(self, rel_path: str, ops: List[Op], session: Optional[str] = None,
+               kind: str = "ops") -> int:
+        """Append a commit to a file's log.
+
+        Args:
+            rel_path: Path relative to the shared pool
+            ops: Operations (see :func:`diff_ops`)
+            session: Session the changes came from, or the command that
+                made them (e.g. ``"compact"``)
+            kind: ``"ops"`` for commits to apply, ``"write"`` for changes
+                already written to the file
+
+        Returns:
+            Byte offset of the end of the commit
+        """
+        entry = {"time": datetime.now().isoformat(timespec="seconds"),
+                 "session": session, "kind": kind, "ops": ops}
+        path = self._path(rel_path, ".jsonl")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with lock_for(self.locks_dir, path, self.lock_timeout):
+            with open(path, 'ab') as f:
+                f.write(json.dumps(entry).encode('utf-8') + b"\n")
+                return f.tell()
+
+    def read(self, rel_path: str, start: int = 0) -> Iterator[Tuple[int, Dict]]:
+        """Read the commits after a byte offset.
+
+        A commit still being appended (without its newline yet) is not returned.
+
+        Yields:
+            (byte offset of the end of the commit, commit)
+        """
+        try:
+            f = open(self._path(rel_path, ".jsonl"), 'rb')
+        except FileNotFoundError:
+            return
+        with f:
+            f.seek(start)
+            offset = start
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                offset += len(line)
+                yield offset, json.loads(line)
+
+    def _read_state(self, rel_path: str) -> Optional[Dict]:
+        try:
+            with open(self._path(rel_path, ".state"), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_state(self, rel_path: str, offset: int, content: str, since_checkpoint: int):
+        path = self._path(rel_path, ".state")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write(path, json.dumps({"offset": offset, "hash": _digest(content),
+                                       "since_checkpoint": since_checkpoint}))
+
+    def checkpoints(self, rel_path: str) -> List[Dict]:
+        """List a file's checkpoints, oldest first."""
+        try:
+            with open(self._path(rel_path, ".checkpoints"), 'r', encoding='utf-8') as f:
+                return [json.loads(line) for line in f if line.endswith("\n")]
+        except FileNotFoundError:
+            return []
+
+    def checkpoint(self, rel_path: str, content: str, offset: int):
+        """Record a file's content as of a byte offset in its log, dropping the commits before it.
+
+        The log is cut to the commits after ``offset`` (including any
+        appended meanwhile), offsets in the file's state are shifted to
+        match, and the new checkpoint replaces the previous ones. The
+        checkpoint is therefore always at the start of the log (offset 0).
+        """
+        data = content.encode('utf-8')
+        digest = self.objects.put_bytes(data)
+        log_path = self._path(rel_path, ".jsonl")
+        log_path.parent.mkdir(parents=True, exist_ok=True)
+        with lock_for(self.locks_dir, log_path, self.lock_timeout):
+            if offset:
+                with open(log_path, 'rb') as f:
+                    f.seek(offset)
+                    after = f.read()
+                atomic_write(log_path, after)
+                state = self._read_state(rel_path)
+                if state is not None:
+                    state["offset"] = max(state["offset"] - offset, 0)
+                    atomic_write(self._path(rel_path, ".state"), json.dumps(state))
+            atomic_write(self._path(rel_path, ".checkpoints"),
+                         json.dumps({"offset": 0, "hash": digest,
+                                     "time": datetime.now().isoformat(timespec="seconds")}) + "\n")
+
+    def _applied(self, rel_path: str, content: str) -> Tuple[int, int]:
+        """Get the log offset the file reflects, checkpointing it if it was changed outside the journal.
+
+        Returns:
+            (offset, commits applied since the last checkpoint)
+        """
+        state = self._read_state(rel_path)
+        if state is not None and state["hash"] == _digest(content):
+            return state["offset"], state.get("since_checkpoint", 0)
+
+        if state is not None:
+            offset = state["offset"]
+        else:
+            checkpoints = self.checkpoints(rel_path)
+            offset = checkpoints[-1]["offset"] if checkpoints else 0
+        self.checkpoint(rel_path, content, offset)
+        return 0, 0
+
+    def apply_pending(self, rel_path: str, content: str,
+                      near_duplicate_threshold: Optional[float] = None) -> str:
+        """Apply all commits the file does not reflect yet.
+
+        Args:
+            rel_path: Path relative to the shared pool
+            content: The file's current content
+            near_duplicate_threshold: See :func:`~claude_multi.merge.merge_markdown`
+
+        Returns:
+            The new content (the caller writes it)
+        """
+        offset, since_checkpoint = self._applied(rel_path, content)
+        for end, commit in self.read(rel_path, offset):
+            if commit["kind"] == "ops":
+                content = apply_ops(content, commit["ops"], near_duplicate_threshold)
+                since_checkpoint += 1
+            offset = end
+
+        if since_checkpoint >= self.checkpoint_interval:
+            self.checkpoint(rel_path, content, offset)
+            offset = 0
+            since_checkpoint = 0
+        self._write_state(rel_path, offset, content, since_checkpoint)
+        return content
+
+    def record_write(self, rel_path: str, old: str, new: str, session: Optional[str] = None):
+        """Journal a change already written to a file and checkpoint its new content.
+
+        Commits other sessions appended but nobody applied yet stay pending:
+        the checkpoint is placed before them.
+        """
+        if old == new:
+            return
+        offset, _since = self._applied(rel_path, old)
+        self.append(rel_path, diff_ops(old, new), session, kind="write")
+        self.checkpoint(rel_path, new, offset)
+        self._write_state(rel_path, 0, new, 0)
+
+    def replay(self, rel_path: str,
+               near_duplicate_threshold: Optional[float] = None) -> Optional[Tuple[str, int]]:
+        """Rebuild a file from its latest checkpoint and the commits after it.
+
+        Returns:
+            (the rebuilt content, byte offset of the end of the log it
+            reflects), or None if the file has no checkpoint
+        """
+        checkpoints = self.checkpoints(rel_path)
+        if not checkpoints:
+            return None
+        content = self.objects.get_bytes(checkpoints[-1]["hash"]).decode('utf-8')
+        offset = checkpoints[-1]["offset"]
+        for offset, commit in self.read(rel_path, offset):
+            if commit["kind"] == "ops":
+                content = apply_ops(content, commit["ops"], near_duplicate_threshold)
+        return content, offset
+
+    def mark_applied(self, rel_path: str, content: str, offset: int):
+        """Record that a file was rewritten with content reflecting the log up to ``offset``."""
+        state = self._read_state(rel_path) or {}
+        self._write_state(rel_path, offset, content, state.get("since_checkpoint", 0))
+
+    def move(self, rel_path: str, new_rel_path: str):
+        """Move a file's log, checkpoints and state to a new path (callers hold both files' locks).
+
+        If the new path already has a log, the old path's is dropped instead:
+        the file at the new path is checkpointed with its merged content by
+        the next write.
+        """
+        keep = not self._path(new_rel_path, ".jsonl").exists()
+        for suffix in (".jsonl", ".checkpoints", ".state"):
+            path = self._path(rel_path, suffix)
+            if not path.exists():
+                continue
+            if keep:
+                new_path = self._path(new_rel_path, suffix)
+                new_path.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(path, new_path)
+            else:
+                path.unlink()
+
+    def history(self, rel_path: Optional[str] = None) -> Iterator[Tuple[str, Dict]]:
+        """Iterate over the commits of one file (or of all files, file by file).
+
+        Yields:
+            (relative path, commit)
+        """
+        for path in [rel_path] if rel_path else self.list_files():
+            for _end, commit in self.read(path):
+                yield path, commit
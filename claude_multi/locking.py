@@ -0,0 +1,154 @@
+"""Advisory file locks and atomic writes for the shared memory pool."""
+
+import os
+import sys
+import time
+import shutil
+import hashlib
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional, Union
+
+if sys.platform == 'win32':
+    import msvcrt
+else:
+    import fcntl
+
+
+class LockTimeout(TimeoutError):
+    """Raised when a lock could not be acquired within the retry budget."""
+
+
+class FileLock:
+    """Exclusive advisory lock held on a separate lock file.
+
+    Acquisition is non-blocking and retried with exponential backoff
+    (``initial_delay`` doubling up to ``max_delay``) until ``timeout``
+    seconds have passed, after which :class:`LockTimeout` is raised.
+
+    Locks are taken with ``flock``/``msvcrt.locking`` on a freshly opened
+    file, so they exclude other threads of the same process as well as other
+    processes.
+    """
+
+    def __init__(self, lock_path: Path, timeout: float = 30.0,
+                 initial_delay: float = 0.005, max_delay: float = 0.25):
+        self.lock_path = lock_path
+        self.timeout = timeout
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self._fd: Optional[int] = None
+
+    def _try_lock(self, fd: int) -> bool:
+        try:
+            if sys.platform == 'win32':
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            else:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            return False
+
+    def acquire(self):
+        """Acquire the lock, retrying with backoff."""
+        try:
+            fd = os.open(str(self.lock_path), os.O_RDWR | os.O_CREAT, 0o644)
+        except FileNotFoundError:
+            # Only create the locks directory when it is missing
+            self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+            fd = os.open(str(self.lock_path), os.O_RDWR | os.O_CREAT, 0o644)
+
+        deadline = time.monotonic() + self.timeout
+        delay = self.initial_delay
+        while not self._try_lock(fd):
+            if time.monotonic() >= deadline:
+                os.close(fd)
+                raise LockTimeout(f"Timed out waiting for lock: {self.lock_path}")
+            time.sleep(delay)
+            delay = min(delay * 2, self.max_delay)
+
+        self._fd = fd
+
+    def release(self):
+        """Release the lock."""
+        if self._fd is None:
+            return
+        try:
+            if sys.platform == 'win32':
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+def lock_for(locks_dir: Path, path: Path, timeout: float = 30.0) -> FileLock:
+    """Get the lock guarding a given file.
+
+    Lock files live in ``locks_dir`` (named by a hash of the file's absolute
+    path) so they never show up among the memory files themselves.
+    """
+    name = hashlib.sha1(str(Path(path).absolute()).encode('utf-8')).hexdigest()
+    return FileLock(locks_dir / f"{name}.lock", timeout=timeout)
+
+
+def _temp_path(path: Path) -> Path:
+    return path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+def atomic_write(path: Path, content: Union[str, bytes], encoding: str = 'utf-8'):
+    """Write a file by writing a temporary file next to it and renaming it.
+
+    Readers see either the old or the new content, never a partial write.
+    """
+    tmp_path = _temp_path(path)
+    if isinstance(content, str):
+        content = content.encode(encoding)
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if tmp_path.exists():
+            tmp_path.unlink()
+        raise
+
+
+@contextmanager
+def atomic_writer(path: Path):
+    """Open a temporary binary file that replaces ``path`` when the block exits.
+
+    Used for output that is streamed rather than built in memory. If the
+    block raises, the temporary file is removed and ``path`` is untouched.
+    """
+    tmp_path = _temp_path(path)
+    try:
+        with open(tmp_path, 'wb') as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        if tmp_path.exists():
+            tmp_path.unlink()
+        raise
+
+
+def atomic_copy(source: Path, target: Path):
+    """Copy a file (with metadata) so the target appears atomically."""
+    tmp_path = _temp_path(target)
+    try:
+        shutil.copy2(source, tmp_path)
+        os.replace(tmp_path, target)
+    except BaseException:
+        if tmp_path.exists():
+            tmp_path.unlink()
+        raise
@@ -0,0 +1,110 @@
+"""Per-session sync manifests for incremental memory sync."""
+
+import os
+import json
+import hashlib
+from pathlib import Path
+from typing import Dict, Optional
+
+from .locking import atomic_write
+
+
+def hash_file(path: Path) -> str:
+    """Return the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class SyncManifest:
+    """Records the state of every synced file as of the last sync.
+
+    Each entry is keyed by the file's path relative to the memory root and
+    stores the size, mtime and content hash seen on both the ``shared`` and
+    the ``session`` side. A file only needs to be copied or merged again when
+    one of the two sides no longer matches its recorded state.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.files: Dict[str, Dict[str, Dict]] = {}
+        # Bytes read to compute content hashes, for profiling
+        self.bytes_hashed = 0
+        self._load()
+
+    def _load(self):
+        """Load the manifest from disk, starting empty if it is missing or unreadable."""
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == self.VERSION:
+            self.files = data.get("files", {})
+
+    def save(self):
+        """Persist the manifest."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {"version": self.VERSION, "files": self.files}
+        atomic_write(self.path, json.dumps(data, indent=2, sort_keys=True))
+
+    def is_unchanged(self, rel_path: str, side: str, path: Path,
+                     stat: Optional[os.stat_result] = None) -> bool:
+        """Check whether a file still matches the state recorded for it.
+
+        Size and mtime are compared first; the content hash is only computed
+        when the size matches but the mtime moved (e.g. a touch or a rewrite
+        with identical content).
+
+        Args:
+            rel_path: Path relative to the memory root
+            side: Which copy of the file to check
+            path: The file
+            stat: The file's stat result, if the caller already has it
+        """
+        entry = self.files.get(rel_path, {}).get(side)
+        if entry is None:
+            return False
+
+        if stat is None:
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                return False
+
+        if stat.st_size != entry["size"]:
+            return False
+        if stat.st_mtime_ns == entry["mtime"]:
+            return True
+
+        self.bytes_hashed += stat.st_size
+        if hash_file(path) != entry["hash"]:
+            return False
+
+        # Same content, new mtime: refresh so the next check takes the fast path
+        entry["mtime"] = stat.st_mtime_ns
+        return True
+
+    def record(self, rel_path: str, side: str, path: Path):
+        """Record the current state of a file."""
+        stat = path.stat()
+        self.bytes_hashed += stat.st_size
+        self.files.setdefault(rel_path, {})[side] = {
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+            "hash": hash_file(path),
+        }
+
+    def forget(self, rel_path: str, side: str):
+        """Drop the recorded state of one side of a file."""
+        self.files.get(rel_path, {}).pop(side, None)
+
+    def get(self, rel_path: str, side: str) -> Optional[Dict]:
+        """Get the recorded state of a file, if any."""
+        return self.files.get(rel_path, {}).get(side)
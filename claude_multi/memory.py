@@ -1,69 +1,464 @@
 """Memory synchronization and management."""
 
 import os
-import shutil
+import json
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Set
-import hashlib
+from typing import List, Dict, Optional, Set, Tuple
+
+from .compact import CompactedFile, compact_files
+from .daemon import DaemonClient, DaemonError, DaemonUnavailable
+from .index import MemoryIndex
+from .journal import Journal, diff_ops
+from .locking import FileLock, atomic_copy, atomic_write, atomic_writer, lock_for
+from .manifest import SyncManifest
+from .merge import StreamingMerge, dedupe_markdown, is_bullet, merge_markdown, normalize_line, parse_sections
+from .profiling import Profiler
+from .projects import ProjectRegistry
+from .relevance import RelevanceSelector
+from .replication import RemoteStore, split_known_blocks
+from .search import SearchIndex
+from .shards import is_topic_file, pool_files, shard_for, split_pool_path, subscribed_shards
+from .snapshots import SnapshotStore
+from .transcripts import MiningResult, TranscriptMiner, render_learnings
+from .walk import walk_tree
+
+
+class SyncStats:
+    """Counters collected while syncing one project."""
+
+    def __init__(self):
+        self.files_checked = 0
+        self.files_copied = 0
+        self.files_merged = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.bytes_copied = 0
+        self.bytes_transferred = 0
+
+    def add(self, other: 'SyncStats'):
+        """Add another set of counters to this one."""
+        self.files_checked += other.files_checked
+        self.files_copied += other.files_copied
+        self.files_merged += other.files_merged
+        self.bytes_read += other.bytes_read
+        self.bytes_written += other.bytes_written
+        self.bytes_copied += other.bytes_copied
+        self.bytes_transferred += other.bytes_transferred
 
 
 class MemoryManager:
-    """Manages memory synchronization between sessions."""
+    """Manages memory synchronization between sessions.
+
+    Syncs, status and search requests go to the local daemon when it is
+    running (unless ``use_daemon`` or the ``use_daemon`` setting is off) and
+    are handled directly otherwise, including when the daemon is from
+    another version of claude-multi or a request fails on it.
+    """
 
-    def __init__(self, config):
+    def __init__(self, config, profiler: Optional[Profiler] = None, use_daemon: bool = True):
         self.config = config
+        self.profiler = profiler or Profiler()
+        config.ensure_directories()
         self.shared_memory_dir = config.shared_memory_dir
         self.sessions_dir = config.sessions_dir
+        self.index = MemoryIndex(config)
+        self.snapshots = SnapshotStore(config, self.index)
+        self.search_index = SearchIndex(config, self.snapshots)
+        self.relevance = RelevanceSelector(config, self.search_index)
+        self.journal = None
+        if config.get("journal", True):
+            self.journal = Journal(config.journal_dir, self.snapshots.objects, config.locks_dir,
+                                   config.get("lock_timeout", 30),
+                                   config.get("journal_checkpoint_interval", 200))
+        self.daemon = None
+        if use_daemon and config.get("use_daemon", True):
+            self.daemon = DaemonClient(config.daemon_socket)
+
+    def _get_manifest(self, project_path: Path) -> SyncManifest:
+        """Load the sync manifest for a Claude Code project directory."""
+        return SyncManifest(self.config.manifests_dir / f"{project_path.name}.json")
+
+    def _lock(self, path: Path) -> FileLock:
+        """Get the advisory lock guarding a memory file."""
+        return lock_for(self.config.locks_dir, path, self.config.get("lock_timeout", 30))
 
-    def sync_to_session(self, project_path: Path) -> bool:
+    def _near_duplicate_threshold(self) -> Optional[float]:
+        """Get the ``near_duplicate_threshold`` setting as a number (None when unset).
+
+        Raises:
+            ValueError: If the setting is not a number in (0, 1]
+        """
+        value = self.config.get("near_duplicate_threshold")
+        if value is None:
+            return None
+        try:
+            threshold = float(value)
+        except (TypeError, ValueError):
+            threshold = None
+        if isinstance(value, bool) or threshold is None or not 0 < threshold <= 1:
+            raise ValueError(f"near_duplicate_threshold must be a number in (0, 1], got {value!r}")
+        return threshold
+
+    def _sync_file(self, source: Path, target: Path, rel_path: str,
+                   manifest: SyncManifest, source_side: str, target_side: str,
+                   stats: Optional[SyncStats] = None, session_name: Optional[str] = None,
+                   source_stat: Optional[os.stat_result] = None) -> bool:
+        """Copy or merge a single file, skipping it if neither side changed.
+
+        The target is locked for the whole read-merge-write cycle so
+        concurrent sessions syncing into the same file never lose each
+        other's changes; syncs touching different files do not contend.
+
+        With the journal enabled, a session's changes since the version it
+        last synced are appended to the journal before taking the lock, and
+        the shared file is updated by applying all pending commits (see
+        :mod:`claude_multi.journal`) instead of merging whole files.
+
+        ``source_stat`` is the source's stat result from the directory walk
+        (see :func:`claude_multi.walk.walk_tree`); it is used to tell whether
+        the source changed instead of calling ``stat`` again.
+
+        Returns:
+            True if the file was copied or merged
+        """
+        stats = stats if stats is not None else SyncStats()
+        stats.files_checked += 1
+        source_unchanged = manifest.is_unchanged(rel_path, source_side, source, source_stat)
+
+        journaled = False
+        if self.journal is not None and source_side == "session" and not source_unchanged:
+            with self.profiler.phase("journal"):
+                journaled = self._journal_session_changes(source, rel_path, manifest, session_name,
+                                                          source_stat)
+
+        with self._lock(target):
+            try:
+                target_stat = target.stat()
+            except FileNotFoundError:
+                target_stat = None
+            target_unchanged = (target_stat is not None
+                                and manifest.is_unchanged(rel_path, target_side, target, target_stat))
+            if target_unchanged and source_unchanged:
+                return False
+
+            old_content = None
+            if target_side == "shared" and not journaled:
+                old_content = self._read_for_journal(target)
+            if (target_unchanged and source_side == "shared"
+                    and manifest.get(rel_path, source_side) is not None):
+                # Both sides were in sync and only the pool changed since, so the
+                # session has nothing to contribute: take the pool's version as-is.
+                # This is how removals by compact/dedupe reach sessions (removals
+                # in a session only propagate to the pool through the journal,
+                # with the propagate_session_removals setting).
+                atomic_copy(source, target)
+                size = target.stat().st_size
+                stats.files_copied += 1
+                stats.bytes_copied += size
+                stats.bytes_written += size
+                changed = in_sync = True
+            elif target_stat is not None:
+                source_size = source_stat.st_size if source_stat is not None else source.stat().st_size
+                stats.bytes_read += source_size + target_stat.st_size
+                if journaled:
+                    changed, in_sync = self._apply_journal(source, target, rel_path)
+                else:
+                    changed, in_sync = self._merge_files(source, target)
+                if changed:
+                    stats.files_merged += 1
+                    stats.bytes_written += target.stat().st_size
+            else:
+                atomic_copy(source, target)
+                size = target.stat().st_size
+                stats.files_copied += 1
+                stats.bytes_copied += size
+                stats.bytes_written += size
+                changed = in_sync = True
+
+            manifest.record(rel_path, target_side, target)
+            if target_side == "shared" and changed:
+                self._journal_write(rel_path, old_content, target, session_name)
+                self.index.record_shared_file(rel_path, target)
+                self.search_index.update_file(rel_path, target)
+            if in_sync:
+                manifest.record(rel_path, source_side, source)
+            else:
+                # The target had content the source lacks; leave the source
+                # unrecorded so the next sync in the other direction merges it
+                manifest.forget(rel_path, source_side)
+            if self.journal is not None and (source_side == "session" or in_sync):
+                # The pool now has everything in this version of the session's
+                # file, so the session's next changes are diffed against it
+                session_file = source if source_side == "session" else target
+                previous = manifest.get(rel_path, "journal")
+                manifest.record(rel_path, "journal", session_file)
+                self.snapshots.objects.put_file(session_file, manifest.get(rel_path, "journal")["hash"],
+                                                previous["hash"] if previous else None)
+        return True
+
+    def _journal_session_changes(self, source: Path, rel_path: str, manifest: SyncManifest,
+                                 session_name: Optional[str],
+                                 source_stat: Optional[os.stat_result] = None) -> bool:
+        """Append a session's changes to a file since the version the pool last took from it.
+
+        Returns:
+            False if there is no previous version to diff against (or the
+            file is large enough to be merged as a stream), so the file must
+            be merged in full
+        """
+        entry = manifest.get(rel_path, "journal")
+        if entry is None or not self.snapshots.objects.has(entry["hash"]):
+            return False
+        streaming_threshold = self.config.get("streaming_merge_threshold")
+        size = source_stat.st_size if source_stat is not None else source.stat().st_size
+        if streaming_threshold is not None and size >= streaming_threshold:
+            return False
+
+        base = self.snapshots.objects.get_bytes(entry["hash"]).decode('utf-8', errors='replace')
+        with open(source, 'r', encoding='utf-8') as f:
+            current = f.read()
+        ops = diff_ops(base, current, self.config.get("propagate_session_removals", False))
+        if ops:
+            self.journal.append(rel_path, ops, session_name)
+        return True
+
+    def _apply_journal(self, source: Path, target: Path, rel_path: str) -> Tuple[bool, bool]:
+        """Bring a shared file up to date with its journal (callers hold its lock).
+
+        Returns:
+            (whether the target was rewritten, whether the source already
+            contains everything in the updated target)
+        """
+        threshold = self._near_duplicate_threshold()
+        with open(target, 'r', encoding='utf-8') as f:
+            content = f.read()
+        updated = self.journal.apply_pending(rel_path, content, threshold)
+
+        with open(source, 'r', encoding='utf-8') as f:
+            source_content = f.read()
+        in_sync = merge_markdown(source_content, updated, threshold) == source_content
+        if updated == content:
+            return False, in_sync
+        atomic_write(target, updated)
+        return True, in_sync
+
+    def _read_for_journal(self, path: Path) -> Optional[str]:
+        """Read a shared file before a direct write, so the change can be journaled.
+
+        Returns:
+            The content ("" if the file does not exist yet), or None if the
+            journal is disabled or the file is too large to diff in memory
+        """
+        if self.journal is None:
+            return None
+        try:
+            size = path.stat().st_size
+        except FileNotFoundError:
+            return ""
+        streaming_threshold = self.config.get("streaming_merge_threshold")
+        if streaming_threshold is not None and size >= streaming_threshold:
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def _journal_write(self, rel_path: str, old_content: Optional[str], path: Path,
+                       session_name: Optional[str] = None):
+        """Journal a direct write to a shared file (callers hold its lock).
+
+        Files that could not be read beforehand are checkpointed by the
+        next sync that applies commits to them instead.
+        """
+        if self.journal is None or old_content is None:
+            return
+        with open(path, 'r', encoding='utf-8') as f:
+            self.journal.record_write(rel_path, old_content, f.read(), session_name)
+
+    def sync_to_session(self, project_path: Path, stats: Optional[SyncStats] = None,
+                        working_dir: Optional[Path] = None) -> bool:
         """Sync shared memory to a session's memory directory.
 
+        Only files that changed on either side since the last sync are
+        copied or merged. With the ``relevance_filter`` setting, only the
+        topic files relevant to the project are synced (see
+        :meth:`relevant_topic_files`); top-level shared files always are.
+        In a sharded pool, only the shards the project subscribes to are
+        synced (see :mod:`claude_multi.shards`).
+
         Args:
             project_path: Path to the Claude Code project directory
+            stats: Optional counters to update
+            working_dir: The project's working directory (looked up in the
+                project registry if not given)
 
         Returns:
             True if sync was successful
         """
-        memory_dir = project_path / "memory"
-        memory_dir.mkdir(exist_ok=True)
+        if self._sync_via_daemon("sync_to_session", stats, project_path=str(project_path),
+                                 working_dir=str(working_dir) if working_dir else None):
+            return True
 
-        # Track what we've synced
-        synced_files = []
+        with self.profiler.phase("sync_to_session"):
+            memory_dir = project_path / "memory"
+            memory_dir.mkdir(exist_ok=True)
+            manifest = self._get_manifest(project_path)
+            sync_stats = SyncStats()
+            shards = self.subscribed_shards(project_path, working_dir)
+            selected = None
+            if self.config.get("relevance_filter", False):
+                with self.profiler.phase("select_topics"):
+                    selected = self.relevant_topic_files(project_path, working_dir, shards)
 
-        # Copy all shared memory files to the session
-        for shared_file in self.shared_memory_dir.glob("*.md"):
-            target_file = memory_dir / shared_file.name
+            roots = [""] if shards is None else [f"{shard}/" for shard in shards]
 
-            # If file exists in session, merge it; otherwise copy
-            if target_file.exists():
-                self._merge_memory_file(shared_file, target_file)
-            else:
-                shutil.copy2(shared_file, target_file)
+            # Copy all shared memory files to the session, top-level files and
+            # topic files (at any depth) alike
+            created_dirs = {memory_dir}
+            for prefix in roots:
+                shared_dir = self.shared_memory_dir / prefix
+                for rel_path, source_stat in self._memory_files(shared_dir).items():
+                    pool_path = prefix + rel_path
+                    if selected is not None and '/' in rel_path and pool_path not in selected:
+                        continue
+                    target_file = memory_dir / rel_path
+                    self._make_parent(target_file, created_dirs)
+                    self._sync_file(shared_dir / rel_path, target_file, pool_path,
+                                    manifest, "shared", "session", sync_stats, source_stat=source_stat)
 
-            synced_files.append(shared_file.name)
+            manifest.save()
+            self._record_stats(sync_stats, manifest, stats)
+        return True
 
-        # Also sync topic directories
-        for topic_dir in self.shared_memory_dir.iterdir():
-            if topic_dir.is_dir():
-                target_dir = memory_dir / topic_dir.name
-                target_dir.mkdir(exist_ok=True)
+    def _memory_files(self, directory: Path) -> Dict[str, os.stat_result]:
+        """List the memory files to sync below a directory, with their stat results.
 
-                for topic_file in topic_dir.glob("*.md"):
-                    target_file = target_dir / topic_file.name
-                    if target_file.exists():
-                        self._merge_memory_file(topic_file, target_file)
-                    else:
-                        shutil.copy2(topic_file, target_file)
+        Which files are synced is set by the ``sync_include`` and
+        ``sync_exclude`` settings (see :func:`claude_multi.walk.walk_tree`).
+        """
+        return walk_tree(directory, self.config.get("sync_include", ["*.md"]),
+                         self.config.get("sync_exclude", []))
+
+    def _make_parent(self, path: Path, created_dirs: Set[Path]):
+        """Create a file's parent directory, once per sync."""
+        if path.parent not in created_dirs:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            created_dirs.add(path.parent)
 
+    def subscribed_shards(self, project_path: Path, working_dir: Optional[Path] = None,
+                          session_name: Optional[str] = None) -> Optional[List[str]]:
+        """Get the shards of the pool a project syncs with.
+
+        Args:
+            project_path: Path to the Claude Code project directory
+            working_dir: The project's working directory
+            session_name: The project's session name (both are looked up in
+                the project registry if not given)
+
+        Returns:
+            Shard names, or None if the pool is not sharded
+        """
+        if not self.config.get("shards"):
+            return None
+        if working_dir is None or session_name is None:
+            entry = ProjectRegistry(self.config).load().get(project_path.name, {})
+            if working_dir is None and "project_path" in entry:
+                working_dir = Path(entry["project_path"])
+            session_name = session_name or entry.get("session_name")
+        return subscribed_shards(self.config, working_dir, session_name)
+
+    def _pool_path(self, rel_path: str) -> Optional[str]:
+        """Get the path in the shared pool of a memory file (relative to a memory directory).
+
+        Returns:
+            The path relative to the shared memory directory, or None if no
+            shard holds the file (the shared instructions file, which is
+            injected into projects rather than synced, is in no shard)
+        """
+        shards = self.config.get("shards") or {}
+        if not shards:
+            return rel_path
+        if self.shared_memory_dir / rel_path == self.config.shared_claude_md:
+            return None
+        shard = shard_for(rel_path, shards)
+        return None if shard is None else f"{shard}/{rel_path}"
+
+    def relevant_topic_files(self, project_path: Path, working_dir: Optional[Path] = None,
+                             shards: Optional[List[str]] = None) -> Optional[Set[str]]:
+        """Pick the topic files to sync into a project's session.
+
+        Files already in the session stay there (and keep syncing back) when
+        they drop out of the selection; they just stop receiving updates.
+        In a sharded pool, only files in the project's subscribed shards are
+        considered.
+
+        Args:
+            project_path: Path to the Claude Code project directory
+            working_dir: The project's working directory (looked up in the
+                project registry if not given)
+            shards: The project's subscribed shards (looked up if not given)
+
+        Returns:
+            Relative paths of the selected topic files, or None if every
+            topic file should be synced (e.g. the working directory is unknown)
+        """
+        if working_dir is None:
+            entry = ProjectRegistry(self.config).load().get(project_path.name)
+            if entry is None:
+                return None
+            working_dir = Path(entry["project_path"])
+        if not working_dir.is_dir():
+            return None
+        if shards is None:
+            shards = self.subscribed_shards(project_path, working_dir)
+        return self.relevance.select(working_dir, self.config.get("relevance_top_k"),
+                                     self.config.get("relevance_budget"), shards)
+
+    def _sync_via_daemon(self, op: str, stats: Optional[SyncStats], **args) -> bool:
+        """Run a sync on the daemon if one is running.
+
+        Returns:
+            True if the daemon ran the sync, False if it should run here
+            (no daemon, a daemon of another version, or the request failed
+            on the daemon)
+        """
+        if self.daemon is None:
+            return False
+        with self.profiler.phase(f"{op}/daemon"):
+            try:
+                result = self.daemon.request(op, **args)
+            except (DaemonUnavailable, DaemonError):
+                return False
+
+        sync_stats = SyncStats()
+        for name, value in result.items():
+            setattr(sync_stats, name, value)
+        if stats is not None:
+            stats.add(sync_stats)
+        self.profiler.add_stats(sync_stats)
         return True
 
-    def sync_from_session(self, project_path: Path, session_name: str) -> bool:
+    def _record_stats(self, sync_stats: SyncStats, manifest: SyncManifest,
+                      stats: Optional[SyncStats]):
+        """Add one sync's counters to the caller's and the profiler's."""
+        sync_stats.bytes_read += manifest.bytes_hashed
+        if stats is not None:
+            stats.add(sync_stats)
+        self.profiler.add_stats(sync_stats)
+
+    def sync_from_session(self, project_path: Path, session_name: str,
+                          snapshot: bool = True, stats: Optional[SyncStats] = None) -> bool:
         """Sync session memory back to shared memory.
 
+        Every file is recorded in a deduplicated snapshot, but only files
+        that changed on either side since the last sync are merged into the
+        shared pool. In a sharded pool, files belonging to shards the
+        project does not subscribe to are left out.
+
         Args:
             project_path: Path to the Claude Code project directory
             session_name: Name of the session
+            snapshot: Whether to record a snapshot of the session's memory
+            stats: Optional counters to update
 
         Returns:
             True if sync was successful
@@ -73,125 +468,688 @@ class MemoryManager:
         if not memory_dir.exists():
             return False
 
-        # Create a backup of this session's memory
-        session_backup = self.sessions_dir / session_name / datetime.now().strftime("%Y%m%d_%H%M%S")
-        session_backup.mkdir(parents=True, exist_ok=True)
+        if self._sync_via_daemon("sync_from_session", stats, project_path=str(project_path),
+                                 session_name=session_name, snapshot=snapshot):
+            return True
 
-        # Sync all memory files from session to shared
-        for session_file in memory_dir.glob("*.md"):
-            # Backup the session file
-            shutil.copy2(session_file, session_backup / session_file.name)
+        with self.profiler.phase("sync_from_session"):
+            manifest = self._get_manifest(project_path)
+            sync_stats = SyncStats()
 
-            # Merge into shared memory
-            shared_file = self.shared_memory_dir / session_file.name
-            if shared_file.exists():
-                self._merge_memory_file(session_file, shared_file)
-            else:
-                shutil.copy2(session_file, shared_file)
+            # Files to back up in this session's snapshot
+            snapshot_files = {}
 
-        # Also sync topic directories
-        for topic_dir in memory_dir.iterdir():
-            if topic_dir.is_dir():
-                shared_topic_dir = self.shared_memory_dir / topic_dir.name
-                shared_topic_dir.mkdir(exist_ok=True)
+            # Paths of the session's files in the shared pool
+            pool_paths = {}
+            shards = self.subscribed_shards(project_path, session_name=session_name)
 
-                for topic_file in topic_dir.glob("*.md"):
-                    shutil.copy2(topic_file, session_backup / topic_file.name)
+            # Sync all memory files from session to shared, including topic
+            # files at any depth
+            created_dirs = {self.shared_memory_dir}
+            for rel_path, source_stat in self._memory_files(memory_dir).items():
+                session_file = memory_dir / rel_path
+                snapshot_files[rel_path] = session_file
 
-                    shared_file = shared_topic_dir / topic_file.name
-                    if shared_file.exists():
-                        self._merge_memory_file(topic_file, shared_file)
-                    else:
-                        shutil.copy2(topic_file, shared_file)
+                pool_path = self._pool_path(rel_path)
+                if pool_path is None or (shards is not None and pool_path.split('/', 1)[0] not in shards):
+                    continue
+                pool_paths[rel_path] = pool_path
+
+                # Merge into shared memory
+                shared_file = self.shared_memory_dir / pool_path
+                self._make_parent(shared_file, created_dirs)
+                self._sync_file(session_file, shared_file, pool_path, manifest, "session", "shared",
+                                sync_stats, session_name, source_stat)
+
+            manifest.save()
+            self._record_stats(sync_stats, manifest, stats)
+
+            if not snapshot:
+                return True
+
+            # Create a backup of this session's memory; hashes are usually already
+            # known from the manifest, so unchanged files are not read again
+            with self.profiler.phase("snapshot"):
+                digests = {}
+                for rel_path, pool_path in pool_paths.items():
+                    entry = manifest.get(pool_path, "session")
+                    if entry is not None:
+                        digests[rel_path] = entry["hash"]
+                self.snapshots.create_snapshot(session_name, snapshot_files, digests)
+
+        if self.config.get("mine_transcripts", False):
+            self.mine_transcripts([project_path])
+
+        if self.config.get("compact_after_sync", False):
+            self.compact_shared_memory()
 
         return True
 
-    def _merge_memory_file(self, source: Path, target: Path):
+    def _merge_memory_file(self, source: Path, target: Path) -> bool:
         """Merge two memory files intelligently.
 
-        Uses a simple strategy:
-        1. Read both files
-        2. Split into sections by headers
-        3. Merge sections, preferring newer content
-        4. Deduplicate bullet points
+        Both files are parsed into header sections; new content from the
+        source is added to its matching section in the target and bullets are
+        deduplicated. See :func:`claude_multi.merge.merge_markdown`.
+        Callers are expected to hold the target's lock (see :meth:`_sync_file`).
+
+        Returns:
+            True if the target was rewritten
+        """
+        changed, _in_sync = self._merge_files(source, target)
+        return changed
+
+    def _merge_files(self, source: Path, target: Path) -> Tuple[bool, bool]:
+        """Merge ``source`` into ``target``.
+
+        Returns:
+            (whether the target was rewritten, whether the source already
+            contains everything in the merged target)
         """
+        threshold = self._near_duplicate_threshold()
+        streaming_threshold = self.config.get("streaming_merge_threshold")
+        if (threshold is None and streaming_threshold is not None
+                and max(source.stat().st_size, target.stat().st_size) >= streaming_threshold):
+            return self._merge_files_streaming(source, target)
+
         with open(source, 'r', encoding='utf-8') as f:
             source_content = f.read()
 
         with open(target, 'r', encoding='utf-8') as f:
             target_content = f.read()
 
-        # Simple merge: combine unique lines, preserving structure
-        source_lines = source_content.split('\n')
-        target_lines = target_content.split('\n')
-
-        # Create a set of existing lines for deduplication
-        existing_lines = set()
-        merged_lines = []
-
-        # First add all target lines
-        for line in target_lines:
-            line_stripped = line.strip()
-            if line_stripped:
-                # For bullet points and content, deduplicate
-                if line_stripped.startswith(('-', '*', '+')):
-                    line_key = self._normalize_line(line_stripped)
-                    if line_key not in existing_lines:
-                        existing_lines.add(line_key)
-                        merged_lines.append(line)
-                    else:
-                        continue
-                else:
-                    merged_lines.append(line)
-            else:
-                merged_lines.append(line)
-
-        # Then add new lines from source that don't exist in target
-        new_content_started = False
-        for line in source_lines:
-            line_stripped = line.strip()
-            if line_stripped:
-                if line_stripped.startswith(('-', '*', '+')):
-                    line_key = self._normalize_line(line_stripped)
-                    if line_key not in existing_lines:
-                        if not new_content_started:
-                            merged_lines.append("")
-                            merged_lines.append(f"## Updates from {datetime.now().strftime('%Y-%m-%d %H:%M')}")
-                            merged_lines.append("")
-                            new_content_started = True
-                        existing_lines.add(line_key)
-                        merged_lines.append(line)
-                elif line_stripped.startswith('#'):
-                    # Headers - add if not duplicate
-                    if line not in merged_lines:
-                        merged_lines.append(line)
-                else:
-                    # Regular content - check for duplicates
-                    line_key = self._normalize_line(line_stripped)
-                    if line_key not in existing_lines:
-                        existing_lines.add(line_key)
-                        merged_lines.append(line)
+        merged_content = merge_markdown(target_content, source_content, threshold)
+        in_sync = merge_markdown(source_content, merged_content, threshold) == source_content
+        if merged_content == target_content:
+            return False, in_sync
 
         # Write merged content
-        with open(target, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(merged_lines))
+        atomic_write(target, merged_content)
+        return True, in_sync
+
+    def _merge_files_streaming(self, source: Path, target: Path) -> Tuple[bool, bool]:
+        """Same as :meth:`_merge_files`, without reading either file into memory."""
+        merge = StreamingMerge(source, target)
+        changed = merge.plan()
+        if changed:
+            with atomic_writer(target) as out:
+                merge.write(out)
+        in_sync = not StreamingMerge(target, source).plan()
+        return changed, in_sync
+
+    def _remote_state_dir(self, remote: RemoteStore) -> Path:
+        """Directory with this machine's sync manifest and block lists for a remote."""
+        return self.config.remotes_dir / remote.id
+
+    def _save_block_list(self, state_dir: Path, rel_path: str, block_list: Dict, data: bytes):
+        """Remember the version last exchanged with a remote, as the basis for the next pull."""
+        self.snapshots.objects.put_bytes(data, block_list["hash"])
+        path = state_dir / "files" / f"{rel_path}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write(path, json.dumps(block_list))
+
+    def _last_block_list(self, state_dir: Path, rel_path: str) -> Optional[Dict]:
+        try:
+            with open(state_dir / "files" / f"{rel_path}.json", 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _pull_file(self, remote: RemoteStore, rel_path: str, manifest: SyncManifest,
+                   state_dir: Path, stats: SyncStats) -> bool:
+        """Merge the remote version of a file into the shared pool.
+
+        Only blocks that are not part of the version last exchanged with the
+        remote are fetched.
+
+        Returns:
+            True if the remote version contains everything in the merged file
+            (so it does not need to be pushed back)
+        """
+        block_list = remote.read_block_list(rel_path)
+        if block_list is None:
+            return False
+
+        known = {}
+        last = self._last_block_list(state_dir, rel_path)
+        if last is not None and self.snapshots.objects.has(last["hash"]):
+            known = split_known_blocks(self.snapshots.objects.get_bytes(last["hash"]), last)
+        data, received = remote.read(block_list, known)
+        stats.bytes_transferred += received
+        stats.bytes_read += len(data)
+        self._save_block_list(state_dir, rel_path, block_list, data)
+
+        pool_path = rel_path
+        shards = self.config.get("shards") or {}
+        if shards and split_pool_path(rel_path, shards)[0] is None:
+            # A file from a pool that is not sharded (yet)
+            pool_path = self._pool_path(rel_path)
+            if pool_path is None:
+                return False
+        target = self.shared_memory_dir / pool_path
+        with self._lock(target):
+            changed, in_sync = self._merge_into_shared(pool_path, data, state_dir / "incoming.md",
+                                                       stats, f"remote:{remote.id}")
+            manifest.record(rel_path, "shared", target)
+            if in_sync:
+                manifest.record(rel_path, "remote", remote.block_list_path(rel_path))
+            else:
+                manifest.forget(rel_path, "remote")
+        return in_sync
+
+    def _merge_into_shared(self, rel_path: str, data: bytes, incoming: Path, stats: SyncStats,
+                           session_name: str) -> Tuple[bool, bool]:
+        """Merge content from outside the sessions into a shared file (callers hold its lock).
+
+        Incoming content takes the same merge path as sync_from_session.
+
+        Args:
+            rel_path: The shared file, relative to the shared memory directory
+            data: The incoming content
+            incoming: Scratch file the content is written to for merging
+            stats: Counters to update
+            session_name: Name the change is journaled under
+
+        Returns:
+            (whether the shared file was rewritten, whether the incoming
+            content already contains everything in it)
+        """
+        target = self.shared_memory_dir / rel_path
+        old_content = self._read_for_journal(target)
+        if target.exists():
+            atomic_write(incoming, data)
+            try:
+                stats.bytes_read += target.stat().st_size
+                changed, in_sync = self._merge_files(incoming, target)
+            finally:
+                incoming.unlink()
+            if changed:
+                stats.files_merged += 1
+        else:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write(target, data)
+            changed = in_sync = True
+            stats.files_copied += 1
+
+        if changed:
+            stats.bytes_written += target.stat().st_size
+            self._journal_write(rel_path, old_content, target, session_name)
+            self.index.record_shared_file(rel_path, target)
+            self.search_index.update_file(rel_path, target)
+        return changed, in_sync
+
+    def pull_from_remote(self, remote_dir: Path, stats: Optional[SyncStats] = None) -> SyncStats:
+        """Merge files changed on a remote since the last exchange into the shared pool.
+
+        Args:
+            remote_dir: The remote directory (a local path or mounted share)
+            stats: Optional counters to update
+
+        Returns:
+            Counters of this pull
+        """
+        remote = RemoteStore(remote_dir, self.config.get("lock_timeout", 30))
+        state_dir = self._remote_state_dir(remote)
+        manifest = SyncManifest(state_dir / "manifest.json")
+        sync_stats = SyncStats()
+
+        with self.profiler.phase("pull"):
+            with remote.lock():
+                for rel_path in remote.list_files():
+                    if ".." in Path(rel_path).parts:
+                        continue
+                    sync_stats.files_checked += 1
+                    if manifest.is_unchanged(rel_path, "remote", remote.block_list_path(rel_path)):
+                        continue
+                    self._pull_file(remote, rel_path, manifest, state_dir, sync_stats)
+                manifest.save()
+            self._record_stats(sync_stats, manifest, stats)
+        return sync_stats
+
+    def push_to_remote(self, remote_dir: Path, stats: Optional[SyncStats] = None) -> SyncStats:
+        """Send shared files changed since the last exchange to a remote.
+
+        Files that also changed on the remote are merged locally first, so
+        the other side's learnings are never overwritten; only blocks the
+        remote does not have yet are uploaded.
+
+        Args:
+            remote_dir: The remote directory (a local path or mounted share)
+            stats: Optional counters to update
+
+        Returns:
+            Counters of this push
+        """
+        remote = RemoteStore(remote_dir, self.config.get("lock_timeout", 30))
+        state_dir = self._remote_state_dir(remote)
+        manifest = SyncManifest(state_dir / "manifest.json")
+        sync_stats = SyncStats()
+
+        with self.profiler.phase("push"):
+            remote_dir.mkdir(parents=True, exist_ok=True)
+            with remote.lock():
+                for rel_path, shared_stat in sorted(pool_files(self.config).items()):
+                    path = self.shared_memory_dir / rel_path
+                    block_list_path = remote.block_list_path(rel_path)
+                    sync_stats.files_checked += 1
+
+                    on_remote = block_list_path.exists()
+                    remote_unchanged = on_remote and manifest.is_unchanged(rel_path, "remote", block_list_path)
+                    if remote_unchanged and manifest.is_unchanged(rel_path, "shared", path, shared_stat):
+                        continue
+                    if on_remote and not remote_unchanged:
+                        if self._pull_file(remote, rel_path, manifest, state_dir, sync_stats):
+                            continue
+
+                    basis = self._last_block_list(state_dir, rel_path) if remote_unchanged else None
+                    if basis is None and on_remote:
+                        basis = remote.read_block_list(rel_path)
+                    with self._lock(path):
+                        with open(path, 'rb') as f:
+                            data = f.read()
+                        block_list, sent = remote.write(rel_path, data, basis)
+                        manifest.record(rel_path, "shared", path)
+                        manifest.record(rel_path, "remote", block_list_path)
+                    self._save_block_list(state_dir, rel_path, block_list, data)
+                    sync_stats.files_copied += 1
+                    sync_stats.bytes_read += len(data)
+                    sync_stats.bytes_transferred += sent
+                manifest.save()
+            self._record_stats(sync_stats, manifest, stats)
+        return sync_stats
+
+    def mine_transcripts(self, project_dirs: Optional[List[Path]] = None,
+                         dry_run: bool = False) -> MiningResult:
+        """Stage learnings from the lines added to Claude Code transcripts since the last run.
+
+        Learnings (see :mod:`claude_multi.transcripts`) are merged into the
+        shared file named by the ``transcript_memory_file`` setting, and the
+        transcripts' offsets only move forward once they are.
+
+        Args:
+            project_dirs: Claude Code project directories whose transcripts are
+                mined (defaults to every project)
+            dry_run: Find learnings without staging them or moving the offsets
+
+        Returns:
+            What this run found
+        """
+        if project_dirs is None:
+            projects_dir = self.config.claude_projects_dir
+            project_dirs = []
+            if projects_dir.is_dir():
+                project_dirs = sorted(path for path in projects_dir.iterdir() if path.is_dir())
+        miner = TranscriptMiner(self.config.transcripts_file, self.config.locks_dir,
+                                self.config.get("transcript_correction_threshold", 2),
+                                self.config.get("lock_timeout", 30))
+        sync_stats = SyncStats()
+
+        with self.profiler.phase("mine_transcripts"), miner.lock():
+            result = miner.mine(project_dirs)
+            sync_stats.files_checked += result.files_checked
+            sync_stats.bytes_read += result.bytes_read
+            # Without a shard to hold the file, the offsets are kept so nothing is lost
+            rel_path = self._pool_path(self.config.get("transcript_memory_file", "MEMORY.md"))
+            if not dry_run and rel_path is not None:
+                if result.learnings:
+                    data = render_learnings(result.learnings).encode('utf-8')
+                    with self._lock(self.shared_memory_dir / rel_path):
+                        self._merge_into_shared(rel_path, data,
+                                                self.config.config_dir / "transcripts-incoming.md",
+                                                sync_stats, "transcripts")
+                miner.commit(result)
+        self.profiler.add_stats(sync_stats)
+        return result
+
+    def dedupe_shared_memory(self, threshold: Optional[float] = None,
+                             dry_run: bool = False) -> Dict[str, List[str]]:
+        """Remove duplicate and near-duplicate bullets from every shared memory file.
+
+        Args:
+            threshold: Similarity threshold (defaults to the
+                ``near_duplicate_threshold`` setting; exact duplicates only if unset)
+            dry_run: Report what would be removed without writing anything
+
+        Returns:
+            Removed lines keyed by file path relative to the shared pool
+        """
+        threshold = threshold or self._near_duplicate_threshold()
+        removed_by_file = {}
+
+        for rel_path in sorted(pool_files(self.config)):
+            path = self.shared_memory_dir / rel_path
+            if path == self.config.shared_claude_md:
+                continue
+
+            with self._lock(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    content = f.read()
+                deduped, removed = dedupe_markdown(content, threshold)
+                if not removed:
+                    continue
+                removed_by_file[rel_path] = removed
+                if not dry_run:
+                    atomic_write(path, deduped)
+                    if self.journal is not None:
+                        self.journal.record_write(rel_path, content, deduped, "dedupe")
+
+            if not dry_run:
+                self.index.record_shared_file(rel_path, path)
+                self.search_index.update_file(rel_path, path)
+
+        return removed_by_file
+
+    def journal_history(self, rel_path: Optional[str] = None,
+                        session_name: Optional[str] = None) -> List[Dict]:
+        """List journal commits, newest first.
+
+        Args:
+            rel_path: Only commits to this file (relative to the shared pool)
+            session_name: Only commits from this session
+
+        Returns:
+            Commits with their file under ``"path"``
+        """
+        if self.journal is None:
+            return []
+        commits = []
+        for path, commit in self.journal.history(rel_path):
+            if session_name is None or commit["session"] == session_name:
+                commit["path"] = path
+                commits.append(commit)
+        commits.sort(key=lambda commit: commit["time"], reverse=True)
+        return commits
+
+    def rebuild_from_journal(self, write: bool = False) -> Dict[str, Optional[bool]]:
+        """Rebuild every journaled shared file from its latest checkpoint and later commits.
+
+        Args:
+            write: Replace files that differ from their rebuilt content
+
+        Returns:
+            For every journaled file: True if it matches its rebuilt content,
+            False if it differs, None if it has no checkpoint to rebuild from
+        """
+        results: Dict[str, Optional[bool]] = {}
+        if self.journal is None:
+            return results
+        threshold = self._near_duplicate_threshold()
+
+        for rel_path in self.journal.list_files():
+            path = self.shared_memory_dir / rel_path
+            with self._lock(path):
+                rebuilt = self.journal.replay(rel_path, threshold)
+                if rebuilt is None:
+                    results[rel_path] = None
+                    continue
+                content, offset = rebuilt
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        matches = f.read() == content
+                except FileNotFoundError:
+                    matches = False
+                results[rel_path] = matches
+                if matches or not write:
+                    continue
+                path.parent.mkdir(parents=True, exist_ok=True)
+                atomic_write(path, content)
+                self.journal.mark_applied(rel_path, content, offset)
+            self.index.record_shared_file(rel_path, path)
+            self.search_index.update_file(rel_path, path)
+        return results
+
+    def _bullet_share_counts(self) -> Dict[str, int]:
+        """Count, for every bullet, how many sessions have it in their latest snapshot."""
+        counts: Dict[str, int] = {}
+        for session_name in self.list_sessions():
+            snapshots = self.snapshots.list_snapshots(session_name)
+            if not snapshots:
+                continue
+            keys = set()
+            for rel_path in self.snapshots.read_snapshot(snapshots[0])["files"]:
+                content = self.snapshots.read_file(snapshots[0], rel_path).decode('utf-8', errors='replace')
+                for section in parse_sections(content):
+                    keys.update(normalize_line(block[0]) for block in section.blocks
+                                if len(block) == 1 and is_bullet(block[0]))
+            for key in keys:
+                counts[key] = counts.get(key, 0) + 1
+        return counts
+
+    def compact_shared_memory(self, file_budget: Optional[int] = None,
+                              total_budget: Optional[int] = None,
+                              threshold: Optional[float] = None,
+                              dry_run: bool = False) -> Dict[str, CompactedFile]:
+        """Compact the shared memory pool.
+
+        Folds legacy "Updates from" sections into the sections they belong
+        to, drops superseded bullets and evicts bullets until the files fit
+        the token budgets (least shared across sessions first, then oldest).
+        All files are locked while the pool is compacted.
+
+        Args:
+            file_budget: Maximum estimated tokens per file (defaults to the
+                ``compact_file_budget`` setting; unlimited if unset)
+            total_budget: Maximum estimated tokens over the pool (defaults to
+                the ``compact_total_budget`` setting; unlimited if unset)
+            threshold: Similarity at which bullets supersede each other
+                (defaults to the ``near_duplicate_threshold`` setting)
+            dry_run: Report what would change without writing anything
+
+        Returns:
+            The files that changed, keyed by path relative to the shared pool
+        """
+        file_budget = file_budget or self.config.get("compact_file_budget")
+        total_budget = total_budget or self.config.get("compact_total_budget")
+        threshold = threshold or self._near_duplicate_threshold()
+
+        with self.profiler.phase("compact"):
+            paths = {rel_path: self.shared_memory_dir / rel_path
+                     for rel_path in sorted(pool_files(self.config))
+                     if self.shared_memory_dir / rel_path != self.config.shared_claude_md}
+            share_counts = self._bullet_share_counts() if file_budget or total_budget else {}
+
+            locks = [self._lock(path) for path in paths.values()]
+            try:
+                for lock in locks:
+                    lock.acquire()
+                contents = {}
+                for rel_path, path in paths.items():
+                    with open(path, 'r', encoding='utf-8') as f:
+                        contents[rel_path] = f.read()
+
+                compacted = compact_files(contents, threshold, file_budget, total_budget, share_counts)
+                changed = {}
+                for rel_path, file in compacted.items():
+                    content = file.render()
+                    if content == contents[rel_path]:
+                        continue
+                    changed[rel_path] = file
+                    if not dry_run:
+                        atomic_write(paths[rel_path], content)
+                        if self.journal is not None:
+                            self.journal.record_write(rel_path, contents[rel_path], content, "compact")
+            finally:
+                for lock in locks:
+                    lock.release()
+
+            if not dry_run:
+                for rel_path in changed:
+                    self.index.record_shared_file(rel_path, paths[rel_path])
+                    self.search_index.update_file(rel_path, paths[rel_path])
+
+        return changed
 
     def _normalize_line(self, line: str) -> str:
         """Normalize a line for comparison (remove leading markers, extra spaces)."""
-        # Remove bullet points and list markers
-        normalized = line.lstrip('*-+ ')
-        # Remove extra whitespace
-        normalized = ' '.join(normalized.split())
-        # Make lowercase for comparison
-        return normalized.lower()
+        return normalize_line(line)
 
     def get_session_history(self, session_name: str) -> List[Path]:
-        """Get all backup snapshots for a session."""
-        session_dir = self.sessions_dir / session_name
-        if not session_dir.exists():
-            return []
+        """Get all snapshot manifests for a session, newest first.
+
+        Snapshot directories from older versions are not listed until they
+        are converted with :meth:`migrate_snapshots`. File contents of any
+        snapshot are read with :meth:`read_snapshot_file`, whether they are
+        stored in full or as deltas.
+        """
+        return self.snapshots.list_snapshots(session_name)
+
+    def get_snapshot(self, snapshot_path: Path) -> Dict:
+        """Read a snapshot manifest returned by :meth:`get_session_history`."""
+        return self.snapshots.read_snapshot(snapshot_path)
+
+    def read_snapshot_file(self, snapshot_path: Path, rel_path: str) -> bytes:
+        """Read one file's contents as of a snapshot.
+
+        Raises:
+            KeyError: The file is not part of the snapshot
+        """
+        return self.snapshots.read_file(snapshot_path, rel_path)
+
+    def find_snapshot(self, session_name: str, snapshot_id: Optional[str] = None) -> Optional[Path]:
+        """Get a session's snapshot manifest by ID (a timestamp), or its latest one.
+
+        Returns:
+            The manifest, or None if there is no such snapshot
+        """
+        if snapshot_id is None:
+            history = self.get_session_history(session_name)
+            return history[0] if history else None
+        return self.snapshots.find_snapshot(session_name, snapshot_id)
+
+    def session_memory_dir(self, session_name: str) -> Optional[Path]:
+        """Find the memory directory of the Claude Code project a session was last used with."""
+        for project_dir, entry in sorted(ProjectRegistry(self.config).load().items()):
+            if entry.get("session_name") == session_name:
+                return self.config.claude_projects_dir / project_dir / "memory"
+        return None
+
+    def restore_snapshot(self, snapshot_path: Path, target_dir: Path,
+                         rel_path: Optional[str] = None) -> List[str]:
+        """Write the files of a snapshot into a directory.
+
+        Existing files are replaced atomically; files that are not part of
+        the snapshot are left alone.
+
+        Args:
+            snapshot_path: Snapshot manifest
+            target_dir: Directory to restore into (e.g. a session's memory directory)
+            rel_path: Only restore this file
+
+        Returns:
+            Relative paths of the restored files
+
+        Raises:
+            KeyError: ``rel_path`` is not part of the snapshot
+        """
+        files = sorted(self.get_snapshot(snapshot_path)["files"])
+        if rel_path is not None:
+            if rel_path not in files:
+                raise KeyError(rel_path)
+            files = [rel_path]
 
-        return sorted(session_dir.iterdir(), reverse=True)
+        restored = []
+        for name in files:
+            if ".." in Path(name).parts:
+                continue
+            target = target_dir / name
+            target.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write(target, self.read_snapshot_file(snapshot_path, name))
+            restored.append(name)
+        return restored
+
+    def migrate_snapshots(self) -> int:
+        """Convert plain snapshot directories of all sessions into manifests.
+
+        Returns:
+            Number of snapshots migrated
+        """
+        migrated = sum(self.snapshots.migrate_legacy(name) for name in self.list_sessions())
+        if migrated:
+            self.index.rebuild()
+        return migrated
+
+    def migrate_to_shards(self, shards: Dict[str, List[str]], dry_run: bool = False) -> Dict[str, str]:
+        """Split a flat shared pool into shards and enable them.
+
+        Every shared file outside the shards is moved into the shard holding
+        it (see :mod:`claude_multi.shards`), or merged into the file already
+        there. Journals and sync manifests move along, so sessions keep
+        syncing incrementally. The instructions file (``CLAUDE.md``) stays
+        where it is. Syncs should not run while migrating; it is safe to
+        run again to pick up files written meanwhile.
+
+        Args:
+            shards: Shard names and their patterns, in order
+            dry_run: Only work out where every file would go
+
+        Returns:
+            New path of every moved file, by old path (relative to the
+            shared memory directory)
+        """
+        # Files under shards enabled before (when run again) are in place
+        current = self.config.get("shards") or {}
+        moves = {}
+        for rel_path in sorted(self._memory_files(self.shared_memory_dir)):
+            if (split_pool_path(rel_path, current)[0] is not None
+                    or self.shared_memory_dir / rel_path == self.config.shared_claude_md):
+                continue
+            shard = shard_for(rel_path, shards)
+            if shard is not None:
+                moves[rel_path] = f"{shard}/{rel_path}"
+        if dry_run:
+            return moves
+
+        with self.profiler.phase("migrate_shards"):
+            for rel_path, pool_path in moves.items():
+                source = self.shared_memory_dir / rel_path
+                target = self.shared_memory_dir / pool_path
+                with self._lock(source), self._lock(target):
+                    if target.exists():
+                        old_content = self._read_for_journal(target)
+                        changed, _in_sync = self._merge_files(source, target)
+                        if changed:
+                            self._journal_write(pool_path, old_content, target, "migrate")
+                        source.unlink()
+                    else:
+                        target.parent.mkdir(parents=True, exist_ok=True)
+                        os.replace(source, target)
+                    if self.journal is not None:
+                        self.journal.move(rel_path, pool_path)
+
+            # Drop the directories left empty
+            for directory in sorted({(self.shared_memory_dir / rel_path).parent for rel_path in moves},
+                                    key=lambda path: len(path.parts), reverse=True):
+                while directory != self.shared_memory_dir and not (
+                        directory.parent == self.shared_memory_dir and directory.name in shards):
+                    try:
+                        directory.rmdir()
+                    except OSError:
+                        break
+                    directory = directory.parent
+
+            if self.config.manifests_dir.exists():
+                for path in self.config.manifests_dir.glob("*.json"):
+                    manifest = SyncManifest(path)
+                    renamed = {}
+                    for rel_path, entry in manifest.files.items():
+                        renamed.setdefault(moves.get(rel_path, rel_path), entry)
+                    if renamed != manifest.files:
+                        manifest.files = renamed
+                        manifest.save()
+
+            self.config.set("shards", shards)
+            self.index.rebuild()
+            self.search_index.rebuild()
+        return moves
+
+    def repack_snapshots(self) -> int:
+        """Store file versions kept in full in session histories as deltas.
+
+        Returns:
+            Number of file versions converted
+        """
+        delta_bases = self.snapshots.objects.delta_bases()
+        return sum(self.snapshots.repack(name, delta_bases) for name in self.list_sessions())
 
     def list_sessions(self) -> List[str]:
         """List all tracked sessions."""
@@ -200,24 +1158,76 @@ class MemoryManager:
 
         return [d.name for d in self.sessions_dir.iterdir() if d.is_dir()]
 
+    def get_session_summaries(self) -> List[Dict]:
+        """List sessions with their snapshot count and latest snapshot, from the index."""
+        if self.daemon is not None:
+            try:
+                return self.daemon.request("sessions")
+            except (DaemonUnavailable, DaemonError):
+                pass
+        return self.index.sessions()
+
+    def rebuild_index(self):
+        """Rebuild the session and shared file index from disk."""
+        self.index.rebuild()
+
+    def search(self, query: str, limit: int = 20, history: bool = False) -> List[Dict]:
+        """Search the shared memory pool (and optionally snapshot history).
+
+        Shared files edited outside a sync are re-indexed first; only files
+        whose size or mtime changed are read.
+        """
+        if self.daemon is not None:
+            try:
+                with self.profiler.phase("search/daemon"):
+                    return self.daemon.request("search", query=query, limit=limit, history=history)
+            except (DaemonUnavailable, DaemonError):
+                pass
+
+        with self.profiler.phase("refresh_search_index"):
+            self.search_index.refresh()
+            if history:
+                self.search_index.refresh_history()
+        with self.profiler.phase("search"):
+            return self.search_index.search(query, limit, history)
+
     def get_shared_memory_summary(self) -> Dict[str, any]:
-        """Get summary of shared memory contents."""
+        """Get summary of shared memory contents.
+
+        Sizes and modification times come from the index, which is updated
+        whenever a sync writes a shared file.
+        """
+        if self.daemon is not None:
+            try:
+                summary = self.daemon.request("status")
+            except (DaemonUnavailable, DaemonError):
+                pass
+            else:
+                for file in summary["files"]:
+                    file["modified"] = datetime.fromisoformat(file["modified"])
+                if summary["last_updated"] is not None:
+                    summary["last_updated"] = datetime.fromisoformat(summary["last_updated"])
+                return summary
+
         summary = {
             "files": [],
             "total_size": 0,
             "last_updated": None
         }
 
-        for file in self.shared_memory_dir.glob("*.md"):
-            stat = file.stat()
+        shards = self.config.get("shards") or {}
+        for file in self.index.shared_files(top_level_only=not shards):
+            if is_topic_file(file["path"], shards):
+                continue
+            modified = datetime.fromtimestamp(file["mtime"])
             summary["files"].append({
-                "name": file.name,
-                "size": stat.st_size,
-                "modified": datetime.fromtimestamp(stat.st_mtime)
+                "name": file["path"],
+                "size": file["size"],
+                "modified": modified
             })
-            summary["total_size"] += stat.st_size
+            summary["total_size"] += file["size"]
 
-            if summary["last_updated"] is None or stat.st_mtime > summary["last_updated"].timestamp():
-                summary["last_updated"] = datetime.fromtimestamp(stat.st_mtime)
+            if summary["last_updated"] is None or modified > summary["last_updated"]:
+                summary["last_updated"] = modified
 
         return summary
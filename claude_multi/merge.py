@@ -0,0 +1,679 @@
+"""Section-aware merging of markdown memory files.
+
+Both files are parsed into a list of sections keyed by their header path
+(e.g. ``# Memory > ## Testing``). Sections are matched through a dict and
+lines are deduplicated through hashed sets, so a merge is linear in the size
+of the two files. New content is placed into the section it came from
+rather than into a timestamped block, which makes the merge idempotent:
+merging the same source into the result again changes nothing.
+"""
+
+import re
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, List, Optional, Set, Tuple
+
+from .neardup import NearDuplicateIndex
+
+HEADER_RE = re.compile(r'^\s{0,3}(#{1,6})\s+(.*?)\s*#*\s*$')
+FENCE_MARKERS = ('```', '~~~')
+BULLET_MARKERS = ('-', '*', '+')
+
+# First line of the CLAUDE.md files claude-multi generates, and the header
+# below which a project's own instructions are kept when it is regenerated
+GENERATED_CLAUDE_MD = "# Claude Code Instructions"
+PROJECT_SPECIFIC_MARKER = "\n## Project-Specific Instructions\n"
+
+SectionKey = Tuple[Tuple[int, str], ...]
+
+
+def normalize_line(line: str) -> str:
+    """Normalize a line for comparison (remove leading markers, extra spaces)."""
+    # Remove bullet points and list markers
+    normalized = line.strip().lstrip('*-+ ')
+    # Remove extra whitespace
+    normalized = ' '.join(normalized.split())
+    # Make lowercase for comparison
+    return normalized.lower()
+
+
+def is_bullet(line: str) -> bool:
+    """Check whether a line is a list item."""
+    return line.strip().startswith(BULLET_MARKERS)
+
+
+def block_key(block: List[str]) -> str:
+    """Get the dedup key of a block.
+
+    Single lines are compared after normalization; fenced code blocks are
+    compared verbatim. Blank lines have an empty key and are never deduplicated.
+    """
+    if len(block) == 1:
+        return normalize_line(block[0])
+    return '\n'.join(block)
+
+
+class Section:
+    """A header and the blocks of content directly below it."""
+
+    __slots__ = ('key', 'header', 'blocks', 'keys', 'followers')
+
+    def __init__(self, key: SectionKey, header: Optional[str]):
+        self.key = key
+        self.header = header
+        self.blocks: List[List[str]] = []
+        self.keys: Set[str] = set()
+        # Sections inserted by a merge that are written out right after this one
+        self.followers: List['Section'] = []
+
+
+def parse_sections(content: str) -> List[Section]:
+    """Parse markdown into sections in document order.
+
+    The first section is the preamble before any header and has an empty key.
+    Header-like lines inside fenced code blocks are not treated as headers.
+    """
+    current = Section((), None)
+    sections = [current]
+    stack: List[Tuple[int, str]] = []
+    fence: Optional[str] = None
+    fenced: List[str] = []
+
+    for line in content.split('\n'):
+        stripped = line.strip()
+
+        if fence is not None:
+            fenced.append(line)
+            if stripped.startswith(fence):
+                current.blocks.append(fenced)
+                fence = None
+            continue
+
+        if stripped.startswith(FENCE_MARKERS):
+            fence = stripped[:3]
+            fenced = [line]
+            continue
+
+        match = HEADER_RE.match(line)
+        if match:
+            level = len(match.group(1))
+            title = ' '.join(match.group(2).split()).lower()
+            while stack and stack[-1][0] >= level:
+                stack.pop()
+            stack.append((level, title))
+            current = Section(tuple(stack), line)
+            sections.append(current)
+        else:
+            current.blocks.append([line])
+
+    if fence is not None:
+        # Unterminated fence: keep what we have as a single block
+        current.blocks.append(fenced)
+
+    for section in sections:
+        section.keys = {key for key in map(block_key, section.blocks) if key}
+
+    return sections
+
+
+def iter_sections(sections: List[Section]) -> Iterator[Section]:
+    """Iterate over sections (and any sections merged in after them) in output order."""
+    pending = list(reversed(sections))
+    while pending:
+        section = pending.pop()
+        yield section
+        pending.extend(reversed(section.followers))
+
+
+def render_sections(sections: List[Section]) -> str:
+    """Render sections (and any sections merged in after them) back to markdown."""
+    lines: List[str] = []
+    for section in iter_sections(sections):
+        if section.header is not None:
+            lines.append(section.header)
+        for block in section.blocks:
+            lines.extend(block)
+    return '\n'.join(lines)
+
+
+def open_headers(key: SectionKey, level: int) -> SectionKey:
+    """Get the header path a header of ``level`` nests under when it follows a section with ``key``."""
+    return tuple(entry for entry in key if entry[0] < level)
+
+
+def insert_blocks(section: Section, blocks: List[List[str]]):
+    """Insert blocks at the end of a section's content, before trailing blank lines."""
+    end = len(section.blocks)
+    while end > 0 and section.blocks[end - 1] == ['']:
+        end -= 1
+    section.blocks[end:end] = blocks
+
+
+def merge_markdown(target: str, source: str,
+                   near_duplicate_threshold: Optional[float] = None) -> str:
+    """Merge ``source`` into ``target`` section by section.
+
+    - Sections are matched by header path; unmatched source sections are
+      added at the end of their parent section, unless all of their content
+      is bullets the target already has.
+    - Within a matched section, source blocks that are not already present
+      are appended to the end of that section.
+    - A bullet already present anywhere in the target is never added again.
+    - With ``near_duplicate_threshold``, a bullet whose similarity to a
+      bullet already in the target reaches the threshold is not added either
+      (see :mod:`claude_multi.neardup`).
+
+    The result is stable: ``merge_markdown(merge_markdown(t, s), s)`` equals
+    ``merge_markdown(t, s)``, and merging unchanged content returns ``target``
+    unchanged.
+    """
+    target_sections = parse_sections(target)
+    source_sections = parse_sections(source)
+
+    index: Dict[SectionKey, Section] = {}
+    # Last section (in output order) within the subtree of each header path
+    subtree_tail: Dict[SectionKey, Section] = {}
+    bullet_keys: Set[str] = set()
+    near_duplicates = None
+    if near_duplicate_threshold:
+        near_duplicates = NearDuplicateIndex(near_duplicate_threshold)
+
+    for section in target_sections:
+        existing = index.get(section.key)
+        if existing is not None:
+            # Repeated header: share one dedup set, append to the last occurrence
+            existing.keys |= section.keys
+            section.keys = existing.keys
+        index[section.key] = section
+        for depth in range(len(section.key) + 1):
+            subtree_tail[section.key[:depth]] = section
+        for block in section.blocks:
+            if len(block) == 1 and is_bullet(block[0]):
+                key = normalize_line(block[0])
+                if near_duplicates is not None and key not in bullet_keys:
+                    near_duplicates.add(key)
+                bullet_keys.add(key)
+
+    skipped: Dict[SectionKey, Section] = {}
+    # Next section in output order (by id), built the first time it is needed
+    following: Dict[int, Optional[Section]] = {}
+    # Where the last search for the end of a parent's sections of a level stopped
+    scanned: Dict[Tuple[int, int], Section] = {}
+
+    def place(section: Section):
+        """Add a new section at the end of its parent section."""
+        parent = section.key[:-1]
+        if parent not in index:
+            place(skipped.pop(parent))
+
+        level = section.key[-1][0]
+        anchor = subtree_tail[parent]
+        if open_headers(anchor.key, level) != parent:
+            # At the end of the parent's subtree the header would nest under a
+            # section of a higher level (e.g. "## B" after "# A" when B is
+            # top-level in the source); put it right before the first such
+            # section instead, where it keeps its header path
+            if not following:
+                order = list(iter_sections(target_sections))
+                following.update(zip(map(id, order), order[1:] + [None]))
+            start = (id(index[parent]), level)
+            anchor = scanned.get(start, index[parent])
+            item = following[id(anchor)]
+            while item is not None and item.key[-1][0] >= level:
+                anchor = item
+                item = following[id(item)]
+            scanned[start] = section
+        if anchor.blocks and anchor.blocks[-1] != ['']:
+            anchor.blocks.append([''])
+        anchor.followers.insert(0, section)
+        if following:
+            following[id(section)] = following[id(anchor)]
+            following[id(anchor)] = section
+
+        index[section.key] = section
+        for depth in range(len(section.key)):
+            if subtree_tail[section.key[:depth]] is anchor:
+                subtree_tail[section.key[:depth]] = section
+        subtree_tail[section.key] = section
+
+    changed = False
+
+    for source_section in source_sections:
+        section = index.get(source_section.key)
+
+        if section is None:
+            # New section: copied as-is, minus bullets the file already has
+            blocks = []
+            had_content = False
+            for block in source_section.blocks:
+                key = block_key(block)
+                if key and len(block) == 1 and is_bullet(block[0]):
+                    had_content = True
+                    if key in bullet_keys or (near_duplicates is not None and
+                                              near_duplicates.find(key) is not None):
+                        continue
+                    if near_duplicates is not None:
+                        near_duplicates.add(key)
+                    bullet_keys.add(key)
+                else:
+                    had_content = had_content or bool(key)
+                blocks.append(list(block))
+
+            section = Section(source_section.key, source_section.header)
+            section.blocks = blocks
+            section.keys = {key for key in map(block_key, blocks) if key}
+
+            if had_content and not any(block_key(block) for block in blocks):
+                # Nothing new, e.g. an old update section whose bullets were
+                # compacted into other sections; only added if a subsection is
+                skipped[section.key] = section
+                continue
+
+            place(section)
+            changed = True
+            continue
+
+        additions = []
+        for block in source_section.blocks:
+            key = block_key(block)
+            if not key or key in section.keys:
+                continue
+            bullet = len(block) == 1 and is_bullet(block[0])
+            if bullet and key in bullet_keys:
+                continue
+            if bullet and near_duplicates is not None:
+                if near_duplicates.find(key) is not None:
+                    continue
+                near_duplicates.add(key)
+            section.keys.add(key)
+            if bullet:
+                bullet_keys.add(key)
+            additions.append(list(block))
+
+        if additions:
+            insert_blocks(section, additions)
+            changed = True
+
+    if not changed:
+        return target
+
+    return render_sections(target_sections)
+
+
+def dedupe_markdown(content: str, threshold: Optional[float] = None) -> Tuple[str, List[str]]:
+    """Remove duplicate bullets from a memory file, keeping the first occurrence.
+
+    Exact duplicates (after normalization) are always removed; with
+    ``threshold``, near-duplicates are removed too.
+
+    Returns:
+        (new content, removed lines)
+    """
+    sections = parse_sections(content)
+    bullet_keys: Set[str] = set()
+    near_duplicates = NearDuplicateIndex(threshold) if threshold else None
+    removed: List[str] = []
+
+    for section in sections:
+        kept = []
+        for block in section.blocks:
+            if len(block) == 1 and is_bullet(block[0]):
+                key = normalize_line(block[0])
+                if key in bullet_keys or (near_duplicates is not None and
+                                          near_duplicates.find(key) is not None):
+                    removed.append(block[0])
+                    continue
+                bullet_keys.add(key)
+                if near_duplicates is not None:
+                    near_duplicates.add(key)
+            kept.append(block)
+        section.blocks = kept
+
+    if not removed:
+        return content, removed
+    return render_sections(sections), removed
+
+
+def _iter_blocks(f: BinaryIO) -> Iterator[Tuple]:
+    """Stream a binary file as parse events, using the same rules as :func:`parse_sections`.
+
+    Yields ``('header', key, line, start, end)`` for headers and
+    ``('block', lines, start, end)`` for content blocks, where ``start`` and
+    ``end`` are byte offsets. Lines are split like ``content.split('\\n')``
+    (so a trailing newline produces a final empty line) with ``\\r\\n``
+    treated as a newline, matching a text-mode read.
+    """
+    stack: List[Tuple[int, str]] = []
+    fence: Optional[str] = None
+    fenced: List[str] = []
+    fenced_start = 0
+
+    def lines():
+        offset = 0
+        ended_with_newline = True
+        for raw in f:
+            end = offset + len(raw)
+            ended_with_newline = raw.endswith(b'\n')
+            line = raw[:-1] if ended_with_newline else raw
+            if line.endswith(b'\r'):
+                line = line[:-1]
+            yield offset, end, line.decode('utf-8')
+            offset = end
+        if ended_with_newline:
+            yield offset, offset, ''
+
+    end = 0
+    for start, end, line in lines():
+        stripped = line.strip()
+
+        if fence is not None:
+            fenced.append(line)
+            if stripped.startswith(fence):
+                yield ('block', fenced, fenced_start, end)
+                fence = None
+            continue
+
+        if stripped.startswith(FENCE_MARKERS):
+            fence = stripped[:3]
+            fenced = [line]
+            fenced_start = start
+            continue
+
+        match = HEADER_RE.match(line)
+        if match:
+            level = len(match.group(1))
+            title = ' '.join(match.group(2).split()).lower()
+            while stack and stack[-1][0] >= level:
+                stack.pop()
+            stack.append((level, title))
+            yield ('header', tuple(stack), line, start, end)
+        else:
+            yield ('block', [line], start, end)
+
+    if fence is not None:
+        yield ('block', fenced, fenced_start, end)
+
+
+class _StreamSection:
+    """What a streaming merge needs to remember about one output section."""
+
+    __slots__ = ('key', 'has_blocks', 'trailing_blanks', 'extra_blank',
+                 'additions', 'followers', 'source_range')
+
+    def __init__(self, key: SectionKey):
+        self.key = key
+        self.has_blocks = False
+        # Number of blank lines at the end of the section's own content
+        self.trailing_blanks = 0
+        # Whether a blank line is added after the section to separate a new one
+        self.extra_blank = False
+        # [start, end, line count] ranges of source lines appended to the section
+        self.additions: List[List[int]] = []
+        self.followers: List[int] = []
+        # For sections that only exist in the source: [start, end, line count]
+        # of the header; their content is in ``additions``
+        self.source_range: Optional[List[int]] = None
+
+
+class StreamingMerge:
+    """Bounded-memory equivalent of :func:`merge_markdown` for very large files.
+
+    Instead of loading both files, the target is scanned once to build the
+    section index and hashed dedup sets, the source is scanned once to plan
+    which of its line ranges go where, and the output is written by
+    streaming the target again while copying planned ranges from the source.
+    Memory use is proportional to the number of distinct lines (one hash
+    each) and sections, not to file size.
+
+    Near-duplicate detection is not supported in this mode.
+
+    Usage::
+
+        merge = StreamingMerge(source, target)
+        if merge.plan():
+            with atomic_writer(target) as out:
+                merge.write(out)
+    """
+
+    def __init__(self, source: Path, target: Path):
+        self.source = source
+        self.target = target
+        self._sections: List[_StreamSection] = []
+
+    def plan(self) -> bool:
+        """Scan both files and work out the merge.
+
+        Returns:
+            True if merging would change the target
+        """
+        sections = [_StreamSection(())]
+        index: Dict[SectionKey, int] = {(): 0}
+        keysets: Dict[SectionKey, Set[int]] = {(): set()}
+        subtree_tail: Dict[SectionKey, int] = {(): 0}
+        bullet_keys: Set[int] = set()
+
+        with open(self.target, 'rb') as f:
+            current = sections[0]
+            for event in _iter_blocks(f):
+                if event[0] == 'header':
+                    key = event[1]
+                    current = _StreamSection(key)
+                    index[key] = len(sections)
+                    keysets.setdefault(key, set())
+                    for depth in range(len(key) + 1):
+                        subtree_tail[key[:depth]] = len(sections)
+                    sections.append(current)
+                    continue
+
+                block = event[1]
+                current.has_blocks = True
+                if block == ['']:
+                    current.trailing_blanks += 1
+                    continue
+                current.trailing_blanks = 0
+                key = block_key(block)
+                if key:
+                    keysets[current.key].add(hash(key))
+                    if len(block) == 1 and is_bullet(block[0]):
+                        bullet_keys.add(hash(key))
+
+        target_count = len(sections)
+        skipped: Dict[SectionKey, Tuple[_StreamSection, Set[int]]] = {}
+        # Next section in output order, built the first time it is needed
+        following: Dict[int, Optional[int]] = {}
+        scanned: Dict[Tuple[int, int], int] = {}
+
+        def output_order() -> Iterator[int]:
+            pending = list(reversed(range(target_count)))
+            while pending:
+                section_id = pending.pop()
+                yield section_id
+                pending.extend(reversed(sections[section_id].followers))
+
+        def place(section: _StreamSection, keys: Set[int]):
+            """Add a section that only exists in the source at the end of its parent."""
+            key = section.key
+            parent = key[:-1]
+            if parent not in index:
+                place(*skipped.pop(parent))
+
+            level = key[-1][0]
+            anchor_id = subtree_tail[parent]
+            if open_headers(sections[anchor_id].key, level) != parent:
+                # Same fallback as merge_markdown: right before the first
+                # section in the parent's subtree of a higher level
+                if not following:
+                    order = list(output_order())
+                    following.update(zip(order, order[1:] + [None]))
+                start = (index[parent], level)
+                anchor_id = scanned.get(start, index[parent])
+                next_id = following[anchor_id]
+                while next_id is not None and sections[next_id].key[-1][0] >= level:
+                    anchor_id = next_id
+                    next_id = following[next_id]
+                scanned[start] = len(sections)
+            anchor = sections[anchor_id]
+            if anchor.has_blocks and not (anchor.trailing_blanks or anchor.extra_blank):
+                anchor.extra_blank = True
+
+            section_id = len(sections)
+            sections.append(section)
+            anchor.followers.insert(0, section_id)
+            if following:
+                following[section_id] = following[anchor_id]
+                following[anchor_id] = section_id
+            index[key] = section_id
+            keysets[key] = keys
+            for depth in range(len(key)):
+                if subtree_tail[key[:depth]] == anchor_id:
+                    subtree_tail[key[:depth]] = section_id
+            subtree_tail[key] = section_id
+
+        def add_range(ranges: List[List[int]], start: int, end: int, count: int):
+            if ranges and ranges[-1][1] == start:
+                ranges[-1][1] = end
+                ranges[-1][2] += count
+            else:
+                ranges.append([start, end, count])
+
+        changed = False
+        with open(self.source, 'rb') as f:
+            section_id = 0
+            # A section that only exists in the source is placed once its end
+            # is reached, since it is skipped if it has nothing new
+            new_section: Optional[_StreamSection] = None
+            new_keys: Set[int] = set()
+            had_content = has_content = False
+            held_blanks: List[List[int]] = []
+
+            for event in _iter_blocks(f):
+                if event[0] == 'header':
+                    if new_section is not None:
+                        if has_content or not had_content:
+                            place(new_section, new_keys)
+                            changed = True
+                        else:
+                            skipped[new_section.key] = (new_section, new_keys)
+                    new_section = None
+
+                    _, key, _line, start, end = event
+                    section_id = index.get(key)
+                    if section_id is None:
+                        new_section = _StreamSection(key)
+                        new_section.source_range = [start, end, 1]
+                        new_keys = set()
+                        had_content = has_content = False
+                        held_blanks = []
+                    continue
+
+                _, block, start, end = event
+                key = block_key(block)
+                bullet = len(block) == 1 and is_bullet(block[0])
+
+                if new_section is not None:
+                    # New sections are copied as-is, minus bullets the file already has
+                    had_content = had_content or bool(key)
+                    if bullet and key:
+                        hashed = hash(key)
+                        if hashed in bullet_keys:
+                            continue
+                        bullet_keys.add(hashed)
+                    new_section.has_blocks = True
+                    if block == ['']:
+                        add_range(held_blanks, start, end, 1)
+                        new_section.trailing_blanks += 1
+                        continue
+                    for blank_range in held_blanks:
+                        add_range(new_section.additions, *blank_range)
+                    held_blanks = []
+                    new_section.trailing_blanks = 0
+                    add_range(new_section.additions, start, end, len(block))
+                    if key:
+                        new_keys.add(hash(key))
+                        has_content = True
+                    continue
+
+                if not key:
+                    continue
+                section = sections[section_id]
+                hashed = hash(key)
+                keys = keysets[section.key]
+                if hashed in keys or (bullet and hashed in bullet_keys):
+                    continue
+                keys.add(hashed)
+                if bullet:
+                    bullet_keys.add(hashed)
+                add_range(section.additions, start, end, len(block))
+                section.has_blocks = True
+                changed = True
+
+            if new_section is not None and (has_content or not had_content):
+                place(new_section, new_keys)
+                changed = True
+
+        self._sections = sections
+        return changed
+
+    def write(self, out: BinaryIO):
+        """Write the merged result planned by :meth:`plan` to a binary file."""
+        sections = self._sections
+        first = True
+
+        def emit(line: str):
+            nonlocal first
+            if not first:
+                out.write(b'\n')
+            out.write(line.encode('utf-8'))
+            first = False
+
+        def copy_range(source_file: BinaryIO, source_range: List[int]):
+            start, _end, count = source_range
+            source_file.seek(start)
+            for _ in range(count):
+                raw = source_file.readline()
+                line = raw[:-1] if raw.endswith(b'\n') else raw
+                if line.endswith(b'\r'):
+                    line = line[:-1]
+                emit(line.decode('utf-8'))
+
+        def finish(section: _StreamSection, blanks: int, source_file: BinaryIO):
+            for addition in section.additions:
+                copy_range(source_file, addition)
+            for _ in range(blanks):
+                emit('')
+            if section.extra_blank:
+                emit('')
+
+            pending = list(reversed(section.followers))
+            while pending:
+                follower = sections[pending.pop()]
+                copy_range(source_file, follower.source_range)
+                for addition in follower.additions:
+                    copy_range(source_file, addition)
+                for _ in range(follower.trailing_blanks):
+                    emit('')
+                if follower.extra_blank:
+                    emit('')
+                pending.extend(reversed(follower.followers))
+
+        with open(self.target, 'rb') as target_file, open(self.source, 'rb') as source_file:
+            section_id = 0
+            held_blanks = 0
+            for event in _iter_blocks(target_file):
+                if event[0] == 'header':
+                    finish(sections[section_id], held_blanks, source_file)
+                    held_blanks = 0
+                    section_id += 1
+                    emit(event[2])
+                    continue
+
+                block = event[1]
+                if block == ['']:
+                    held_blanks += 1
+                    continue
+                for _ in range(held_blanks):
+                    emit('')
+                held_blanks = 0
+                for line in block:
+                    emit(line)
+
+            finish(sections[section_id], held_blanks, source_file)
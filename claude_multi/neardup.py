@@ -0,0 +1,112 @@
+"""Near-duplicate detection for memory bullets.
+
+Similarity is the Jaccard similarity of the character 3-grams of two
+normalized lines. Candidates are found with MinHash signatures (one-permutation
+hashing, so each shingle is hashed once) and locality-sensitive banding, then
+verified exactly. Adding and querying N lines is roughly linear in N instead
+of comparing every pair.
+"""
+
+import zlib
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+SHINGLE_SIZE = 3
+SIGNATURE_SIZE = 32
+# Minimum probability that a pair exactly at the threshold becomes a candidate
+TARGET_RECALL = 0.95
+
+_EMPTY = 0xFFFFFFFF
+
+
+def shingles(text: str) -> FrozenSet[str]:
+    """Get the character shingles of an already normalized line."""
+    if len(text) <= SHINGLE_SIZE:
+        return frozenset([text]) if text else frozenset()
+    return frozenset(text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1))
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """Jaccard similarity of two shingle sets."""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def minhash(shingle_set: FrozenSet[str]) -> Tuple[int, ...]:
+    """Compute a one-permutation MinHash signature.
+
+    Every shingle is hashed once and assigned to one of ``SIGNATURE_SIZE``
+    bins by its hash; each bin keeps its minimum. Empty bins borrow the value
+    of the next non-empty bin so short lines still get a full signature.
+    """
+    bins = [_EMPTY] * SIGNATURE_SIZE
+    for shingle in shingle_set:
+        value = zlib.crc32(shingle.encode('utf-8'))
+        index = value % SIGNATURE_SIZE
+        if value < bins[index]:
+            bins[index] = value
+
+    if all(value == _EMPTY for value in bins):
+        return tuple(bins)
+
+    signature = []
+    for i in range(SIGNATURE_SIZE):
+        offset = 0
+        while bins[(i + offset) % SIGNATURE_SIZE] == _EMPTY:
+            offset += 1
+        signature.append(bins[(i + offset) % SIGNATURE_SIZE] + offset)
+    return tuple(signature)
+
+
+def choose_bands(threshold: float) -> Tuple[int, int]:
+    """Pick (bands, rows per band) for a similarity threshold.
+
+    Uses the most selective banding whose probability of catching a pair at
+    exactly ``threshold`` is still at least ``TARGET_RECALL``.
+    """
+    best = (SIGNATURE_SIZE, 1)
+    for rows in range(1, SIGNATURE_SIZE + 1):
+        if SIGNATURE_SIZE % rows:
+            continue
+        bands = SIGNATURE_SIZE // rows
+        if 1 - (1 - threshold ** rows) ** bands >= TARGET_RECALL:
+            best = (bands, rows)
+    return best
+
+
+class NearDuplicateIndex:
+    """Finds previously added lines that are near-duplicates of a new one."""
+
+    def __init__(self, threshold: float):
+        if isinstance(threshold, bool) or not isinstance(threshold, (int, float)) or not 0 < threshold <= 1:
+            raise ValueError(f"Similarity threshold must be in (0, 1], got {threshold}")
+        self.threshold = threshold
+        self.bands, self.rows = choose_bands(threshold)
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = {}
+        self._items: List[Tuple[str, FrozenSet[str]]] = []
+
+    def _band_keys(self, signature: Tuple[int, ...]):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows]
+
+    def find(self, text: str) -> Optional[str]:
+        """Return an added line at least ``threshold`` similar to ``text``, if any."""
+        shingle_set = shingles(text)
+        checked = set()
+        for key in self._band_keys(minhash(shingle_set)):
+            for item in self._buckets.get(key, ()):
+                if item in checked:
+                    continue
+                checked.add(item)
+                other_text, other_shingles = self._items[item]
+                if jaccard(shingle_set, other_shingles) >= self.threshold:
+                    return other_text
+        return None
+
+    def add(self, text: str):
+        """Add a line to the index."""
+        shingle_set = shingles(text)
+        item = len(self._items)
+        self._items.append((text, shingle_set))
+        for key in self._band_keys(minhash(shingle_set)):
+            self._buckets.setdefault(key, []).append(item)
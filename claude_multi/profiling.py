@@ -0,0 +1,92 @@
+"""Per-phase timings and counters for profiling commands."""
+
+import json
+import time
+import threading
+from pathlib import Path
+from datetime import datetime
+from contextlib import contextmanager
+from typing import Dict
+
+
+class Profiler:
+    """Collects wall time per phase and named counters for one command.
+
+    Phases can be nested (``sync_from_session/snapshot``) and may be entered
+    from several threads at once; each thread nests its own phases. Time
+    spent in a phase is summed over all calls.
+    """
+
+    def __init__(self, command: str = ""):
+        self.command = command
+        self.phases: Dict[str, Dict] = {}
+        self.counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time the enclosed block as a phase."""
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(name)
+        path = "/".join(stack)
+        with self._lock:
+            # Registered on entry so phases are listed in the order they start
+            entry = self.phases.setdefault(path, {"calls": 0, "seconds": 0.0})
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            stack.pop()
+            with self._lock:
+                entry["calls"] += 1
+                entry["seconds"] += elapsed
+
+    def count(self, name: str, amount: int = 1):
+        """Add to a counter."""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def add_stats(self, stats):
+        """Add every counter of a :class:`SyncStats`."""
+        for name, value in vars(stats).items():
+            self.count(name, value)
+
+    def to_dict(self) -> Dict:
+        """Get the collected data as a JSON-serializable dict."""
+        with self._lock:
+            return {
+                "time": datetime.now().isoformat(timespec="seconds"),
+                "command": self.command,
+                "wall_seconds": time.perf_counter() - self._started,
+                "phases": {name: dict(entry) for name, entry in self.phases.items()},
+                "counters": dict(self.counters),
+            }
+
+    def print_summary(self):
+        """Print phase timings and counters as a table."""
+        data = self.to_dict()
+        width = max([len(name) for name in data["phases"]] + [len(name) for name in data["counters"]] + [5])
+
+        print(f"\n=== Profile: {self.command or 'claude-multi'} ===\n")
+        print(f"  {'Phase':<{width}}  {'Calls':>5}  {'Time':>10}")
+        for name, entry in data["phases"].items():
+            print(f"  {name:<{width}}  {entry['calls']:>5}  {entry['seconds'] * 1000:>8.1f}ms")
+        print(f"  {'Total':<{width}}  {'':>5}  {data['wall_seconds'] * 1000:>8.1f}ms")
+
+        if data["counters"]:
+            print()
+            for name, value in sorted(data["counters"].items()):
+                print(f"  {name:<{width}}  {value:>16}")
+        print()
+
+    def append_to(self, path: Path):
+        """Append the collected data as one JSON line to a metrics file."""
+        path = Path(path).expanduser()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(self.to_dict(), sort_keys=True) + "\n")
@@ -0,0 +1,78 @@
+"""Registry and discovery of projects known to Claude Multi."""
+
+import json
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from .locking import FileLock, atomic_write
+
+
+class ProjectRegistry:
+    """Remembers which Claude Code project directory belongs to which session.
+
+    Entries are keyed by the Claude Code project directory name (e.g.
+    ``home-user-projects-myapp``) and record the working directory and
+    session name last used with it.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.path = config.config_dir / "projects.json"
+
+    def load(self) -> Dict[str, Dict[str, str]]:
+        """Load all registered projects."""
+        if not self.path.exists():
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def register(self, claude_project_path: Path, project_path: Path, session_name: str):
+        """Record (or update) the session and working directory of a project."""
+        entry = {"project_path": str(project_path), "session_name": session_name}
+        with FileLock(self.config.locks_dir / "projects.lock"):
+            projects = self.load()
+            if projects.get(claude_project_path.name) == entry:
+                return
+            projects[claude_project_path.name] = entry
+            atomic_write(self.path, json.dumps(projects, indent=2, sort_keys=True))
+
+    def discover(self) -> List[Tuple[Path, str]]:
+        """Find every known project.
+
+        Projects come from the registry and from ``~/.claude/projects``
+        directories that have a ``memory/`` folder. For unregistered
+        directories the session name is taken from ``sessions_dir`` when a
+        tracked session name matches the end of the directory name, and is
+        the directory name otherwise.
+
+        Returns:
+            Sorted list of (Claude Code project path, session name)
+        """
+        projects_dir = self.config.claude_projects_dir
+        registry = self.load()
+        session_names = []
+        if self.config.sessions_dir.exists():
+            session_names = sorted((d.name for d in self.config.sessions_dir.iterdir() if d.is_dir()),
+                                   key=len, reverse=True)
+
+        found: Dict[str, str] = {}
+        for dir_name, entry in registry.items():
+            if (projects_dir / dir_name).is_dir():
+                found[dir_name] = entry["session_name"]
+
+        if projects_dir.exists():
+            for project_dir in projects_dir.iterdir():
+                if project_dir.name in found or not (project_dir / "memory").is_dir():
+                    continue
+                session_name = project_dir.name
+                for name in session_names:
+                    if project_dir.name == name or project_dir.name.endswith(f"-{name}"):
+                        session_name = name
+                        break
+                found[project_dir.name] = session_name
+
+        return sorted((projects_dir / dir_name, session_name)
+                      for dir_name, session_name in found.items())
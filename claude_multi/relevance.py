@@ -0,0 +1,233 @@
+"""Relevance filtering of topic files synced into sessions.
+
+Syncing every topic directory into every project bloats the memory of
+sessions working on unrelated code, and sync time grows with the whole pool.
+The selector builds a term profile of the project a session works in (file
+names and contents, with the project's own CLAUDE.md instructions weighted
+higher), scores every section of every topic file against it with TF-IDF
+over the shared pool's search index, and keeps the best files up to a
+top-K limit and a token budget. In a sharded pool, only topic files in the
+shards the project subscribes to compete for those places.
+
+The profile and the selection are cached per project under
+``~/.claude-multi/relevance`` and reused until the project's files, the
+shared pool or the settings change.
+"""
+
+import os
+import json
+import math
+import hashlib
+import sqlite3
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from .compact import estimate_tokens
+from .locking import atomic_write
+from .merge import GENERATED_CLAUDE_MD, PROJECT_SPECIFIC_MARKER
+from .search import tokenize
+from .shards import is_topic_file, pool_files, split_pool_path
+
+# Directories never scanned when profiling a project
+SKIP_DIRS = {"node_modules", "__pycache__", "venv", "env", "build", "dist", "target", "vendor"}
+
+MAX_PROJECT_FILES = 2000
+MAX_FILE_BYTES = 64 * 1024
+
+# Terms kept in a project profile (the most frequent ones)
+MAX_PROFILE_TERMS = 200
+
+# How much more the project's own CLAUDE.md instructions count than a source file
+INSTRUCTIONS_WEIGHT = 3
+
+CACHE_VERSION = 1
+
+
+def scan_project(working_dir: Path) -> List[Tuple[str, int, int]]:
+    """List (relative path, size, mtime) of the files that make up a project's profile.
+
+    Hidden directories and common dependency and build directories are
+    skipped, and at most ``MAX_PROJECT_FILES`` files are listed.
+    """
+    files = []
+    for root, dirs, names in os.walk(working_dir):
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.') and d not in SKIP_DIRS)
+        for name in sorted(names):
+            if name.startswith('.'):
+                continue
+            path = Path(root) / name
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((path.relative_to(working_dir).as_posix(), stat.st_size, stat.st_mtime_ns))
+            if len(files) >= MAX_PROJECT_FILES:
+                return files
+    return files
+
+
+def project_instructions(content: str) -> str:
+    """Get a project's own instructions from its CLAUDE.md.
+
+    Instructions generated by claude-multi come from the shared pool and say
+    nothing about the project, so only the project-specific part counts.
+    """
+    if not content.startswith(GENERATED_CLAUDE_MD):
+        return content
+    position = content.find(PROJECT_SPECIFIC_MARKER)
+    return "" if position == -1 else content[position:]
+
+
+def build_profile(working_dir: Path, files: List[Tuple[str, int, int]]) -> Dict[str, float]:
+    """Build the term profile of a project.
+
+    A term's weight grows with the number of files that mention it (in the
+    path or the first ``MAX_FILE_BYTES`` bytes), so large files do not
+    dominate. Binary files only contribute their path.
+
+    Returns:
+        Weight of each of the ``MAX_PROFILE_TERMS`` most common terms
+    """
+    counts: Dict[str, float] = {}
+    for rel_path, _size, _mtime in files:
+        terms = set(tokenize(rel_path.replace('/', ' ').replace('.', ' ')))
+        weight = 1
+        try:
+            with open(working_dir / rel_path, 'rb') as f:
+                data = f.read(MAX_FILE_BYTES)
+        except OSError:
+            data = b''
+        if b'\0' not in data:
+            text = data.decode('utf-8', errors='ignore')
+            if rel_path == "CLAUDE.md":
+                text = project_instructions(text)
+                weight = INSTRUCTIONS_WEIGHT
+            terms.update(tokenize(text))
+        for term in terms:
+            counts[term] = counts.get(term, 0) + weight
+
+    top = sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:MAX_PROFILE_TERMS]
+    return {term: 1 + math.log(count) for term, count in top}
+
+
+class RelevanceSelector:
+    """Picks the topic files worth syncing into a project's session."""
+
+    def __init__(self, config, search_index):
+        self.config = config
+        self.search_index = search_index
+        self.cache_dir = config.relevance_dir
+
+    def _cache_path(self, working_dir: Path) -> Path:
+        name = hashlib.sha1(str(working_dir).encode('utf-8')).hexdigest()
+        return self.cache_dir / f"{name}.json"
+
+    def _load_cache(self, working_dir: Path) -> Dict:
+        try:
+            with open(self._cache_path(working_dir), 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return cache if cache.get("version") == CACHE_VERSION else {}
+
+    def profile(self, working_dir: Path, cache: Optional[Dict] = None) -> Dict[str, float]:
+        """Get the term profile of a project, rebuilding it only if its files changed."""
+        cache = self._load_cache(working_dir) if cache is None else cache
+        files = scan_project(working_dir)
+        fingerprint = hashlib.sha256(json.dumps(files).encode('utf-8')).hexdigest()
+        if cache.get("project") != fingerprint:
+            cache.clear()
+            cache.update(version=CACHE_VERSION, project=fingerprint,
+                         terms=build_profile(working_dir, files))
+        return cache["terms"]
+
+    def rank(self, working_dir: Path, shards: Optional[List[str]] = None) -> List[Tuple[str, float]]:
+        """Score every topic file against a project.
+
+        A file scores as its best-matching section, so one highly relevant
+        section is enough to sync a file that is mostly about other things.
+
+        Args:
+            working_dir: The project's working directory
+            shards: Shards the project subscribes to (None for all)
+
+        Returns:
+            (relative path, score) of every topic file, best first
+        """
+        terms = self.profile(working_dir)
+        self.search_index.refresh()
+        return self._rank(terms, shards)
+
+    def _rank(self, terms: Dict[str, float],
+              subscribed: Optional[List[str]] = None) -> List[Tuple[str, float]]:
+        shards = self.config.get("shards") or {}
+
+        def candidate(rel_path: str) -> bool:
+            if not is_topic_file(rel_path, shards):
+                return False
+            return subscribed is None or split_pool_path(rel_path, shards)[0] in subscribed
+
+        scores: Dict[str, float] = {}
+        for (rel_path, _section), score in self.search_index.score_sections(terms).items():
+            if candidate(rel_path):
+                scores[rel_path] = max(score, scores.get(rel_path, 0.0))
+
+        for rel_path in pool_files(self.config):
+            if candidate(rel_path):
+                scores.setdefault(rel_path, 0.0)
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+    def select(self, working_dir: Path, top_k: Optional[int] = None,
+               budget: Optional[int] = None,
+               shards: Optional[List[str]] = None) -> Optional[Set[str]]:
+        """Pick the topic files to sync into a project's session.
+
+        The best-scoring files with a score above zero are taken in order,
+        up to ``top_k`` files; with a token budget, files that would exceed
+        it are passed over in favour of smaller ones further down.
+
+        Args:
+            working_dir: The project's working directory
+            top_k: Maximum number of topic files
+            budget: Maximum estimated tokens over the selected files
+            shards: Shards the project subscribes to (None for all); files
+                in other shards are never selected
+
+        Returns:
+            Relative paths of the selected topic files, or None if no
+            selection could be made (every topic file should be synced)
+        """
+        cache = self._load_cache(working_dir)
+        terms = self.profile(working_dir, cache)
+        if not terms:
+            return None
+
+        settings = [top_k, budget, self.config.get("shards") or {}, shards]
+        try:
+            self.search_index.refresh()
+            pool = self.search_index.fingerprint()
+            if cache.get("pool") == pool and cache.get("settings") == settings:
+                return set(cache["selected"])
+            ranking = self._rank(terms, shards)
+        except (sqlite3.Error, OSError):
+            return None
+
+        shared_dir = self.config.shared_memory_dir
+        selected = []
+        used = 0
+        for rel_path, score in ranking:
+            if score <= 0 or (top_k is not None and len(selected) >= top_k):
+                break
+            try:
+                tokens = estimate_tokens((shared_dir / rel_path).stat().st_size)
+            except OSError:
+                continue
+            if budget is not None and used + tokens > budget:
+                continue
+            selected.append(rel_path)
+            used += tokens
+
+        cache.update(pool=pool, settings=settings, selected=selected)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        atomic_write(self._cache_path(working_dir), json.dumps(cache, indent=2, sort_keys=True))
+        return set(selected)
@@ -0,0 +1,211 @@
+"""Block-delta replication of the shared pool to a remote directory.
+
+A remote is any directory both machines can reach (a local path or a
+mounted share); no server process is involved. It stores file contents as
+blocks in a compressed :class:`~claude_multi.snapshots.ObjectStore` and,
+for every memory file, a small block list::
+
+    <remote>/blocks/ab/cdef...     block contents, keyed by SHA-256
+    <remote>/files/<path>.json     {"size", "hash", "blocks": [[digest, size, weak], ...]}
+    <remote>/lock
+
+Pushing a new version of a file computes an rsync-style delta against the
+remote's previous block list: a rolling checksum finds the old blocks at any
+offset of the new content, and only the bytes in between are uploaded as new
+blocks. Pulling fetches only the blocks that are not part of the version
+last exchanged with that remote, which is kept in the local object store.
+"""
+
+import json
+import hashlib
+from itertools import accumulate
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from .locking import FileLock, atomic_write
+from .snapshots import ObjectStore
+
+BLOCK_SIZE = 1024
+
+# Modulus of both halves of the rolling checksum (as in rsync)
+CHECKSUM_MODULUS = 1 << 16
+
+BLOCK_LIST_VERSION = 1
+
+# A block list entry: [SHA-256 hex digest, size, weak checksum]
+Block = List
+
+
+def weak_checksum(data: bytes) -> Tuple[int, int]:
+    """Compute the two halves of the rolling checksum of a block.
+
+    ``a`` is the sum of the bytes and ``b`` the sum of the running sums, so
+    both can be updated in constant time when the window slides by a byte.
+    """
+    return sum(data) % CHECKSUM_MODULUS, sum(accumulate(data)) % CHECKSUM_MODULUS
+
+
+def _block(data: bytes) -> Block:
+    a, b = weak_checksum(data)
+    return [hashlib.sha256(data).hexdigest(), len(data), (b << 16) | a]
+
+
+def delta_blocks(data: bytes, basis: List[Block]) -> List[Block]:
+    """Split content into blocks, reusing blocks of a previous version where possible.
+
+    Full-size blocks of ``basis`` are matched at any offset of ``data``:
+    aligned positions are tried first by strong hash, and between matches
+    the window rolls byte by byte, confirming weak checksum hits with the
+    strong hash. Unmatched bytes become new blocks of up to ``BLOCK_SIZE``.
+
+    Args:
+        data: New content
+        basis: Block list of the previous version
+
+    Returns:
+        Block list of the new content
+    """
+    known: Dict[int, Set[str]] = {}
+    digests: Set[str] = set()
+    for digest, size, weak in basis:
+        if size == BLOCK_SIZE:
+            known.setdefault(weak, set()).add(digest)
+            digests.add(digest)
+
+    blocks: List[Block] = []
+    length = len(data)
+    literal_start = position = 0
+
+    def flush_literal(end: int):
+        for start in range(literal_start, end, BLOCK_SIZE):
+            blocks.append(_block(data[start:min(start + BLOCK_SIZE, end)]))
+
+    while known and position + BLOCK_SIZE <= length:
+        window = data[position:position + BLOCK_SIZE]
+        digest = hashlib.sha256(window).hexdigest()
+        if digest in digests:
+            flush_literal(position)
+            blocks.append(_block(window))
+            position += BLOCK_SIZE
+            literal_start = position
+            continue
+
+        # Roll until a known block starts (or the data ends)
+        a, b = weak_checksum(window)
+        while True:
+            if position + BLOCK_SIZE >= length:
+                position = length
+                break
+            out, incoming = data[position], data[position + BLOCK_SIZE]
+            a = (a - out + incoming) % CHECKSUM_MODULUS
+            b = (b - BLOCK_SIZE * out + a) % CHECKSUM_MODULUS
+            position += 1
+            candidates = known.get((b << 16) | a)
+            if candidates and hashlib.sha256(data[position:position + BLOCK_SIZE]).hexdigest() in candidates:
+                break
+
+    flush_literal(length)
+    return blocks
+
+
+class RemoteStore:
+    """A remote directory holding replicated memory files as blocks."""
+
+    def __init__(self, root: Path, lock_timeout: float = 30.0):
+        self.root = root
+        self.id = hashlib.sha1(str(root.resolve()).encode('utf-8')).hexdigest()[:16]
+        self.blocks = ObjectStore(root / "blocks", compress=True)
+        self.files_dir = root / "files"
+        self.lock_timeout = lock_timeout
+
+    def lock(self) -> FileLock:
+        """Get the lock serializing pushes and pulls of all machines."""
+        return FileLock(self.root / "lock", self.lock_timeout)
+
+    def block_list_path(self, rel_path: str) -> Path:
+        return self.files_dir / f"{rel_path}.json"
+
+    def list_files(self) -> List[str]:
+        """List the relative paths of all replicated files."""
+        if not self.files_dir.exists():
+            return []
+        return sorted(path.relative_to(self.files_dir).as_posix()[:-len(".json")]
+                      for path in self.files_dir.rglob("*.md.json"))
+
+    def read_block_list(self, rel_path: str) -> Optional[Dict]:
+        """Read a file's block list, or None if the file is not on the remote."""
+        try:
+            with open(self.block_list_path(rel_path), 'r', encoding='utf-8') as f:
+                block_list = json.load(f)
+        except FileNotFoundError:
+            return None
+        if block_list.get("version") != BLOCK_LIST_VERSION:
+            return None
+        return block_list
+
+    def write(self, rel_path: str, data: bytes, basis: Optional[Dict]) -> Tuple[Dict, int]:
+        """Store a new version of a file.
+
+        Args:
+            rel_path: Path relative to the memory root
+            data: New content
+            basis: Block list of the version currently on the remote, if any
+
+        Returns:
+            The new block list and the number of bytes uploaded
+        """
+        blocks = delta_blocks(data, basis["blocks"] if basis else [])
+        present = {block[0] for block in basis["blocks"]} if basis else set()
+        sent = 0
+        offset = 0
+        for digest, size, _weak in blocks:
+            if digest not in present and not self.blocks.has(digest):
+                self.blocks.put_bytes(data[offset:offset + size], digest)
+                sent += size
+            present.add(digest)
+            offset += size
+
+        block_list = {"version": BLOCK_LIST_VERSION, "size": len(data),
+                      "hash": hashlib.sha256(data).hexdigest(), "blocks": blocks}
+        path = self.block_list_path(rel_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write(path, json.dumps(block_list))
+        return block_list, sent
+
+    def read(self, block_list: Dict, known: Dict[str, bytes]) -> Tuple[bytes, int]:
+        """Assemble a file from its blocks.
+
+        Args:
+            block_list: The file's block list
+            known: Contents of blocks available locally, by digest
+
+        Returns:
+            The content and the number of bytes fetched from the remote
+
+        Raises:
+            ValueError: The assembled content does not match the block list
+        """
+        parts = []
+        received = 0
+        for digest, size, _weak in block_list["blocks"]:
+            data = known.get(digest)
+            if data is None:
+                data = self.blocks.get_bytes(digest)
+                known[digest] = data
+                received += size
+            parts.append(data)
+
+        content = b"".join(parts)
+        if hashlib.sha256(content).hexdigest() != block_list["hash"]:
+            raise ValueError("Remote file does not match its block list")
+        return content, received
+
+
+def split_known_blocks(content: bytes, block_list: Dict) -> Dict[str, bytes]:
+    """Map the digests of a block list to their contents, given the whole file."""
+    known = {}
+    offset = 0
+    for digest, size, _weak in block_list["blocks"]:
+        known[digest] = content[offset:offset + size]
+        offset += size
+    return known
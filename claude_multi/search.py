@@ -0,0 +1,400 @@
+"""Full-text search over the shared memory pool.
+
+Every bullet, text line and header of every shared memory file is stored as
+a document in an on-disk inverted index (``~/.claude-multi/search.db``).
+Files are re-indexed individually when a sync changes them, and queries are
+ranked with BM25, weighted towards bullets and matching section titles.
+"""
+
+import re
+import json
+import math
+import hashlib
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .merge import HEADER_RE, FENCE_MARKERS, is_bullet
+from .shards import pool_files
+
+TOKEN_RE = re.compile(r"[a-z0-9_]{2,}")
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Relative weight of each kind of document
+KIND_WEIGHTS = {"header": 1.5, "bullet": 1.2, "text": 1.0}
+SECTION_MATCH_BOOST = 1.3
+
+# Terms per query, below SQLite's limit on bound parameters
+MAX_QUERY_PARAMETERS = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    source TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER,
+    mtime_ns INTEGER,
+    PRIMARY KEY (source, path)
+);
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    path TEXT NOT NULL,
+    section TEXT NOT NULL,
+    line_no INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    text TEXT NOT NULL,
+    length INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS docs_file ON docs (source, path);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    doc_id INTEGER NOT NULL,
+    tf INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS postings_term ON postings (term);
+CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc_id);
+CREATE TABLE IF NOT EXISTS snapshot_refs (
+    session TEXT NOT NULL,
+    snapshot TEXT NOT NULL,
+    path TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    PRIMARY KEY (session, snapshot, path)
+);
+CREATE INDEX IF NOT EXISTS snapshot_refs_hash ON snapshot_refs (hash);
+"""
+
+SHARED = "shared"
+OBJECT = "object"
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase search terms."""
+    return TOKEN_RE.findall(text.lower())
+
+
+def iter_documents(content: str) -> Iterator[Tuple[str, int, str, str]]:
+    """Yield (section, line number, kind, text) for every searchable line."""
+    titles: List[Tuple[int, str]] = []
+    fence: Optional[str] = None
+
+    for line_no, line in enumerate(content.split('\n'), 1):
+        stripped = line.strip()
+        if fence is not None:
+            if stripped.startswith(fence):
+                fence = None
+            elif stripped:
+                yield " > ".join(t for _, t in titles), line_no, "text", stripped
+            continue
+        if stripped.startswith(FENCE_MARKERS):
+            fence = stripped[:3]
+            continue
+        if not stripped:
+            continue
+
+        match = HEADER_RE.match(line)
+        if match:
+            level = len(match.group(1))
+            while titles and titles[-1][0] >= level:
+                titles.pop()
+            titles.append((level, match.group(2)))
+            yield " > ".join(t for _, t in titles), line_no, "header", match.group(2)
+        elif is_bullet(stripped):
+            yield " > ".join(t for _, t in titles), line_no, "bullet", stripped.lstrip('*-+ ')
+        else:
+            yield " > ".join(t for _, t in titles), line_no, "text", stripped
+
+
+class SearchIndex:
+    """Inverted index over shared memory files and, optionally, snapshot history."""
+
+    def __init__(self, config, snapshots=None):
+        self.config = config
+        self.path = config.search_db
+        self.snapshots = snapshots
+        self._schema_ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), timeout=30)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        if not self._schema_ready:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            self._schema_ready = True
+        return conn
+
+    def _replace_documents(self, conn: sqlite3.Connection, source: str, path: str, content: str):
+        conn.execute("DELETE FROM postings WHERE doc_id IN "
+                     "(SELECT id FROM docs WHERE source = ? AND path = ?)", (source, path))
+        conn.execute("DELETE FROM docs WHERE source = ? AND path = ?", (source, path))
+
+        for section, line_no, kind, text in iter_documents(content):
+            terms = tokenize(text)
+            if not terms:
+                continue
+            doc_id = conn.execute(
+                "INSERT INTO docs (source, path, section, line_no, kind, text, length) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (source, path, section, line_no, kind, text, len(terms))).lastrowid
+            counts: Dict[str, int] = {}
+            for term in terms:
+                counts[term] = counts.get(term, 0) + 1
+            conn.executemany("INSERT INTO postings (term, doc_id, tf) VALUES (?, ?, ?)",
+                             [(term, doc_id, tf) for term, tf in counts.items()])
+
+    def _index_shared_file(self, conn: sqlite3.Connection, rel_path: str, path: Path):
+        stat = path.stat()
+        with open(path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        self._replace_documents(conn, SHARED, rel_path, content)
+        conn.execute("INSERT OR REPLACE INTO files (source, path, size, mtime_ns) "
+                     "VALUES (?, ?, ?, ?)", (SHARED, rel_path, stat.st_size, stat.st_mtime_ns))
+
+    def index_file(self, rel_path: str, path: Path):
+        """(Re-)index one shared memory file."""
+        conn = self._connect()
+        try:
+            with conn:
+                self._index_shared_file(conn, rel_path, path)
+        finally:
+            conn.close()
+
+    def update_file(self, rel_path: str, path: Path):
+        """Re-index a shared file after a sync changed it.
+
+        Failures are ignored: the file's recorded size and mtime stay stale,
+        so the next :meth:`refresh` picks it up.
+        """
+        try:
+            self.index_file(rel_path, path)
+        except (sqlite3.Error, OSError, UnicodeDecodeError):
+            pass
+
+    def refresh(self) -> int:
+        """Re-index shared files whose size or mtime changed, and drop deleted ones.
+
+        Returns:
+            Number of files (re-)indexed
+        """
+        shared_dir = self.config.shared_memory_dir
+        on_disk = {rel_path: (shared_dir / rel_path, stat.st_size, stat.st_mtime_ns)
+                   for rel_path, stat in pool_files(self.config).items()}
+
+        conn = self._connect()
+        try:
+            indexed = {path: (size, mtime) for path, size, mtime in conn.execute(
+                "SELECT path, size, mtime_ns FROM files WHERE source = ?", (SHARED,))}
+            updated = 0
+            with conn:
+                for rel_path in indexed.keys() - on_disk.keys():
+                    self._replace_documents(conn, SHARED, rel_path, "")
+                    conn.execute("DELETE FROM files WHERE source = ? AND path = ?", (SHARED, rel_path))
+                for rel_path, (path, size, mtime) in on_disk.items():
+                    if indexed.get(rel_path) != (size, mtime):
+                        self._index_shared_file(conn, rel_path, path)
+                        updated += 1
+            return updated
+        finally:
+            conn.close()
+
+    def refresh_history(self) -> int:
+        """Index snapshots that are not indexed yet.
+
+        Snapshot contents are indexed once per unique object, so history
+        indexing costs grow with the number of distinct file versions rather
+        than the number of snapshots.
+
+        Returns:
+            Number of snapshots indexed
+        """
+        sessions_dir = self.config.sessions_dir
+        if self.snapshots is None or not sessions_dir.exists():
+            return 0
+
+        conn = self._connect()
+        try:
+            known = set(conn.execute("SELECT DISTINCT session, snapshot FROM snapshot_refs"))
+            indexed_objects = {row[0] for row in conn.execute(
+                "SELECT path FROM files WHERE source = ?", (OBJECT,))}
+
+            added = 0
+            for session_dir in sessions_dir.iterdir():
+                if not session_dir.is_dir():
+                    continue
+                for manifest_path in self.snapshots.list_snapshots(session_dir.name):
+                    if (session_dir.name, manifest_path.stem) in known:
+                        continue
+                    files = self.snapshots.read_snapshot(manifest_path)["files"]
+                    with conn:
+                        for rel_path, entry in files.items():
+                            digest = entry["hash"]
+                            if digest not in indexed_objects:
+                                content = self.snapshots.read_file(manifest_path, rel_path)
+                                self._replace_documents(conn, OBJECT, digest,
+                                                        content.decode('utf-8', errors='replace'))
+                                conn.execute("INSERT OR REPLACE INTO files (source, path) VALUES (?, ?)",
+                                             (OBJECT, digest))
+                                indexed_objects.add(digest)
+                            conn.execute("INSERT OR REPLACE INTO snapshot_refs "
+                                         "(session, snapshot, path, hash) VALUES (?, ?, ?, ?)",
+                                         (session_dir.name, manifest_path.stem, rel_path, digest))
+                    added += 1
+            return added
+        finally:
+            conn.close()
+
+    def rebuild(self):
+        """Drop and rebuild the whole search index."""
+        if self.path.exists():
+            conn = self._connect()
+            try:
+                with conn:
+                    for table in ("files", "docs", "postings", "snapshot_refs"):
+                        conn.execute(f"DELETE FROM {table}")
+            finally:
+                conn.close()
+        self.refresh()
+
+    def fingerprint(self) -> str:
+        """Hash the indexed state (path, size, mtime) of every shared file.
+
+        Call :meth:`refresh` first for it to reflect the files on disk.
+        """
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT path, size, mtime_ns FROM files WHERE source = ? ORDER BY path",
+                                (SHARED,)).fetchall()
+        finally:
+            conn.close()
+        return hashlib.sha256(json.dumps(rows).encode('utf-8')).hexdigest()
+
+    def score_sections(self, weights: Dict[str, float]) -> Dict[Tuple[str, str], float]:
+        """Score every section of the shared pool against weighted terms with TF-IDF.
+
+        A section's score sums, over the given terms, the term's weight times
+        its log-scaled frequency in the section and its inverse section
+        frequency, divided by the square root of the section's length so
+        long sections do not win on size alone.
+
+        Args:
+            weights: Query term weights
+
+        Returns:
+            Score of every matching section, keyed by (path, section)
+        """
+        terms = list(weights)
+        if not terms:
+            return {}
+
+        conn = self._connect()
+        try:
+            lengths = {(path, section): length for path, section, length in conn.execute(
+                "SELECT path, section, SUM(length) FROM docs WHERE source = ? GROUP BY path, section",
+                (SHARED,))}
+            if not lengths:
+                return {}
+
+            frequencies: Dict[Tuple[str, str], Dict[str, int]] = {}
+            for start in range(0, len(terms), MAX_QUERY_PARAMETERS):
+                chunk = terms[start:start + MAX_QUERY_PARAMETERS]
+                rows = conn.execute(
+                    f"SELECT d.path, d.section, p.term, SUM(p.tf) FROM postings p "
+                    f"JOIN docs d ON d.id = p.doc_id "
+                    f"WHERE p.term IN ({','.join('?' * len(chunk))}) AND d.source = ? "
+                    f"GROUP BY d.path, d.section, p.term", (*chunk, SHARED))
+                for path, section, term, tf in rows:
+                    frequencies.setdefault((path, section), {})[term] = tf
+        finally:
+            conn.close()
+
+        section_counts: Dict[str, int] = {}
+        for counts in frequencies.values():
+            for term in counts:
+                section_counts[term] = section_counts.get(term, 0) + 1
+
+        scores = {}
+        for key, counts in frequencies.items():
+            score = sum(weights[term] * (1 + math.log(tf)) * math.log(1 + len(lengths) / section_counts[term])
+                        for term, tf in counts.items())
+            scores[key] = score / math.sqrt(max(lengths[key], 1))
+        return scores
+
+    def search(self, query: str, limit: int = 20, history: bool = False) -> List[Dict]:
+        """Search the index.
+
+        Args:
+            query: Free-text query; every term contributes to the score
+            limit: Maximum number of results
+            history: Also search snapshot history
+
+        Returns:
+            Results ordered by score, each with path, section, line, kind,
+            text and score. History results also carry session and snapshot.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+
+        sources = (SHARED, OBJECT) if history else (SHARED,)
+        placeholders = ",".join("?" * len(sources))
+
+        conn = self._connect()
+        try:
+            total_docs, avg_length = conn.execute(
+                f"SELECT COUNT(*), AVG(length) FROM docs WHERE source IN ({placeholders})",
+                sources).fetchone()
+            if not total_docs:
+                return []
+
+            # Score in SQL: one BM25 term per query term, summed per document.
+            # Document frequencies count the same sources as total_docs, so
+            # indexed history never pushes a term's idf below zero
+            weights = []
+            for term in terms:
+                df = conn.execute(
+                    f"SELECT COUNT(*) FROM postings p JOIN docs d ON d.id = p.doc_id "
+                    f"WHERE p.term = ? AND d.source IN ({placeholders})", (term, *sources)).fetchone()[0]
+                if df:
+                    weights.append((term, math.log(1 + (total_docs - df + 0.5) / (df + 0.5))))
+            if not weights:
+                return []
+
+            idf_case = " ".join("WHEN ? THEN ?" for _ in weights)
+            rows = conn.execute(
+                f"SELECT p.doc_id, SUM((CASE p.term {idf_case} END) * p.tf * ? / "
+                f"(p.tf + ? * (1 - ? + ? * d.length / ?))) AS score "
+                f"FROM postings p JOIN docs d ON d.id = p.doc_id "
+                f"WHERE p.term IN ({','.join('?' * len(weights))}) AND d.source IN ({placeholders}) "
+                f"GROUP BY p.doc_id ORDER BY score DESC LIMIT ?",
+                (*[value for weight in weights for value in weight], K1 + 1, K1, B, B, avg_length,
+                 *[term for term, _ in weights], *sources, limit * 4)).fetchall()
+
+            # More candidates than needed are fetched so the kind/section boosts can reorder them
+            results = []
+            for doc_id, score in rows:
+                source, path, section, line_no, kind, text = conn.execute(
+                    "SELECT source, path, section, line_no, kind, text FROM docs WHERE id = ?",
+                    (doc_id,)).fetchone()
+                score *= KIND_WEIGHTS.get(kind, 1.0)
+                section_terms = set(tokenize(section))
+                if kind != "header" and any(term in section_terms for term in terms):
+                    score *= SECTION_MATCH_BOOST
+
+                result = {"path": path, "section": section, "line": line_no,
+                          "kind": kind, "text": text, "score": score}
+                if source == OBJECT:
+                    ref = conn.execute(
+                        "SELECT session, snapshot, path FROM snapshot_refs WHERE hash = ? "
+                        "ORDER BY snapshot DESC LIMIT 1", (path,)).fetchone()
+                    if ref is None:
+                        continue
+                    result.update(session=ref[0], snapshot=ref[1], path=ref[2])
+                results.append(result)
+        finally:
+            conn.close()
+
+        results.sort(key=lambda result: result["score"], reverse=True)
+        return results[:limit]
@@ -4,8 +4,18 @@ import subprocess
 import os
 import sys
 from pathlib import Path
-from typing import Optional, List
+from typing import Optional, List, Dict, Tuple
+from concurrent.futures import ThreadPoolExecutor
 import time
+import json
+import hashlib
+
+from .locking import atomic_write
+from .manifest import hash_file
+from .memory import SyncStats
+from .merge import GENERATED_CLAUDE_MD, PROJECT_SPECIFIC_MARKER
+from .projects import ProjectRegistry
+from .watcher import MemoryWatcher, StartupSync
 
 
 class SessionManager:
@@ -14,6 +24,7 @@ class SessionManager:
     def __init__(self, config, memory_manager):
         self.config = config
         self.memory = memory_manager
+        self.projects = ProjectRegistry(config)
 
     def _get_project_memory_path(self, project_path: Path) -> Path:
         r"""Get the Claude Code project memory path for a given project directory.
@@ -42,9 +53,67 @@ class SessionManager:
 
         return self.config.claude_projects_dir / path_str
 
+    def _instruction_sources(self, instruction_files: Optional[List[str]] = None) -> List[Tuple[str, Path]]:
+        """Collect the (name, path) of every instruction file to inject, in order."""
+        sources = []
+
+        # 1. Shared CLAUDE.md if it exists
+        if self.config.shared_claude_md.exists():
+            sources.append(("Shared Instructions", self.config.shared_claude_md))
+
+        # 2. Configured instruction files, then 3. files passed as arguments
+        for file_path in list(self.config.get("instruction_files", [])) + list(instruction_files or []):
+            path = Path(file_path).expanduser()
+            if path.exists():
+                sources.append((path.name, path))
+            else:
+                print(f"[!] Warning: Instruction file not found: {path}")
+
+        return sources
+
+    def _instructions_cache_path(self, project_path: Path) -> Path:
+        name = hashlib.sha1(str(project_path).encode('utf-8')).hexdigest()
+        return self.config.instructions_cache_dir / f"{name}.json"
+
+    def _load_instructions_cache(self, project_path: Path) -> Optional[Dict]:
+        cache_path = self._instructions_cache_path(project_path)
+        if not cache_path.exists():
+            return None
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _fingerprint_sources(self, sources: List[Tuple[str, Path]]) -> str:
+        """Fingerprint instruction inputs by name, path, size and mtime (without reading them)."""
+        digest = hashlib.sha256()
+        for name, path in sources:
+            stat = path.stat()
+            digest.update(f"{name}\0{path}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode('utf-8'))
+        return digest.hexdigest()
+
+    def _output_unchanged(self, project_claude_md: Path, output: Dict) -> bool:
+        """Check whether the project CLAUDE.md is still exactly what was last generated."""
+        try:
+            stat = project_claude_md.stat()
+        except FileNotFoundError:
+            return False
+        if stat.st_size != output["size"]:
+            return False
+        if stat.st_mtime_ns == output["mtime"]:
+            return True
+        return hash_file(project_claude_md) == output["hash"]
+
     def _inject_instructions(self, project_path: Path, instruction_files: Optional[List[str]] = None):
         """Inject CLAUDE.md instructions into the project directory.
 
+        The inputs and the generated file are fingerprinted; when neither
+        changed since the last injection, nothing is read or written. If the
+        generated file was edited by hand, a copy is kept in ``CLAUDE.md.bak``
+        before it is regenerated (edits under "Project-Specific Instructions"
+        are carried over as-is).
+
         Args:
             project_path: Path to the project directory
             instruction_files: Optional list of additional instruction file paths
@@ -52,54 +121,65 @@ class SessionManager:
         project_claude_md = project_path / "CLAUDE.md"
 
         # Collect all instruction sources
-        instructions = []
-
-        # 1. Read shared CLAUDE.md if it exists
-        if self.config.shared_claude_md.exists():
-            print("[>>] Loading shared instructions from ~/.claude-multi/shared/CLAUDE.md")
-            with open(self.config.shared_claude_md, 'r', encoding='utf-8') as f:
-                instructions.append(("Shared Instructions", f.read()))
-
-        # 2. Read configured instruction files
-        configured_files = self.config.get("instruction_files", [])
-        for file_path in configured_files:
-            path = Path(file_path).expanduser()
-            if path.exists():
-                print(f"[>>] Loading instructions from {path}")
-                with open(path, 'r', encoding='utf-8') as f:
-                    instructions.append((path.name, f.read()))
-            else:
-                print(f"[!] Warning: Instruction file not found: {path}")
-
-        # 3. Read additional instruction files passed as arguments
-        if instruction_files:
-            for file_path in instruction_files:
-                path = Path(file_path).expanduser()
-                if path.exists():
-                    print(f"[>>] Loading instructions from {path}")
-                    with open(path, 'r', encoding='utf-8') as f:
-                        instructions.append((path.name, f.read()))
-                else:
-                    print(f"[!] Warning: Instruction file not found: {path}")
+        sources = self._instruction_sources(instruction_files)
 
         # If no instructions to inject, skip
-        if not instructions:
+        if not sources:
+            return
+
+        cache = self._load_instructions_cache(project_path)
+        fingerprint = self._fingerprint_sources(sources)
+        if cache and cache["inputs"] == fingerprint and self._output_unchanged(project_claude_md, cache["output"]):
+            print("[OK] Instructions unchanged, skipping injection")
             return
 
-        # 4. Read existing CLAUDE.md in project (if any)
+        instructions = []
+        for name, path in sources:
+            if path == self.config.shared_claude_md:
+                print("[>>] Loading shared instructions from ~/.claude-multi/shared/CLAUDE.md")
+            else:
+                print(f"[>>] Loading instructions from {path}")
+            with open(path, 'r', encoding='utf-8') as f:
+                instructions.append((name, f.read()))
+            self.memory.profiler.count("bytes_read", path.stat().st_size)
+
+        # Read existing CLAUDE.md in project (if any)
         existing_content = ""
         if project_claude_md.exists():
             with open(project_claude_md, 'r', encoding='utf-8') as f:
                 existing_content = f.read()
+            self.memory.profiler.count("bytes_read", project_claude_md.stat().st_size)
 
-        # 5. Merge instructions
-        merged_content = self._merge_instructions(existing_content, instructions)
+            if cache and self._generated_hash(existing_content) != cache["output"]["generated_hash"]:
+                backup = project_claude_md.with_name("CLAUDE.md.bak")
+                atomic_write(backup, existing_content)
+                print(f"[!] Warning: {project_claude_md} was edited by hand; saved a copy to {backup}")
+                print("    Put project-specific instructions under '## Project-Specific Instructions' to keep them")
 
-        # 6. Write to project CLAUDE.md
-        with open(project_claude_md, 'w', encoding='utf-8') as f:
-            f.write(merged_content)
+        # Merge instructions
+        merged_content = self._merge_instructions(existing_content, instructions)
 
-        print(f"[OK] Injected instructions into {project_claude_md}")
+        # Write to project CLAUDE.md (only if it changed, to keep its mtime stable)
+        if merged_content != existing_content:
+            atomic_write(project_claude_md, merged_content)
+            self.memory.profiler.count("bytes_written", project_claude_md.stat().st_size)
+            print(f"[OK] Injected instructions into {project_claude_md}")
+        else:
+            print("[OK] Instructions already up to date")
+
+        stat = project_claude_md.stat()
+        cache = {
+            "inputs": fingerprint,
+            "output": {
+                "size": stat.st_size,
+                "mtime": stat.st_mtime_ns,
+                "hash": hashlib.sha256(merged_content.encode('utf-8')).hexdigest(),
+                "generated_hash": self._generated_hash(merged_content),
+            },
+        }
+        cache_path = self._instructions_cache_path(project_path)
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write(cache_path, json.dumps(cache, indent=2))
 
     def _merge_instructions(self, existing: str, new_instructions: List[tuple]) -> str:
         """Merge existing CLAUDE.md with new instructions.
@@ -114,7 +194,7 @@ class SessionManager:
         parts = []
 
         # Add header
-        parts.append("# Claude Code Instructions")
+        parts.append(GENERATED_CLAUDE_MD)
         parts.append("")
         parts.append("This file contains instructions for Claude Code sessions.")
         parts.append("Generated by claude-multi - DO NOT EDIT MANUALLY")
@@ -138,14 +218,35 @@ class SessionManager:
             parts.append("")
 
         # Add existing project-specific instructions if any
-        if existing and not existing.startswith("# Claude Code Instructions"):
+        project_specific = self._project_specific_instructions(existing)
+        if project_specific:
             parts.append("## Project-Specific Instructions")
             parts.append("")
-            parts.append(existing.strip())
+            parts.append(project_specific)
             parts.append("")
 
         return '\n'.join(parts)
 
+    def _generated_hash(self, content: str) -> str:
+        """Hash the part of a CLAUDE.md before its project-specific section."""
+        position = content.find(PROJECT_SPECIFIC_MARKER)
+        generated = content if position == -1 else content[:position]
+        return hashlib.sha256(generated.encode('utf-8')).hexdigest()
+
+    def _project_specific_instructions(self, existing: str) -> str:
+        """Get the project's own instructions from an existing CLAUDE.md.
+
+        For a file generated by claude-multi this is the "Project-Specific
+        Instructions" section; any other file is project-specific as a whole.
+        """
+        if not existing.startswith(GENERATED_CLAUDE_MD):
+            return existing.strip()
+
+        position = existing.find(PROJECT_SPECIFIC_MARKER)
+        if position == -1:
+            return ""
+        return existing[position + len(PROJECT_SPECIFIC_MARKER):].strip()
+
     def start_session(self, project_path: Path, session_name: Optional[str] = None,
                      instruction_files: Optional[List[str]] = None) -> bool:
         """Start a Claude Code session with shared memory.
@@ -171,40 +272,69 @@ class SessionManager:
         print(f"Session: {session_name}")
         print(f"Project: {project_path}")
         print(f"Claude Code project path: {claude_project_path}")
+        self.projects.register(claude_project_path, project_path, session_name)
 
         # Inject CLAUDE.md instructions before starting
         if self.config.get("inject_instructions", True):
             print("\n[>>] Injecting instructions...")
-            self._inject_instructions(project_path, instruction_files)
+            with self.memory.profiler.phase("inject_instructions"):
+                self._inject_instructions(project_path, instruction_files)
 
-        # Sync shared memory to session before starting
+        # Sync shared memory to session before starting; with fast_start the
+        # sync finishes in the background while Claude Code starts up
+        startup_sync = None
         if self.config.get("sync_on_start", True):
-            print("\n[>>] Syncing shared memory to session...")
             claude_project_path.mkdir(parents=True, exist_ok=True)
-            self.memory.sync_to_session(claude_project_path)
-            print("[OK] Memory synced to session")
+            if self.config.get("fast_start", True):
+                print("\n[>>] Syncing shared memory to session in the background...")
+                startup_sync = StartupSync(self.memory, claude_project_path, project_path)
+                startup_sync.start()
+            else:
+                print("\n[>>] Syncing shared memory to session...")
+                self.memory.sync_to_session(claude_project_path, working_dir=project_path)
+                print("[OK] Memory synced to session")
 
         # Start Claude Code in the project directory
         print(f"\n[*] Starting Claude Code session...")
         print(f"Working directory: {project_path}")
         print("\n" + "="*60)
-        print("Claude Code is running. When you exit, memory will be synced back.")
+        if self.config.get("auto_sync", True):
+            print("Claude Code is running. Memory is kept in sync with other sessions.")
+        else:
+            print("Claude Code is running. When you exit, memory will be synced back.")
         print("="*60 + "\n")
 
+        # Keep memory in sync with parallel sessions while Claude Code runs
+        watcher = None
+        if self.config.get("auto_sync", True):
+            watcher = MemoryWatcher(
+                self.memory, claude_project_path, session_name,
+                interval=self.config.get("watch_interval", 30),
+                debounce=self.config.get("watch_debounce", 2),
+                wait_for=startup_sync,
+            )
+            watcher.start()
+        claude_started = time.perf_counter()
+
         try:
             # Run Claude Code interactively
             # Use shell=True on Windows, False on Unix for better compatibility
-            if sys.platform == 'win32':
-                result = subprocess.run(
-                    ["claude"],
-                    cwd=str(project_path),
-                    shell=True
-                )
-            else:
-                result = subprocess.run(
-                    ["claude"],
-                    cwd=str(project_path)
-                )
+            with self.memory.profiler.phase("claude"):
+                if sys.platform == 'win32':
+                    result = subprocess.run(
+                        ["claude"],
+                        cwd=str(project_path),
+                        shell=True
+                    )
+                else:
+                    result = subprocess.run(
+                        ["claude"],
+                        cwd=str(project_path)
+                    )
+
+            self._finish_startup_sync(startup_sync, claude_started)
+            with self.memory.profiler.phase("stop_watcher"):
+                self._stop_watcher(watcher)
 
             print("\n" + "="*60)
             print("Claude Code session ended")
@@ -220,6 +350,8 @@ class SessionManager:
 
         except KeyboardInterrupt:
             print("\n\n[!] Session interrupted by user")
+            self._finish_startup_sync(startup_sync, claude_started)
+            self._stop_watcher(watcher)
 
             # Still try to sync memory
             if self.config.get("sync_on_end", True):
@@ -231,6 +363,36 @@ class SessionManager:
         except Exception as e:
             print(f"\n[ERROR] Error running Claude Code: {e}")
             return False
+        finally:
+            if watcher is not None:
+                watcher.stop()
+
+    def _finish_startup_sync(self, startup_sync: Optional[StartupSync], claude_started: float):
+        """Wait for the background startup sync and report how long it overlapped Claude Code."""
+        if startup_sync is None:
+            return
+
+        startup_sync.join()
+        overlap = max(0.0, startup_sync.finished_at - claude_started)
+        self.memory.profiler.count("startup_sync_overlap_ms", round(overlap * 1000))
+        if startup_sync.errors:
+            for error in startup_sync.errors:
+                print(f"[!] Warning: Background sync to session failed: {error}")
+        else:
+            print(f"[OK] Memory synced to session in the background "
+                  f"({(startup_sync.finished_at - startup_sync.started_at) * 1000:.0f}ms, "
+                  f"{overlap * 1000:.0f}ms after Claude Code started)")
+
+    def _stop_watcher(self, watcher: Optional[MemoryWatcher]):
+        """Stop the live sync watcher and report what it did."""
+        if watcher is None:
+            return
+
+        watcher.stop()
+        if watcher.sync_count:
+            print(f"[OK] Live sync ran {watcher.sync_count} time(s) during the session")
+        for error in watcher.errors:
+            print(f"[!] Warning: Live sync failed: {error}")
 
     def manual_sync(self, project_path: Path, direction: str = "both") -> bool:
         """Manually sync memory for a project.
@@ -245,11 +407,12 @@ class SessionManager:
         project_path = Path(project_path).resolve()
         claude_project_path = self._get_project_memory_path(project_path)
         session_name = project_path.name
+        self.projects.register(claude_project_path, project_path, session_name)
 
         if direction in ("to", "both"):
             print("[>>] Syncing shared memory to session...")
             claude_project_path.mkdir(parents=True, exist_ok=True)
-            self.memory.sync_to_session(claude_project_path)
+            self.memory.sync_to_session(claude_project_path, working_dir=project_path)
             print("[OK] Synced to session")
 
         if direction in ("from", "both"):
@@ -258,3 +421,77 @@ class SessionManager:
             print("[OK] Synced from session")
 
         return True
+
+    def _sync_project(self, claude_project_path: Path, session_name: str,
+                      direction: str) -> Dict:
+        """Sync one project without printing; used by :meth:`sync_all`."""
+        stats = SyncStats()
+        started = time.perf_counter()
+        error = None
+        try:
+            if direction in ("to", "both"):
+                self.memory.sync_to_session(claude_project_path, stats=stats)
+            if direction in ("from", "both"):
+                self.memory.sync_from_session(claude_project_path, session_name, stats=stats)
+        except Exception as e:
+            error = e
+
+        return {
+            "project": claude_project_path.name,
+            "session": session_name,
+            "seconds": time.perf_counter() - started,
+            "stats": stats,
+            "error": error,
+        }
+
+    def sync_all(self, direction: str = "both", workers: Optional[int] = None) -> List[Dict]:
+        """Sync every known project in parallel.
+
+        Projects are synced on a bounded thread pool. Writes to the same
+        shared file from different projects are serialized by the per-file
+        locks in :class:`MemoryManager`; everything else runs concurrently.
+
+        Args:
+            direction: "to" (shared -> session), "from" (session -> shared), or "both"
+            workers: Maximum number of concurrent syncs (defaults to the
+                ``sync_workers`` setting)
+
+        Returns:
+            One report per project with its timing, counters and error (if any)
+        """
+        projects = self.projects.discover()
+        if not projects:
+            print("No known projects to sync.")
+            return []
+
+        workers = workers or self.config.get("sync_workers") or min(8, (os.cpu_count() or 1) * 2)
+        print(f"[<>] Syncing {len(projects)} project(s) with {workers} worker(s)...")
+
+        with self.memory.profiler.phase("sync_all"), ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(self._sync_project, path, name, direction)
+                       for path, name in projects]
+            reports = [future.result() for future in futures]
+
+        self._print_sync_report(reports)
+        return reports
+
+    def _print_sync_report(self, reports: List[Dict]):
+        """Print per-project timings and bytes moved."""
+        total = SyncStats()
+        width = max(len(report["project"]) for report in reports)
+
+        print()
+        print(f"  {'Project':<{width}}  {'Time':>8}  {'Copied':>6}  {'Merged':>6}  {'Bytes':>10}")
+        for report in reports:
+            stats = report["stats"]
+            total.add(stats)
+            line = (f"  {report['project']:<{width}}  {report['seconds'] * 1000:>6.0f}ms  "
+                    f"{stats.files_copied:>6}  {stats.files_merged:>6}  {stats.bytes_written:>10}")
+            if report["error"] is not None:
+                line += f"  [ERROR] {report['error']}"
+            print(line)
+
+        failed = sum(1 for report in reports if report["error"] is not None)
+        print(f"\n  Total: {len(reports)} project(s), {total.files_copied} copied, "
+              f"{total.files_merged} merged, {total.bytes_written} bytes written"
+              + (f", {failed} failed" if failed else ""))
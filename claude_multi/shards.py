@@ -0,0 +1,134 @@
+"""Namespaced shards of the shared memory pool.
+
+A flat pool makes every session merge into and sync from every shared file,
+so sync cost and lock contention grow with the number of projects. With the
+``shards`` setting, the pool is split into namespaces (e.g. ``global``,
+``team-api``, ``python``), each stored in its own directory under the shared
+memory directory::
+
+    shared/
+    ├── python/python/asyncio.md
+    ├── team-api/api/endpoints.md
+    └── global/MEMORY.md
+
+Each shard lists glob patterns (see :func:`claude_multi.walk.matches`) of
+the memory files it holds; a memory file belongs to the first shard, in the
+order the shards are defined, with a matching pattern, and a shard without
+patterns holds every file no earlier shard does. A file therefore lives in
+exactly one shard, under the same relative path it has in a session's
+memory directory.
+
+Projects subscribe to shards through the ``subscriptions`` setting, keyed
+by project directory or session name (``"*"`` for every other project);
+projects without a subscription sync every shard. Syncs only walk, read and
+lock the shards a project subscribes to, and files a session writes that
+belong to another shard stay in the session.
+
+``claude-multi migrate-shards`` splits an existing flat pool into shards.
+"""
+
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .walk import matches, walk_tree
+
+# Shard created by migrations for files no other shard holds
+DEFAULT_SHARD = "global"
+
+
+def shard_for(rel_path: str, shards: Dict[str, List[str]]) -> Optional[str]:
+    """Find the shard holding a memory file.
+
+    Args:
+        rel_path: Path relative to a memory directory
+        shards: Shard names and their patterns, in order
+
+    Returns:
+        The shard's name, or None if no shard holds the file
+    """
+    for name, patterns in shards.items():
+        if not patterns or matches(rel_path, patterns):
+            return name
+    return None
+
+
+def split_pool_path(pool_path: str, shards: Dict[str, List[str]]) -> Tuple[Optional[str], str]:
+    """Split a path relative to the shared memory directory into (shard, path within the shard).
+
+    The shard is None for paths outside any shard (e.g. in a flat pool).
+    """
+    shard, sep, rel_path = pool_path.partition('/')
+    if sep and shard in shards:
+        return shard, rel_path
+    return None, pool_path
+
+
+def is_topic_file(pool_path: str, shards: Dict[str, List[str]]) -> bool:
+    """Check whether a shared file is a topic file (in a directory) rather than a top-level one."""
+    return '/' in split_pool_path(pool_path, shards)[1]
+
+
+def subscribed_shards(config, working_dir: Optional[Path] = None,
+                      session_name: Optional[str] = None) -> Optional[List[str]]:
+    """Get the shards a project syncs with.
+
+    Subscriptions are looked up by the project's working directory, then
+    by its session name, then under ``"*"``.
+
+    Returns:
+        Shard names in definition order, or None if the pool is not sharded
+    """
+    shards = config.get("shards") or {}
+    if not shards:
+        return None
+    subscriptions = config.get("subscriptions") or {}
+    keys = []
+    if working_dir is not None:
+        keys.append(str(working_dir))
+    if session_name:
+        keys.append(session_name)
+    keys.append("*")
+    for key in keys:
+        names = subscriptions.get(key)
+        if names is not None:
+            return [name for name in shards if name in names]
+    return list(shards)
+
+
+def pool_files(config) -> Dict[str, os.stat_result]:
+    """List the memory files of the shared pool, with their stat results.
+
+    The ``sync_include`` and ``sync_exclude`` settings apply as they do when
+    syncing (in a sharded pool, to paths within each shard), so commands
+    working on the whole pool see the same files syncs do. The shared
+    instructions file is listed whenever it exists.
+
+    Returns:
+        Stat results keyed by path relative to the shared memory directory
+    """
+    include = config.get("sync_include", ["*.md"])
+    exclude = config.get("sync_exclude", [])
+    files: Dict[str, os.stat_result] = {}
+    for prefix in [f"{shard}/" for shard in config.get("shards") or {}] or [""]:
+        for rel_path, result in walk_tree(config.shared_memory_dir / prefix, include, exclude).items():
+            files[prefix + rel_path] = result
+    instructions = config.shared_claude_md
+    try:
+        files[instructions.relative_to(config.shared_memory_dir).as_posix()] = instructions.stat()
+    except FileNotFoundError:
+        pass
+    return files
+
+
+def parse_shard_spec(spec: str) -> Tuple[str, List[str]]:
+    """Parse a ``NAME=PATTERN[,PATTERN...]`` shard definition (``NAME`` alone holds everything).
+
+    Raises:
+        ValueError: If the name is not usable as a directory name
+    """
+    name, _sep, patterns = spec.partition('=')
+    name = name.strip()
+    if not name or name.startswith('.') or '/' in name or '\\' in name:
+        raise ValueError(f"Invalid shard name: {name!r}")
+    return name, [pattern.strip() for pattern in patterns.split(',') if pattern.strip()]
@@ -0,0 +1,375 @@
+"""Content-addressed, deduplicated storage for session snapshots."""
+
+import json
+import shutil
+import zlib
+import difflib
+import hashlib
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+from .locking import atomic_write
+from .manifest import hash_file
+
+# Larger contents are always stored in full; a line diff would take too long
+MAX_DELTA_SIZE = 4 * 1024 * 1024
+
+
+def line_delta(base: bytes, data: bytes) -> List:
+    """Express ``data`` as line-level edits of ``base``.
+
+    Returns:
+        Ops in order: ``[start, count]`` copies lines of ``base``, ``[text]``
+        inserts new lines (decoded with surrogate escapes so any bytes survive JSON)
+    """
+    base_lines = base.splitlines(keepends=True)
+    lines = data.splitlines(keepends=True)
+
+    # Memory files mostly change in one place; only diff the middle
+    prefix = 0
+    limit = min(len(base_lines), len(lines))
+    while prefix < limit and base_lines[prefix] == lines[prefix]:
+        prefix += 1
+    suffix = 0
+    while (suffix < limit - prefix
+           and base_lines[-1 - suffix] == lines[-1 - suffix]):
+        suffix += 1
+
+    ops: List = []
+    if prefix:
+        ops.append([0, prefix])
+    matcher = difflib.SequenceMatcher(None, base_lines[prefix:len(base_lines) - suffix],
+                                      lines[prefix:len(lines) - suffix], autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append([prefix + i1, i2 - i1])
+        elif j2 > j1:
+            text = b"".join(lines[prefix + j1:prefix + j2])
+            ops.append([text.decode('utf-8', errors='surrogateescape')])
+    if suffix:
+        ops.append([len(base_lines) - suffix, suffix])
+    return ops
+
+
+def apply_line_delta(base: bytes, ops: List) -> bytes:
+    """Rebuild content from its base and the ops of :func:`line_delta`."""
+    base_lines = base.splitlines(keepends=True)
+    parts = []
+    for op in ops:
+        if len(op) == 2:
+            parts.extend(base_lines[op[0]:op[0] + op[1]])
+        else:
+            parts.append(op[0].encode('utf-8', errors='surrogateescape'))
+    return b"".join(parts)
+
+
+class ObjectStore:
+    """Stores file contents once, keyed by their SHA-256 digest.
+
+    Objects live at ``objects/<first two hex chars>/<rest>``; compressed
+    objects get a ``.z`` suffix so compressed and plain objects can coexist
+    when the ``compress_snapshots`` setting is changed.
+
+    With a keyframe interval, a new version of a file can be stored as a
+    compressed line delta against a previous version (``.d`` suffix).
+    Every ``keyframe_interval`` versions in a chain are stored in full, so
+    reading any version applies at most that many deltas.
+    """
+
+    def __init__(self, objects_dir: Path, compress: bool = True, keyframe_interval: int = 0):
+        self.objects_dir = objects_dir
+        self.compress = compress
+        self.keyframe_interval = keyframe_interval
+
+    def _path(self, digest: str) -> Path:
+        return self.objects_dir / digest[:2] / digest[2:]
+
+    def has(self, digest: str) -> bool:
+        """Check whether an object is stored."""
+        path = self._path(digest)
+        return path.exists() or path.with_suffix(".z").exists() or path.with_suffix(".d").exists()
+
+    def is_delta(self, digest: str) -> bool:
+        """Check whether an object is stored only as a delta."""
+        path = self._path(digest)
+        return (path.with_suffix(".d").exists() and not path.exists()
+                and not path.with_suffix(".z").exists())
+
+    def _read_delta(self, digest: str) -> Dict:
+        with open(self._path(digest).with_suffix(".d"), 'rb') as f:
+            return json.loads(zlib.decompress(f.read()))
+
+    def _chain(self, digest: str) -> List[Dict]:
+        """Get the deltas leading from the nearest full copy to an object, newest first."""
+        chain = []
+        while self.is_delta(digest):
+            delta = self._read_delta(digest)
+            chain.append(delta)
+            digest = delta["base"]
+        return chain
+
+    def _put_delta(self, digest: str, data: bytes, base: str) -> bool:
+        """Store an object as a delta against ``base`` if that is worth it.
+
+        Returns:
+            False if the object should be stored in full instead
+        """
+        if (not self.keyframe_interval or base == digest or len(data) > MAX_DELTA_SIZE
+                or not self.has(base)):
+            return False
+        chain = self._chain(base)
+        if len(chain) + 1 >= self.keyframe_interval or any(
+                delta["base"] == digest for delta in chain):
+            return False
+
+        payload = zlib.compress(json.dumps({
+            "base": base, "ops": line_delta(self.get_bytes(base), data),
+        }).encode('utf-8'), 6)
+        if len(payload) >= len(data) // 2:
+            return False
+        path = self._path(digest).with_suffix(".d")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write(path, payload)
+        return True
+
+    def put_bytes(self, data: bytes, digest: Optional[str] = None, base: Optional[str] = None) -> str:
+        """Store raw bytes and return their digest.
+
+        Args:
+            data: Contents
+            digest: Their SHA-256 digest, if already known
+            base: Digest of a previous version to store a delta against
+        """
+        digest = digest or hashlib.sha256(data).hexdigest()
+        if self.has(digest):
+            return digest
+        if base is not None and self._put_delta(digest, data, base):
+            return digest
+
+        path = self._path(digest)
+        if self.compress:
+            path = path.with_suffix(".z")
+            data = zlib.compress(data, 6)
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write(path, data)
+        return digest
+
+    def put_file(self, path: Path, digest: Optional[str] = None, base: Optional[str] = None) -> str:
+        """Store a file's contents and return their digest.
+
+        If the digest is already known (e.g. from a sync manifest) and the
+        object exists, the file is not read at all.
+        """
+        if digest and self.has(digest):
+            return digest
+        with open(path, 'rb') as f:
+            return self.put_bytes(f.read(), digest, base)
+
+    def get_bytes(self, digest: str) -> bytes:
+        """Read an object's contents, applying deltas if it is stored as one."""
+        chain = self._chain(digest)
+        if chain:
+            data = self.get_bytes(chain[-1]["base"])
+            for delta in reversed(chain):
+                data = apply_line_delta(data, delta["ops"])
+            return data
+
+        path = self._path(digest)
+        compressed = path.with_suffix(".z")
+        if compressed.exists():
+            with open(compressed, 'rb') as f:
+                return zlib.decompress(f.read())
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def delta_bases(self) -> Set[str]:
+        """Collect the digests that stored deltas are based on."""
+        if not self.objects_dir.exists():
+            return set()
+        bases = set()
+        for path in self.objects_dir.glob("*/*.d"):
+            with open(path, 'rb') as f:
+                bases.add(json.loads(zlib.decompress(f.read()))["base"])
+        return bases
+
+    def convert_to_delta(self, digest: str, base: str,
+                         delta_bases: Optional[Set[str]] = None) -> bool:
+        """Replace a full copy of an object with a delta against ``base``.
+
+        The store is shared by every session (and by replication), so an
+        object that other deltas are based on is left in full: converting
+        it would lengthen their chains past the keyframe interval.
+
+        Args:
+            digest: Object to convert
+            base: Digest of the version to store it against
+            delta_bases: Result of :meth:`delta_bases`, if already known;
+                updated when the object is converted
+
+        Returns:
+            True if the object is now stored as a delta
+        """
+        if self.is_delta(digest) or not self.has(digest):
+            return False
+        if delta_bases is None:
+            delta_bases = self.delta_bases()
+        if digest in delta_bases:
+            return False
+        if not self._put_delta(digest, self.get_bytes(digest), base):
+            return False
+        delta_bases.add(base)
+        path = self._path(digest)
+        for full in (path, path.with_suffix(".z")):
+            if full.exists():
+                full.unlink()
+        return True
+
+
+class SnapshotStore:
+    """Session snapshots stored as small manifests pointing at shared objects.
+
+    Each snapshot is ``sessions/<name>/<timestamp>.json`` and maps every
+    backed-up file (relative to the session's memory directory) to an
+    object in the :class:`ObjectStore`.
+    """
+
+    def __init__(self, config, index=None):
+        self.sessions_dir = config.sessions_dir
+        self.objects = ObjectStore(config.objects_dir, config.get("compress_snapshots", True),
+                                   config.get("snapshot_keyframe_interval", 32))
+        self.index = index
+
+    def create_snapshot(self, session_name: str, files: Dict[str, Path],
+                        digests: Optional[Dict[str, str]] = None) -> Path:
+        """Store a snapshot of a set of files.
+
+        Files that changed since the session's previous snapshot are stored
+        as deltas against their previous version where possible.
+
+        Args:
+            session_name: Name of the session
+            files: Mapping of relative path to file on disk
+            digests: Optional known content hashes, keyed like ``files``
+
+        Returns:
+            Path to the snapshot manifest
+        """
+        digests = digests or {}
+        previous = self.latest_entries(session_name)
+        entries = {}
+        for rel_path, path in sorted(files.items()):
+            base = previous.get(rel_path, {}).get("hash")
+            digest = self.objects.put_file(path, digests.get(rel_path), base)
+            entries[rel_path] = {"hash": digest, "size": path.stat().st_size}
+
+        snapshot_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+        return self._write_manifest(session_name, snapshot_id, entries)
+
+    def _write_manifest(self, session_name: str, snapshot_id: str, entries: Dict[str, Dict]) -> Path:
+        session_dir = self.sessions_dir / session_name
+        session_dir.mkdir(parents=True, exist_ok=True)
+
+        manifest_path = session_dir / f"{snapshot_id}.json"
+        manifest = {
+            "session": session_name,
+            "snapshot": snapshot_id,
+            "files": entries,
+        }
+        atomic_write(manifest_path, json.dumps(manifest, indent=2, sort_keys=True))
+        if self.index is not None:
+            self.index.record_snapshot(session_name, snapshot_id, entries)
+        return manifest_path
+
+    def list_snapshots(self, session_name: str) -> List[Path]:
+        """List snapshot manifests for a session, newest first."""
+        session_dir = self.sessions_dir / session_name
+        if not session_dir.exists():
+            return []
+        return sorted(session_dir.glob("*.json"), reverse=True)
+
+    def read_snapshot(self, manifest_path: Path) -> Dict:
+        """Read a snapshot manifest."""
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def latest_entries(self, session_name: str) -> Dict[str, Dict]:
+        """Get the file entries of a session's latest snapshot (empty if it has none)."""
+        snapshots = self.list_snapshots(session_name)
+        if not snapshots:
+            return {}
+        try:
+            return self.read_snapshot(snapshots[0])["files"]
+        except (OSError, ValueError, KeyError):
+            return {}
+
+    def find_snapshot(self, session_name: str, snapshot_id: str) -> Optional[Path]:
+        """Get the manifest of a snapshot by its ID (a timestamp), or None."""
+        path = self.sessions_dir / session_name / f"{snapshot_id}.json"
+        return path if path.exists() else None
+
+    def read_file(self, manifest_path: Path, rel_path: str) -> bytes:
+        """Read one file's contents as of a snapshot."""
+        entry = self.read_snapshot(manifest_path)["files"][rel_path]
+        return self.objects.get_bytes(entry["hash"])
+
+    def migrate_legacy(self, session_name: str) -> int:
+        """Convert plain snapshot directories of a session into manifests.
+
+        Each ``sessions/<name>/<timestamp>/`` directory is stored in the
+        object store under the same timestamp and then removed.
+
+        Returns:
+            Number of snapshot directories migrated
+        """
+        session_dir = self.sessions_dir / session_name
+        if not session_dir.exists():
+            return 0
+
+        migrated = 0
+        for snapshot_dir in sorted(session_dir.iterdir()):
+            if not snapshot_dir.is_dir():
+                continue
+
+            entries = {}
+            for path in sorted(snapshot_dir.rglob("*")):
+                if path.is_file():
+                    rel_path = path.relative_to(snapshot_dir).as_posix()
+                    digest = self.objects.put_file(path, hash_file(path))
+                    entries[rel_path] = {"hash": digest, "size": path.stat().st_size}
+
+            self._write_manifest(session_name, snapshot_dir.name, entries)
+            shutil.rmtree(snapshot_dir)
+            migrated += 1
+
+        return migrated
+
+    def repack(self, session_name: str, delta_bases: Optional[Set[str]] = None) -> int:
+        """Store the history of a session's files as deltas between consecutive snapshots.
+
+        Versions stored in full (e.g. by older versions or by migration) are
+        converted, oldest first, subject to the same keyframe interval as
+        new snapshots. Versions that other deltas are based on stay in full.
+
+        Args:
+            session_name: Session to repack
+            delta_bases: Result of :meth:`ObjectStore.delta_bases`, if already
+                known (e.g. when repacking several sessions)
+
+        Returns:
+            Number of objects converted to deltas
+        """
+        if delta_bases is None:
+            delta_bases = self.objects.delta_bases()
+        converted = 0
+        previous: Dict[str, Dict] = {}
+        for manifest_path in reversed(self.list_snapshots(session_name)):
+            entries = self.read_snapshot(manifest_path)["files"]
+            for rel_path, entry in entries.items():
+                base = previous.get(rel_path, {}).get("hash")
+                if base is not None and self.objects.convert_to_delta(entry["hash"], base, delta_bases):
+                    converted += 1
+            previous = entries
+        return converted
+
@@ -0,0 +1,287 @@
+"""Supervisor running several Claude Code sessions from one command.
+
+``claude-multi start-many`` prepares every project concurrently (instruction
+injection and the pre-start sync run on a thread pool), then launches one
+``claude`` per project, each in its own pseudo-terminal so it behaves as if
+run from a terminal. Output is written to
+``~/.claude-multi/logs/<session>.log`` (and optionally echoed, prefixed
+with the session name).
+
+Live sync keeps running sessions in sync as with ``claude-multi start``.
+When a session exits, its sync back to the shared pool is queued; one
+worker takes everything queued so far as a batch and syncs it session by
+session, so sync-backs never run concurrently with each other.
+"""
+
+import os
+import sys
+import time
+import shutil
+import signal
+import struct
+import asyncio
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+try:
+    import pty
+    import fcntl
+    import termios
+except ImportError:  # Windows: sessions get plain pipes
+    pty = None
+
+from .memory import SyncStats
+from .watcher import MemoryWatcher
+
+# Bytes read from a session's terminal at a time
+READ_SIZE = 64 * 1024
+
+# Seconds a session gets to exit after being interrupted before it is killed
+TERMINATE_TIMEOUT = 10
+
+# Run in front of Claude Code (in its new session) to make the pseudo-terminal
+# its controlling terminal, as a terminal emulator would
+CONTROLLING_TTY_WRAPPER = ("import fcntl, os, sys, termios; "
+                           "fcntl.ioctl(0, termios.TIOCSCTTY, 0); "
+                           "os.execvp(sys.argv[1], sys.argv[1:])")
+
+
+class SupervisedSession:
+    """State of one session run by :class:`SessionSupervisor`."""
+
+    def __init__(self, project_path: Path, name: str, claude_project_path: Path, log_path: Path):
+        self.project_path = project_path
+        self.name = name
+        self.claude_project_path = claude_project_path
+        self.log_path = log_path
+        self.stats = SyncStats()
+        self.returncode: Optional[int] = None
+        self.seconds = 0.0
+        self.synced_back = False
+        self.error: Optional[Exception] = None
+        self.watcher: Optional[MemoryWatcher] = None
+        self.process = None
+
+
+class SessionSupervisor:
+    """Runs Claude Code sessions for several projects with coordinated syncs.
+
+    Args:
+        session_manager: Provides project registration, instruction injection and the memory manager
+        command: The Claude Code command line (``["claude"]`` plus any arguments)
+        workers: Maximum number of concurrent pre-start syncs (defaults to
+            the ``sync_workers`` setting)
+        follow: Echo every session's output to stdout, prefixed with its name
+    """
+
+    def __init__(self, session_manager, command: Optional[List[str]] = None,
+                 workers: Optional[int] = None, follow: bool = False):
+        self.sessions = session_manager
+        self.config = session_manager.config
+        self.memory = session_manager.memory
+        self.command = command or ["claude"]
+        self.workers = workers or self.config.get("sync_workers") or min(8, (os.cpu_count() or 1) * 2)
+        self.follow = follow
+        self.logs_dir = self.config.config_dir / "logs"
+        self._interrupted = False
+
+    def run(self, projects: List[Tuple[Path, Optional[str]]],
+            instruction_files: Optional[List[str]] = None) -> List[SupervisedSession]:
+        """Run one session per project until all of them have exited and synced back.
+
+        Args:
+            projects: (project directory, session name or None for the directory name)
+            instruction_files: Additional CLAUDE.md files to inject into every project
+
+        Returns:
+            The sessions, in the order given
+        """
+        self.logs_dir.mkdir(parents=True, exist_ok=True)
+        supervised = []
+        for project_path, name in projects:
+            project_path = Path(project_path).resolve()
+            name = name or project_path.name
+            supervised.append(SupervisedSession(
+                project_path, name, self.sessions._get_project_memory_path(project_path),
+                self.logs_dir / f"{name}.log"))
+
+        names = [session.name for session in supervised]
+        if len(set(names)) != len(names):
+            raise ValueError("Session names must be unique")
+
+        asyncio.run(self._run(supervised, instruction_files))
+        return supervised
+
+    async def _run(self, supervised: List[SupervisedSession], instruction_files: Optional[List[str]]):
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            print(f"[>>] Preparing {len(supervised)} session(s) with {self.workers} worker(s)...")
+            await asyncio.gather(*(loop.run_in_executor(executor, self._prepare, session, instruction_files)
+                                   for session in supervised))
+
+            if sys.platform != 'win32':
+                for signum in (signal.SIGINT, signal.SIGTERM):
+                    loop.add_signal_handler(signum, self._interrupt, supervised)
+
+            queue: asyncio.Queue = asyncio.Queue()
+            sync_worker = asyncio.create_task(self._sync_back(queue, executor))
+            try:
+                await asyncio.gather(*(self._supervise(session, queue, executor)
+                                       for session in supervised if session.error is None))
+            finally:
+                await queue.put(None)
+                await sync_worker
+                if sys.platform != 'win32':
+                    for signum in (signal.SIGINT, signal.SIGTERM):
+                        loop.remove_signal_handler(signum)
+
+    def _prepare(self, session: SupervisedSession, instruction_files: Optional[List[str]]):
+        """Inject instructions and sync shared memory into a session (on a worker thread)."""
+        try:
+            self.sessions.projects.register(session.claude_project_path, session.project_path, session.name)
+            if self.config.get("inject_instructions", True):
+                self.sessions._inject_instructions(session.project_path, instruction_files)
+            session.claude_project_path.mkdir(parents=True, exist_ok=True)
+            if self.config.get("sync_on_start", True):
+                self.memory.sync_to_session(session.claude_project_path, session.stats,
+                                            session.project_path)
+            print(f"[OK] {session.name}: ready")
+        except Exception as e:
+            session.error = e
+            print(f"[!] {session.name}: preparing failed: {e}")
+
+    async def _spawn(self, session: SupervisedSession):
+        """Start a session's Claude Code, in a pseudo-terminal where available.
+
+        Returns:
+            The process and the file descriptor its output is read from
+            (None when it is read from ``process.stdout``)
+        """
+        if pty is None:
+            process = await asyncio.create_subprocess_exec(
+                *self.command, cwd=str(session.project_path), stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT)
+            return process, None
+
+        master, slave = pty.openpty()
+        columns, lines = shutil.get_terminal_size()
+        fcntl.ioctl(slave, termios.TIOCSWINSZ, struct.pack("HHHH", lines, columns, 0, 0))
+        try:
+            process = await asyncio.create_subprocess_exec(
+                sys.executable, "-c", CONTROLLING_TTY_WRAPPER, *self.command,
+                cwd=str(session.project_path), stdin=slave, stdout=slave, stderr=slave,
+                start_new_session=True)
+        except BaseException:
+            os.close(master)
+            raise
+        finally:
+            os.close(slave)
+        return process, master
+
+    async def _read(self, fd: int) -> bytes:
+        """Read from a pseudo-terminal without blocking the event loop ("" once the session closed it)."""
+        loop = asyncio.get_running_loop()
+        ready = loop.create_future()
+        loop.add_reader(fd, lambda: ready.done() or ready.set_result(None))
+        try:
+            await ready
+        finally:
+            loop.remove_reader(fd)
+        try:
+            return os.read(fd, READ_SIZE)
+        except OSError:
+            # EIO: every process holding the terminal has exited
+            return b""
+
+    async def _pump(self, session: SupervisedSession, process, master: Optional[int]):
+        """Copy a session's output to its log file (and stdout with ``follow``)."""
+        pending = b""
+        with open(session.log_path, 'ab') as log:
+            while True:
+                if master is not None:
+                    data = await self._read(master)
+                else:
+                    data = await process.stdout.read(READ_SIZE)
+                if not data:
+                    break
+                log.write(data)
+                log.flush()
+                if self.follow:
+                    *lines, pending = (pending + data).split(b"\n")
+                    for line in lines:
+                        text = line.decode('utf-8', errors='replace').rstrip("\r")
+                        print(f"[{session.name}] {text}")
+        if self.follow and pending:
+            print(f"[{session.name}] {pending.decode('utf-8', errors='replace').rstrip()}")
+
+    async def _supervise(self, session: SupervisedSession, queue: asyncio.Queue, executor):
+        """Run one session and queue its sync back once it exits."""
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            process, master = await self._spawn(session)
+        except OSError as e:
+            session.error = e
+            print(f"[!] {session.name}: could not start {self.command[0]}: {e}")
+            return
+
+        session.process = process
+        print(f"[*] {session.name}: started (pid {process.pid}, log {session.log_path})")
+        if self.config.get("auto_sync", True):
+            session.watcher = MemoryWatcher(
+                self.memory, session.claude_project_path, session.name,
+                interval=self.config.get("watch_interval", 30),
+                debounce=self.config.get("watch_debounce", 2),
+            )
+            session.watcher.start()
+
+        try:
+            await self._pump(session, process, master)
+            session.returncode = await process.wait()
+        finally:
+            if master is not None:
+                os.close(master)
+            session.seconds = time.perf_counter() - started
+            if session.watcher is not None:
+                await loop.run_in_executor(executor, session.watcher.stop)
+            print(f"[OK] {session.name}: exited with code {session.returncode}")
+            await queue.put(session)
+
+    async def _sync_back(self, queue: asyncio.Queue, executor):
+        """Sync exited sessions back to the pool, one batch at a time."""
+        loop = asyncio.get_running_loop()
+        done = False
+        while not done:
+            batch = [await queue.get()]
+            while not queue.empty():
+                batch.append(queue.get_nowait())
+            done = None in batch
+            batch = [session for session in batch if session is not None]
+            if batch and self.config.get("sync_on_end", True):
+                await loop.run_in_executor(executor, self._sync_batch, batch)
+
+    def _sync_batch(self, batch: List[SupervisedSession]):
+        with self.memory.profiler.phase("sync_back"):
+            for session in batch:
+                try:
+                    self.memory.sync_from_session(session.claude_project_path, session.name,
+                                                  stats=session.stats)
+                    session.synced_back = True
+                except Exception as e:
+                    session.error = e
+        print(f"[<<] Synced {len(batch)} session(s) back to the shared pool")
+
+    def _interrupt(self, supervised: List[SupervisedSession]):
+        """Pass an interrupt on to every running session, killing them on a second one."""
+        signum = signal.SIGKILL if self._interrupted else signal.SIGTERM
+        if not self._interrupted:
+            print("\n[!] Interrupted: stopping sessions (press Ctrl+C again to kill them)")
+            asyncio.get_running_loop().call_later(TERMINATE_TIMEOUT, self._interrupt, supervised)
+        self._interrupted = True
+        for session in supervised:
+            if session.process is not None and session.process.returncode is None:
+                try:
+                    os.killpg(session.process.pid, signum)
+                except (ProcessLookupError, PermissionError):
+                    pass
@@ -0,0 +1,297 @@
+"""Mining Claude Code session transcripts for learnings.
+
+Claude Code keeps a transcript of every session next to the project's
+memory, as ``~/.claude/projects/<project>/<session>.jsonl`` with one JSON
+record per line. The miner tails these files: it stores the byte offset up
+to which each transcript has been read, so every run only reads the lines
+appended since (a transcript that shrank or was replaced is read again
+from the start). Lines are read in fixed-size chunks, and lines that cannot
+hold a user's own words (assistant turns, tool results) are skipped without
+being parsed, so multi-hundred-MB transcripts are never held in memory or
+reread.
+
+Two kinds of learnings are taken from what the user typed:
+
+- explicit requests to remember something ("remember that ...", "keep in
+  mind ...", "from now on ..."), staged as soon as they are seen
+- corrections ("no, use ...", "don't ...", "actually, ..."), staged once
+  the same correction has been seen ``correction_threshold`` times, across
+  any number of sessions. Only short messages that reply to an assistant
+  turn and open with an explicit correction count, so task prompts such as
+  "use the existing helper" are not taken for corrections; the heuristic
+  can still pick up an instruction that was only meant for one task.
+
+Staged learnings are merged into a shared memory file the same way session
+memory is (see :meth:`claude_multi.memory.MemoryManager.mine_transcripts`).
+The offsets and the correction counts are kept in
+``~/.claude-multi/transcripts.json``.
+"""
+
+import os
+import re
+import json
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .locking import FileLock, atomic_write
+from .merge import normalize_line
+
+# Bytes read from a transcript at a time
+READ_SIZE = 1024 * 1024
+
+# User messages longer than this are not taken as corrections (long
+# messages are new instructions, not a quick "no, do it this way")
+MAX_CORRECTION_LENGTH = 300
+
+# Learnings shorter or longer than this are ignored
+MIN_LEARNING_LENGTH = 8
+MAX_LEARNING_LENGTH = 500
+
+REMEMBER_PATTERN = re.compile(
+    r"^(?:please\s+)?(?:always\s+)?(?:remember|keep\s+in\s+mind|don'?t\s+forget|do\s+not\s+forget|"
+    r"note\s+for\s+the\s+future|for\s+future\s+reference|from\s+now\s+on)\b[\s,:-]*(?:that\s+)?(.+)",
+    re.IGNORECASE)
+
+CORRECTION_PATTERN = re.compile(
+    r"^(?:no|nope|wrong|that'?s\s+(?:wrong|not\s+right)|actually)\s*[,.!:;-]+\s*(.+)|"
+    r"^(?:please\s+)?((?:don'?t|do\s+not|never|stop)\b.+)",
+    re.IGNORECASE)
+
+# Bytes only found in assistant records (quotes inside JSON strings are
+# escaped, so user text cannot contain them)
+ASSISTANT_MARKERS = (b'"type":"assistant"', b'"type": "assistant"')
+
+# Messages Claude Code records as user turns but the user did not type
+GENERATED_PREFIXES = ("<command-", "<local-command-", "<bash-", "<system-reminder>", "Caveat:",
+                      "[Request interrupted")
+
+REMEMBERED = "remembered"
+CORRECTION = "correction"
+
+
+def user_text(record: Dict) -> Optional[str]:
+    """Get the text a user typed from a transcript record, if it is one."""
+    if record.get("type") != "user" or record.get("isMeta") or record.get("isSidechain"):
+        return None
+    message = record.get("message")
+    if not isinstance(message, dict) or message.get("role") != "user":
+        return None
+    content = message.get("content")
+    if isinstance(content, list):
+        parts = [block.get("text", "") for block in content
+                 if isinstance(block, dict) and block.get("type") == "text"]
+        content = "\n".join(parts)
+    if not isinstance(content, str) or content.lstrip().startswith(GENERATED_PREFIXES):
+        return None
+    return content
+
+
+def _clean(statement: str) -> Optional[str]:
+    """Tidy an extracted statement into a memory bullet, or None if it is not usable."""
+    statement = ' '.join(statement.split()).strip(" \"'`")
+    if not MIN_LEARNING_LENGTH <= len(statement) <= MAX_LEARNING_LENGTH:
+        return None
+    statement = statement[0].upper() + statement[1:]
+    if statement[-1] not in ".!?)`":
+        statement += "."
+    return statement
+
+
+def find_learnings(text: str, replying: bool = True) -> List[Tuple[str, str]]:
+    """Find candidate learnings in a user message.
+
+    Args:
+        text: What the user typed
+        replying: Whether the message replies to an assistant turn (only
+            replies can be corrections)
+
+    Returns:
+        (kind, statement) pairs, where kind is ``"remembered"`` or ``"correction"``
+    """
+    learnings = []
+    for line in text.splitlines():
+        match = REMEMBER_PATTERN.match(line.strip().lstrip('*-+# '))
+        if match:
+            statement = _clean(match.group(1))
+            if statement:
+                learnings.append((REMEMBERED, statement))
+
+    stripped = text.strip()
+    if replying and not learnings and len(stripped) <= MAX_CORRECTION_LENGTH and "\n" not in stripped:
+        match = CORRECTION_PATTERN.match(stripped)
+        if match:
+            statement = _clean(match.group(1) or match.group(2))
+            if statement:
+                learnings.append((CORRECTION, statement))
+    return learnings
+
+
+def learning_key(statement: str) -> str:
+    """Key under which the same learning is recognized when it comes up again."""
+    return normalize_line(statement).rstrip(".!?")
+
+
+def render_learnings(learnings: Iterable[Tuple[str, str]]) -> str:
+    """Render staged learnings as a memory document to merge into the pool."""
+    sections = {REMEMBERED: [], CORRECTION: []}
+    for kind, statement in learnings:
+        sections[kind].append(f"- {statement}")
+    lines = ["# Learnings from session transcripts", ""]
+    for kind, header in ((REMEMBERED, "## Remembered"), (CORRECTION, "## Repeated corrections")):
+        if sections[kind]:
+            lines += [header, ""] + sections[kind] + [""]
+    return "\n".join(lines)
+
+
+class MiningResult:
+    """What one run of :class:`TranscriptMiner` found."""
+
+    def __init__(self, state: Dict):
+        self.state = state
+        self.files_checked = 0
+        self.files_read = 0
+        self.bytes_read = 0
+        self.messages = 0
+        self.learnings: List[Tuple[str, str]] = []
+
+
+class TranscriptMiner:
+    """Tails Claude Code transcripts and collects learnings from new lines.
+
+    Args:
+        state_path: File keeping the read offsets and correction counts
+        locks_dir: Directory of the lock serializing runs
+        correction_threshold: Times a correction must be seen before it is staged
+        lock_timeout: Seconds to wait for another run to finish
+    """
+
+    VERSION = 1
+
+    def __init__(self, state_path: Path, locks_dir: Path, correction_threshold: int = 2,
+                 lock_timeout: float = 30):
+        self.state_path = state_path
+        self.locks_dir = locks_dir
+        self.correction_threshold = correction_threshold
+        self.lock_timeout = lock_timeout
+
+    def lock(self) -> FileLock:
+        """Get the lock held while mining, so two runs never read the same lines."""
+        return FileLock(self.locks_dir / "transcripts.lock", self.lock_timeout)
+
+    def load(self) -> Dict:
+        """Load the offsets and counts, starting empty if they are missing or unreadable."""
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+        if state.get("version") != self.VERSION:
+            state = {"version": self.VERSION, "files": {}, "learnings": {}}
+        return state
+
+    def save(self, state: Dict):
+        """Persist the offsets and counts."""
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write(self.state_path, json.dumps(state, indent=2, sort_keys=True))
+
+    def list_transcripts(self, project_dirs: Iterable[Path]) -> List[Tuple[Path, os.stat_result]]:
+        """List the transcripts of Claude Code projects, with their stat results."""
+        transcripts = []
+        for project_dir in project_dirs:
+            try:
+                entries = os.scandir(project_dir)
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            with entries:
+                for entry in entries:
+                    if entry.name.endswith(".jsonl") and entry.is_file(follow_symlinks=False):
+                        transcripts.append((Path(entry.path), entry.stat()))
+        return sorted(transcripts)
+
+    def mine(self, project_dirs: Iterable[Path]) -> MiningResult:
+        """Read the lines added to the projects' transcripts since the last run.
+
+        Callers hold :meth:`lock` and stage the result's learnings before
+        passing it to :meth:`commit`, so nothing is lost if staging fails.
+
+        Args:
+            project_dirs: Claude Code project directories (``~/.claude/projects/<project>``)
+
+        Returns:
+            The learnings ready to be staged
+        """
+        state = self.load()
+        result = MiningResult(state)
+        for path, stat in self.list_transcripts(project_dirs):
+            result.files_checked += 1
+            entry = state["files"].get(str(path))
+            if entry is None or entry["inode"] != stat.st_ino or stat.st_size < entry["offset"]:
+                entry = {"inode": stat.st_ino, "offset": 0, "after_assistant": False}
+            if stat.st_size == entry["offset"]:
+                state["files"][str(path)] = entry
+                continue
+
+            result.files_read += 1
+            for line in self._read_lines(path, entry, result):
+                text = user_text(line)
+                if text is None:
+                    continue
+                result.messages += 1
+                replying = entry.get("after_assistant", False)
+                entry["after_assistant"] = False
+                for kind, statement in find_learnings(text, replying):
+                    self._count(state, kind, statement, result)
+            state["files"][str(path)] = entry
+        return result
+
+    def commit(self, result: MiningResult):
+        """Save the offsets and counts of a :meth:`mine` run once its learnings are staged."""
+        self.save(result.state)
+
+    def _read_lines(self, path: Path, entry: Dict, result: MiningResult) -> Iterable[Dict]:
+        """Parse the complete lines after the stored offset that may hold a user message.
+
+        The offset is advanced past every complete line; a line still being
+        written (no newline yet) is left for the next run. Assistant turns
+        are not parsed, only noted in the entry's ``after_assistant`` flag.
+        """
+        with open(path, 'rb') as f:
+            f.seek(entry["offset"])
+            pieces: List[bytes] = []
+            while True:
+                chunk = f.read(READ_SIZE)
+                if not chunk:
+                    break
+                result.bytes_read += len(chunk)
+                end = chunk.rfind(b"\n")
+                if end < 0:
+                    pieces.append(chunk)
+                    continue
+                pieces.append(chunk[:end])
+                lines = b"".join(pieces).split(b"\n")
+                pieces = [chunk[end + 1:]]
+                for line in lines:
+                    entry["offset"] += len(line) + 1
+                    if any(marker in line for marker in ASSISTANT_MARKERS):
+                        entry["after_assistant"] = True
+                        continue
+                    # Cheap checks before parsing: only user turns that are not tool results
+                    if b'"user"' not in line or b'"tool_use_id"' in line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if isinstance(record, dict):
+                        yield record
+
+    def _count(self, state: Dict, kind: str, statement: str, result: MiningResult):
+        """Count a learning, adding it to the result once it is due to be staged."""
+        key = learning_key(statement)
+        seen = state["learnings"].setdefault(key, {"kind": kind, "text": statement, "count": 0,
+                                                   "staged": False})
+        seen["count"] += 1
+        threshold = 1 if kind == REMEMBERED else self.correction_threshold
+        if not seen["staged"] and seen["count"] >= threshold:
+            seen["staged"] = True
+            result.learnings.append((seen["kind"], seen["text"]))
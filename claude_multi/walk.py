@@ -0,0 +1,68 @@
+"""Single-pass walk of memory directory trees."""
+
+import os
+import stat
+from fnmatch import fnmatchcase
+from pathlib import Path
+from typing import Dict, Iterable
+
+DEFAULT_INCLUDE = ("*.md",)
+
+
+def matches(rel_path: str, patterns: Iterable[str]) -> bool:
+    """Check a path relative to the tree root (with "/" separators) against glob patterns.
+
+    A pattern matches the whole relative path (``*`` also matches "/", so
+    ``*.md`` matches files at any depth) or just the file name.
+    """
+    name = rel_path.rsplit('/', 1)[-1]
+    return any(fnmatchcase(rel_path, pattern) or fnmatchcase(name, pattern) for pattern in patterns)
+
+
+def walk_tree(root: Path, include: Iterable[str] = DEFAULT_INCLUDE,
+              exclude: Iterable[str] = ()) -> Dict[str, os.stat_result]:
+    """List the memory files below a directory, at any depth, with their stat results.
+
+    Directories are read once each with ``os.scandir``; file types come
+    from the directory entries, so the only other syscall is one ``stat``
+    per matching file, whose result callers reuse for change detection.
+    Hidden files and directories are skipped, and directories matching an
+    exclude pattern are not entered.
+
+    Args:
+        root: Directory to walk (a missing directory has no files)
+        include: Glob patterns a file must match
+        exclude: Glob patterns of files and directories to leave out
+
+    Returns:
+        Stat result of every regular file, keyed by its path relative to
+        ``root`` with "/" separators
+    """
+    include = tuple(include)
+    exclude = tuple(exclude)
+    files: Dict[str, os.stat_result] = {}
+    stack = [("", str(root))]
+    while stack:
+        prefix, directory = stack.pop()
+        try:
+            entries = os.scandir(directory)
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+        with entries:
+            for entry in entries:
+                if entry.name.startswith('.'):
+                    continue
+                rel_path = prefix + entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    if not matches(rel_path, exclude):
+                        stack.append((rel_path + "/", entry.path))
+                    continue
+                if not matches(rel_path, include) or matches(rel_path, exclude):
+                    continue
+                try:
+                    result = entry.stat()
+                except FileNotFoundError:
+                    continue
+                if stat.S_ISREG(result.st_mode):
+                    files[rel_path] = result
+    return files
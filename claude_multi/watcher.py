@@ -0,0 +1,320 @@
+"""Background memory sync while a Claude Code session is running."""
+
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import threading
+import ctypes
+import ctypes.util
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .walk import DEFAULT_INCLUDE, matches, walk_tree
+
+
+def scan_tree(root: Path, include: Iterable[str] = DEFAULT_INCLUDE,
+              exclude: Iterable[str] = ()) -> Set[Tuple[str, int, int]]:
+    """Collect (path, size, mtime) for every memory file below ``root``.
+
+    ``include`` and ``exclude`` select files as in :func:`claude_multi.walk.walk_tree`.
+    """
+    return {(os.path.join(root, rel_path), stat.st_size, stat.st_mtime_ns)
+            for rel_path, stat in walk_tree(root, include, exclude).items()}
+
+
+class PollingBackend:
+    """Detects changes by periodically rescanning each watched tree."""
+
+    def __init__(self, roots: Dict[str, Path], include: Iterable[str] = DEFAULT_INCLUDE,
+                 exclude: Iterable[str] = ()):
+        self.roots = roots
+        self.include = tuple(include)
+        self.exclude = tuple(exclude)
+        self._state = {side: scan_tree(root, self.include, self.exclude)
+                       for side, root in roots.items()}
+
+    def wait(self, timeout: float, stop: threading.Event) -> Set[str]:
+        """Wait up to ``timeout`` seconds and return the sides that changed."""
+        if stop.wait(timeout):
+            return set()
+
+        changed = set()
+        for side, root in self.roots.items():
+            state = scan_tree(root, self.include, self.exclude)
+            if state != self._state[side]:
+                self._state[side] = state
+                changed.add(side)
+        return changed
+
+    def close(self):
+        pass
+
+
+class InotifyBackend:
+    """Detects changes with Linux inotify, watching every directory of each tree."""
+
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_Q_OVERFLOW = 0x00004000
+    IN_ISDIR = 0x40000000
+    IN_NONBLOCK = os.O_NONBLOCK
+    IN_CLOEXEC = os.O_CLOEXEC
+
+    MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    EVENT_HEADER = struct.Struct("iIII")
+
+    # Check the stop flag at least this often while blocked in select()
+    STOP_CHECK_INTERVAL = 0.5
+
+    def __init__(self, roots: Dict[str, Path], include: Iterable[str] = DEFAULT_INCLUDE,
+                 exclude: Iterable[str] = ()):
+        self._libc = self._load_libc()
+        self._fd = self._libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        self.include = tuple(include)
+        self.exclude = tuple(exclude)
+        # Watch descriptor -> (side, directory, its path relative to the root with a trailing "/")
+        self._watches: Dict[int, Tuple[str, str, str]] = {}
+        for side, root in roots.items():
+            self._add_tree(side, str(root), "")
+
+    @staticmethod
+    def _load_libc():
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        return libc
+
+    @classmethod
+    def available(cls) -> bool:
+        """Check whether inotify can be used on this platform."""
+        if not sys.platform.startswith("linux"):
+            return False
+        try:
+            cls._load_libc()
+        except (OSError, AttributeError):
+            return False
+        return True
+
+    def _add_watch(self, side: str, path: str, prefix: str):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), self.MASK)
+        if wd >= 0:
+            self._watches[wd] = (side, path, prefix)
+
+    def _add_tree(self, side: str, path: str, prefix: str):
+        """Watch a directory and every subdirectory the walker would enter."""
+        prefixes = {path: prefix}
+        for dirpath, dirnames, _filenames in os.walk(path):
+            dir_prefix = prefixes[dirpath]
+            self._add_watch(side, dirpath, dir_prefix)
+            dirnames[:] = [name for name in dirnames
+                           if not name.startswith('.') and not matches(dir_prefix + name, self.exclude)]
+            for name in dirnames:
+                prefixes[os.path.join(dirpath, name)] = dir_prefix + name + "/"
+
+    def _read_events(self) -> Set[str]:
+        changed = set()
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except OSError as e:
+                if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    break
+                raise
+            if not data:
+                break
+
+            offset = 0
+            while offset < len(data):
+                wd, mask, _cookie, length = self.EVENT_HEADER.unpack_from(data, offset)
+                offset += self.EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b"\0")
+                offset += length
+
+                if mask & self.IN_Q_OVERFLOW:
+                    # Events were dropped; assume everything changed
+                    changed.update(side for side, _path, _prefix in self._watches.values())
+                    continue
+
+                watch = self._watches.get(wd)
+                if watch is None:
+                    continue
+                side, path, prefix = watch
+                name = os.fsdecode(name)
+                rel_path = prefix + name
+                if name.startswith('.'):
+                    continue
+                if mask & self.IN_ISDIR:
+                    if matches(rel_path, self.exclude):
+                        continue
+                    if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                        self._add_tree(side, os.path.join(path, name), rel_path + "/")
+                    changed.add(side)
+                elif matches(rel_path, self.include) and not matches(rel_path, self.exclude):
+                    changed.add(side)
+        return changed
+
+    def wait(self, timeout: float, stop: threading.Event) -> Set[str]:
+        """Wait up to ``timeout`` seconds for events and return the sides that changed."""
+        deadline = time.monotonic() + timeout
+        while not stop.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return set()
+            readable, _, _ = select.select([self._fd], [], [], min(remaining, self.STOP_CHECK_INTERVAL))
+            if readable:
+                changed = self._read_events()
+                if changed:
+                    return changed
+        return set()
+
+    def close(self):
+        os.close(self._fd)
+
+
+class StartupSync(threading.Thread):
+    """Finishes the pre-start sync into a session after Claude Code was launched.
+
+    Every file is replaced atomically, so Claude Code reads either the old
+    or the synced version of a memory file, never a partial one. Failures
+    are collected in :attr:`errors` instead of being printed over Claude
+    Code's terminal.
+    """
+
+    def __init__(self, memory_manager, project_path: Path, working_dir: Optional[Path] = None):
+        super().__init__(name="claude-multi-startup-sync", daemon=True)
+        self.memory = memory_manager
+        self.project_path = project_path
+        self.working_dir = working_dir
+        self.errors: List[Exception] = []
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def run(self):
+        self.started_at = time.perf_counter()
+        try:
+            with self.memory.profiler.phase("startup_sync"):
+                self.memory.sync_to_session(self.project_path, working_dir=self.working_dir)
+        except Exception as e:
+            self.errors.append(e)
+        finally:
+            self.finished_at = time.perf_counter()
+
+
+class MemoryWatcher(threading.Thread):
+    """Keeps a running session and the shared pool in sync in the background.
+
+    Changes to the session's ``memory/`` directory are pushed to the shared
+    pool and changes to the shared pool are pulled into the session. Bursts
+    of changes are debounced: a sync runs once no new change has been seen
+    for ``debounce`` seconds, or at the latest ``interval`` seconds after the
+    first one. Both directions use the incremental manifest, so a sync
+    triggered by the watcher's own writes is a no-op.
+
+    The thread is a daemon and never raises; failures are collected in
+    :attr:`errors` so they can be reported after the session ends. With
+    ``wait_for`` (e.g. a :class:`StartupSync`), changes are recorded from
+    the start but the first sync waits until that thread has finished.
+    """
+
+    LOCAL = "session"
+    SHARED = "shared"
+
+    # Seconds without events that end the changes caused by the startup sync
+    STARTUP_DRAIN = 0.05
+
+    def __init__(self, memory_manager, project_path: Path, session_name: str,
+                 interval: float = 30, debounce: float = 2, use_inotify: bool = True,
+                 wait_for: Optional[threading.Thread] = None):
+        super().__init__(name="claude-multi-watcher", daemon=True)
+        self.memory = memory_manager
+        self.project_path = project_path
+        self.session_name = session_name
+        self.interval = interval
+        self.debounce = min(debounce, interval)
+        self.use_inotify = use_inotify
+        self.wait_for = wait_for
+        self.errors: List[Exception] = []
+        self.sync_count = 0
+        self._stop_event = threading.Event()
+
+    def _create_backend(self):
+        memory_dir = self.project_path / "memory"
+        memory_dir.mkdir(parents=True, exist_ok=True)
+        roots = {self.LOCAL: memory_dir, self.SHARED: self.memory.shared_memory_dir}
+        config = self.memory.config
+        patterns = (config.get("sync_include", ["*.md"]), config.get("sync_exclude", []))
+
+        if self.use_inotify and InotifyBackend.available():
+            try:
+                return InotifyBackend(roots, *patterns)
+            except OSError:
+                pass
+        return PollingBackend(roots, *patterns)
+
+    def _sync(self, sides: Set[str]):
+        try:
+            with self.memory.profiler.phase("live_sync"):
+                # Push local learnings first so the pull also brings them back merged
+                if self.LOCAL in sides:
+                    self.memory.sync_from_session(self.project_path, self.session_name, snapshot=False)
+                if self.SHARED in sides:
+                    self.memory.sync_to_session(self.project_path)
+            self.sync_count += 1
+        except Exception as e:
+            self.errors.append(e)
+
+    def run(self):
+        try:
+            backend = self._create_backend()
+        except Exception as e:
+            self.errors.append(e)
+            return
+
+        pending: Set[str] = set()
+        first_change = last_change = 0.0
+        if self.wait_for is not None:
+            # Both sync the same project manifest; the startup sync goes first
+            self.wait_for.join()
+            # The session changes seen so far are the startup sync's own writes
+            # (anything else is picked up by the next sync); changes to the
+            # pool meanwhile still need to be pulled
+            while True:
+                changed = backend.wait(self.STARTUP_DRAIN, self._stop_event)
+                if not changed:
+                    break
+                pending |= changed & {self.SHARED}
+            first_change = last_change = time.monotonic()
+        try:
+            while not self._stop_event.is_set():
+                timeout = self.debounce if pending else self.interval
+                changed = backend.wait(timeout, self._stop_event)
+                now = time.monotonic()
+
+                if changed:
+                    if not pending:
+                        first_change = now
+                    pending |= changed
+                    last_change = now
+
+                if pending and (now - last_change >= self.debounce or
+                                now - first_change >= self.interval):
+                    self._sync(pending)
+                    pending = set()
+        finally:
+            backend.close()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop watching and wait for any in-flight sync to finish."""
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
@@ -0,0 +1,139 @@
+"""Tests for the single-pass memory tree walker."""
+
+import os
+from pathlib import Path
+from unittest import mock
+
+from claude_multi import walk
+from claude_multi.walk import walk_tree
+
+
+class CountingEntry:
+    """A directory entry that counts its ``stat`` calls."""
+
+    def __init__(self, entry, counts):
+        self._entry = entry
+        self._counts = counts
+
+    def __getattr__(self, name):
+        return getattr(self._entry, name)
+
+    def stat(self, *args, **kwargs):
+        self._counts["stat"] += 1
+        return self._entry.stat(*args, **kwargs)
+
+
+class CountingEntries:
+    """Wraps ``os.scandir`` so the directory and every entry's ``stat`` call are counted."""
+
+    scandir = os.scandir
+
+    def __init__(self, path, counts):
+        counts["scandir"] += 1
+        self._entries = self.scandir(path)
+        self._counts = counts
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._entries.close()
+
+    def __iter__(self):
+        return (CountingEntry(entry, self._counts) for entry in self._entries)
+
+
+def count_syscalls(root: Path, **kwargs):
+    counts = {"scandir": 0, "stat": 0}
+    with mock.patch.object(walk.os, "scandir", lambda path: CountingEntries(path, counts)), \
+            mock.patch.object(walk.os, "stat", wraps=os.stat) as os_stat, \
+            mock.patch.object(walk.os, "lstat", wraps=os.lstat) as os_lstat:
+        files = walk_tree(root, **kwargs)
+    counts["stat"] += os_stat.call_count + os_lstat.call_count
+    return files, counts
+
+
+def build_tree(root: Path, topics: int, files_per_topic: int):
+    """Create ``topics`` topic directories, each two levels deep, plus MEMORY.md.
+
+    Returns:
+        Number of directories below ``root`` and relative paths of the markdown files
+    """
+    (root / "MEMORY.md").write_text("# Memory\n")
+    expected = {"MEMORY.md"}
+    directories = 0
+    for topic in range(topics):
+        deep = root / f"topic{topic}" / "details"
+        deep.mkdir(parents=True)
+        directories += 2
+        for number in range(files_per_topic):
+            (root / f"topic{topic}" / f"note{number}.md").write_text("- note\n")
+            (deep / f"deep{number}.md").write_text("- detail\n")
+            expected.add(f"topic{topic}/note{number}.md")
+            expected.add(f"topic{topic}/details/deep{number}.md")
+        (root / f"topic{topic}" / "data.json").write_text("{}")
+    return directories, expected
+
+
+def test_finds_files_at_any_depth(tmp_path):
+    _directories, expected = build_tree(tmp_path, topics=3, files_per_topic=2)
+
+    files = walk_tree(tmp_path)
+
+    assert set(files) == expected
+    assert "topic0/details/deep1.md" in files
+    assert files["MEMORY.md"].st_size == len("# Memory\n")
+
+
+def test_one_scandir_per_directory_and_one_stat_per_file(tmp_path):
+    directories, expected = build_tree(tmp_path, topics=4, files_per_topic=3)
+
+    files, counts = count_syscalls(tmp_path)
+
+    assert set(files) == expected
+    assert counts == {"scandir": directories + 1, "stat": len(expected)}
+
+
+def test_cost_grows_with_entries_not_topic_directories(tmp_path):
+    few_topics = tmp_path / "few"
+    many_topics = tmp_path / "many"
+    few_topics.mkdir()
+    many_topics.mkdir()
+    # The same number of files, spread over 2 or 16 topic directories
+    few_dirs, few_files = build_tree(few_topics, topics=2, files_per_topic=16)
+    many_dirs, many_files = build_tree(many_topics, topics=16, files_per_topic=2)
+    assert len(few_files) == len(many_files)
+
+    _files, few = count_syscalls(few_topics)
+    _files, many = count_syscalls(many_topics)
+
+    # Every file is stat'ed once however the tree is laid out, and each
+    # extra topic directory only adds the scandir of its own entries
+    assert few["stat"] == many["stat"] == len(few_files)
+    assert many["scandir"] - few["scandir"] == many_dirs - few_dirs
+    assert sum(many.values()) == many_dirs + 1 + len(many_files)
+
+
+def test_hidden_and_excluded_entries_are_not_visited(tmp_path):
+    _directories, expected = build_tree(tmp_path, topics=2, files_per_topic=1)
+    (tmp_path / ".git").mkdir()
+    (tmp_path / ".git" / "HEAD.md").write_text("ref\n")
+    (tmp_path / "drafts" / "old").mkdir(parents=True)
+    (tmp_path / "drafts" / "old" / "draft.md").write_text("- draft\n")
+    (tmp_path / "topic0" / "scratch.tmp.md").write_text("- scratch\n")
+
+    files, counts = count_syscalls(tmp_path, exclude=["drafts", "*.tmp.md"])
+
+    assert set(files) == expected
+    # Neither .git nor drafts (or anything below it) is read
+    assert counts == {"scandir": 5, "stat": len(expected)}
+
+
+def test_include_patterns_and_missing_root(tmp_path):
+    build_tree(tmp_path, topics=1, files_per_topic=1)
+    (tmp_path / "topic0" / "details" / "notes.txt").write_text("notes\n")
+
+    files = walk_tree(tmp_path, include=["*.txt"])
+
+    assert set(files) == {"topic0/details/notes.txt"}
+    assert walk_tree(tmp_path / "missing") == {}